@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Approximate Nearest-Neighbour Index for Synapse System
+======================================================
+
+IVF-flat index in pure NumPy: stored vectors are partitioned into `nlist`
+inverted lists around spherical k-means centroids, and a query only scores
+the vectors in the `nprobe` lists whose centroids are closest to it.
+Raising nprobe trades latency for recall; nprobe == nlist is an exact scan.
+List members are stored as codes of the engine's quantization codec.
+
+The index is persisted as a single .npz file next to vector_store.db and
+kept in step with the vectors table the same way as the resident
+VectorIndex (see VectorEngine._sync_index).
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from quantization import Codec, Float32Codec, codec_from_state
+from vector_index import normalize_rows
+
+
+def default_nlist(vector_count: int) -> int:
+    """Rule-of-thumb list count: about sqrt(N), at least 1"""
+    return max(1, int(np.sqrt(vector_count)))
+
+
+def _nearest_centroids(matrix: np.ndarray, centroids: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+    """Index of the most similar centroid for each unit row"""
+    assignment = np.empty(len(matrix), dtype=np.int64)
+    for start in range(0, len(matrix), chunk_size):
+        scores = matrix[start:start + chunk_size] @ centroids.T
+        assignment[start:start + chunk_size] = np.argmax(scores, axis=1)
+    return assignment
+
+
+def spherical_kmeans(matrix: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Cluster unit rows into nlist unit-length centroids"""
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, len(matrix))
+    centroids = matrix[rng.choice(len(matrix), size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = _nearest_centroids(matrix, centroids)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=nlist)
+
+        occupied = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[occupied]
+        sums = np.add.reduceat(matrix[order], starts, axis=0)
+
+        updated, _ = normalize_rows(sums)
+        centroids[occupied] = updated
+
+        # Re-seed empty lists from random points so no centroid is wasted
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = matrix[rng.choice(len(matrix), size=len(empty), replace=False)]
+
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index over unit-normalised vectors, stored as codec codes.
+
+    Shares the add()/search()/reset() contract of VectorIndex so the
+    engine can keep either one in sync with the vectors table. reset()
+    drops the list members but keeps the trained centroids.
+    """
+
+    def __init__(self, centroids: np.ndarray, trained_size: int = 0, codec: Optional[Codec] = None):
+        self.centroids, _ = normalize_rows(centroids)
+        self.dim = self.centroids.shape[1]
+        self.trained_size = trained_size
+        self.codec = codec or Float32Codec(self.dim)
+        self.reset()
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, nlist: int, iterations: int = 10,
+              sample_size: Optional[int] = None, seed: int = 0,
+              codec: Optional[Codec] = None) -> "IVFIndex":
+        """Fit centroids on (a sample of) vectors. Members must be add()ed separately."""
+        matrix, norms = normalize_rows(vectors)
+        matrix = matrix[norms > 0]
+        if len(matrix) == 0:
+            raise ValueError("Cannot train an IVF index without non-zero vectors")
+
+        sample_size = sample_size or 64 * nlist
+        if len(matrix) > sample_size:
+            rng = np.random.default_rng(seed)
+            matrix = matrix[rng.choice(len(matrix), size=sample_size, replace=False)]
+
+        return cls(spherical_kmeans(matrix, nlist, iterations, seed), trained_size=len(vectors), codec=codec)
+
+    def reset(self):
+        """Drop all list members, keeping the centroids"""
+        self.list_vectors: List[np.ndarray] = [np.empty((0, self.codec.code_size), dtype=np.uint8)
+                                               for _ in range(self.nlist)]
+        self.list_ids: List[np.ndarray] = [np.empty(0, dtype=object) for _ in range(self.nlist)]
+        self.list_live: List[np.ndarray] = [np.empty(0, dtype=bool) for _ in range(self.nlist)]
+        self.positions: Dict[str, Tuple[int, int]] = {}
+
+        # Sync bookkeeping for the backing store
+        self.last_row_id = 0
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def add(self, node_ids: List[str], vectors: np.ndarray):
+        """Assign vectors to their nearest lists, superseding earlier rows for the same ids"""
+        if len(node_ids) == 0:
+            return
+
+        matrix, norms = normalize_rows(vectors)
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}D vectors, got {matrix.shape[1]}D")
+
+        node_ids = np.asarray(node_ids, dtype=object)
+        assignment = _nearest_centroids(matrix, self.centroids)
+        codes = self.codec.encode(matrix)
+        targets: List[Tuple[int, int]] = [None] * len(node_ids)
+
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=self.nlist)
+        groups = np.split(order, np.cumsum(counts)[:-1])
+
+        for list_no in np.flatnonzero(counts):
+            members = groups[list_no]
+            start = len(self.list_ids[list_no])
+            self.list_vectors[list_no] = np.concatenate((self.list_vectors[list_no], codes[members]))
+            self.list_ids[list_no] = np.concatenate((self.list_ids[list_no], node_ids[members]))
+            self.list_live[list_no] = np.concatenate((self.list_live[list_no], norms[members] > 0))
+            for offset, member in enumerate(members):
+                targets[member] = (int(list_no), start + offset)
+
+        for node_id, target in zip(node_ids, targets):
+            previous = self.positions.get(node_id)
+            if previous is not None:
+                self.list_live[previous[0]][previous[1]] = False
+            self.positions[node_id] = target
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 5, min_similarity: float = 0.1,
+               nprobe: int = 8) -> List[Tuple[str, float]]:
+        """Return up to top_k (node_id, cosine similarity) pairs from the nprobe closest lists"""
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        if query.shape[0] != self.dim:
+            raise ValueError(f"Query has {query.shape[0]} dimensions, index has {self.dim}")
+
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0 or top_k <= 0 or not self.positions:
+            return []
+        query = query / query_norm
+
+        nprobe = max(1, min(nprobe, self.nlist))
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(centroid_scores, -nprobe)[-nprobe:]
+
+        candidate_scores = []
+        candidate_ids = []
+        for list_no in probe:
+            if len(self.list_ids[list_no]) == 0:
+                continue
+            scores = self.codec.score(self.list_vectors[list_no], query)
+            scores[~self.list_live[list_no]] = -np.inf
+            candidate_scores.append(scores)
+            candidate_ids.append(self.list_ids[list_no])
+
+        if not candidate_scores:
+            return []
+
+        scores = np.concatenate(candidate_scores)
+        ids = np.concatenate(candidate_ids)
+        if len(scores) > top_k:
+            top = np.argpartition(scores, -top_k)[-top_k:]
+            scores, ids = scores[top], ids[top]
+        order = np.argsort(-scores, kind="stable")
+
+        return [(ids[i], float(scores[i])) for i in order if scores[i] >= min_similarity]
+
+    def save(self, path: Path):
+        """Write live list members and centroids to path atomically"""
+        keep = [np.fromiter((self.positions.get(node_id) == (list_no, row)
+                             for row, node_id in enumerate(ids)), dtype=bool, count=len(ids))
+                for list_no, ids in enumerate(self.list_ids)]
+        counts = [int(k.sum()) for k in keep]
+
+        vectors = np.concatenate([v[k] for v, k in zip(self.list_vectors, keep)])
+        ids = np.concatenate([i[k] for i, k in zip(self.list_ids, keep)])
+        live = np.concatenate([l[k] for l, k in zip(self.list_live, keep)])
+
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                vectors=vectors,
+                ids=np.array(ids.tolist(), dtype=str),
+                live=live,
+                offsets=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+                state=np.array([self.last_row_id, self.generation, self.trained_size], dtype=np.int64),
+                codec=np.array(self.codec.name),
+                **{f"codec_{key}": value for key, value in self.codec.state().items()}
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFIndex":
+        """Read an index written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            last_row_id, generation, trained_size = (int(x) for x in data["state"])
+            centroids = data["centroids"]
+            codec_state = {key[len("codec_"):]: data[key] for key in data.files if key.startswith("codec_")}
+            codec = codec_from_state(str(data["codec"]), centroids.shape[1], codec_state) if "codec" in data.files else None
+            index = cls(centroids, trained_size=trained_size, codec=codec)
+            vectors = data["vectors"]
+            if codec is None:
+                # Indexes written before codecs held plain float32 rows
+                vectors = index.codec.encode(vectors)
+            ids = data["ids"].astype(object)
+            live = data["live"]
+            offsets = data["offsets"]
+
+        for list_no in range(index.nlist):
+            start, end = offsets[list_no], offsets[list_no + 1]
+            index.list_vectors[list_no] = vectors[start:end]
+            index.list_ids[list_no] = ids[start:end]
+            index.list_live[list_no] = live[start:end].copy()
+            for row, node_id in enumerate(index.list_ids[list_no]):
+                index.positions[node_id] = (list_no, row)
+
+        index.last_row_id = last_row_id
+        index.generation = generation
+        return index
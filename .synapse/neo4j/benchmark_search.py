@@ -4,6 +4,14 @@ Search Performance Benchmark
 ============================
 
 Quick benchmark to test search improvements against a set of common queries.
+
+    python benchmark_search.py [queries_file] [output_file]
+    python benchmark_search.py --precision [queries_file]
+    python benchmark_search.py --dimensions [queries_file]
+
+--precision reports recall@5 of each quantized storage precision against
+exact search over the stored vectors, without needing Neo4j. --dimensions
+does the same for PCA and random projections to 512/256/128/64 dimensions.
 """
 
 import sys
@@ -179,8 +187,55 @@ def save_results(results: dict, output_file: Path):
     except Exception as e:
         print(f"\n❌ Failed to save results: {e}")
 
+def run_precision_benchmark(queries: list, top_k: int = 5):
+    """Compare quantized storage precisions on the stored vectors"""
+    from vector_engine import VectorEngine
+
+    engine = VectorEngine()
+    query_embeddings = [engine.generate_embedding(query) for query in queries]
+    report = engine.precision_recall(query_embeddings, top_k)
+    if not report:
+        print("No vectors stored; run ingestion first")
+        return
+
+    print(f"🎯 Recall@{top_k} vs exact search ({len(queries)} queries)")
+    for precision, metrics in report.items():
+        print(f"   {precision:8s} recall {metrics['recall']:.3f} "
+              f"(reranked {metrics['recall_reranked']:.3f})  "
+              f"{metrics['bytes_per_vector']:5d} B/vector  "
+              f"({metrics['compression_vs_float64']}x smaller than float64)")
+
+def run_dimension_benchmark(queries: list, top_k: int = 5):
+    """Compare projected dimensions on the stored vectors"""
+    from vector_engine import VectorEngine
+
+    engine = VectorEngine()
+    query_embeddings = [engine.generate_embedding(query) for query in queries]
+    report = engine.dimension_recall(query_embeddings, top_k=top_k)
+    if not report:
+        print("No vectors stored; run ingestion first")
+        return
+
+    print(f"🎯 Recall@{top_k} vs exact search ({len(queries)} queries)")
+    for method, by_dim in report.items():
+        for dim, metrics in by_dim.items():
+            variance = metrics.get("explained_variance")
+            print(f"   {method:6s} {dim:5d}-d recall {metrics['recall']:.3f}  "
+                  f"{metrics['bytes_per_vector']:5d} B/vector  "
+                  f"{metrics['search_ms']:.2f} ms/query"
+                  + (f"  ({variance:.1%} variance kept)" if variance is not None else ""))
+
 def main():
     """Main benchmark function"""
+    if len(sys.argv) > 1 and sys.argv[1] == "--precision":
+        queries_file = Path(sys.argv[2]) if len(sys.argv) > 2 else None
+        run_precision_benchmark(load_test_queries(queries_file))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "--dimensions":
+        queries_file = Path(sys.argv[2]) if len(sys.argv) > 2 else None
+        run_dimension_benchmark(load_test_queries(queries_file))
+        return
+
     # Parse command line arguments
     queries_file = None
     output_file = Path("benchmark_results.json")
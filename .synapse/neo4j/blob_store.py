@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Content Blob Store for Synapse System
+=====================================
+
+File contents live here instead of on SynapseFile nodes, so queries that
+return nodes ship only summaries and metadata over Bolt. Blobs are kept in
+the content_blobs table of vector_store.db:
+
+    sha256 -> (codec, size, compressed text)
+
+The key is the file's content hash, already stored on its node as
+f.hash, so identical files share one blob. Contents are zstd-compressed
+when the zstandard package is installed and zlib-compressed otherwise;
+the codec is stored per blob, so stores written either way stay
+readable. Blobs no file in the manifest points to are pruned after
+ingestion.
+"""
+
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlite_pool import get_pool
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+
+
+def compress(text: str) -> Tuple[str, bytes]:
+    """(codec, data) for a file's content"""
+    data = text.encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "zlib", zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress(codec: str, data: bytes) -> str:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed; install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    if codec == "zlib":
+        return zlib.decompress(data).decode("utf-8")
+    raise ValueError(f"Unknown blob codec: {codec}")
+
+
+class BlobStore:
+    """sha256 -> file content rows (schema: VectorEngine.initialize_vector_store)"""
+
+    def __init__(self, sqlite_path: Path):
+        self.sqlite_path = sqlite_path
+        self.db = get_pool(sqlite_path)
+
+    def put_many(self, blobs: Iterable[Tuple[str, str, bytes, int]]):
+        """Store (sha256, codec, data, size) rows; contents already stored are left alone"""
+        with self.db.transaction() as cursor:
+            cursor.executemany("""
+                INSERT OR IGNORE INTO content_blobs (sha256, codec, data, size) VALUES (?, ?, ?, ?)
+            """, list(blobs))
+
+    def put(self, sha256: str, text: str):
+        codec, data = compress(text)
+        self.put_many([(sha256, codec, data, len(text))])
+
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, str]:
+        """Contents of the given hashes; unknown hashes are left out"""
+        hashes = list(set(hashes))
+        rows: List[Tuple[str, str, bytes]] = []
+        with self.db.transaction() as cursor:
+            for start in range(0, len(hashes), 500):
+                part = hashes[start:start + 500]
+                cursor.execute(f"""
+                    SELECT sha256, codec, data FROM content_blobs
+                    WHERE sha256 IN ({", ".join("?" * len(part))})
+                """, part)
+                rows.extend(cursor.fetchall())
+        return {sha256: decompress(codec, data) for sha256, codec, data in rows}
+
+    def get(self, sha256: Optional[str]) -> Optional[str]:
+        if not sha256:
+            return None
+        return self.get_many([sha256]).get(sha256)
+
+    def missing(self, hashes: Iterable[str]) -> List[str]:
+        """Hashes without a stored blob"""
+        hashes = list(set(hashes))
+        present = set()
+        with self.db.transaction() as cursor:
+            for start in range(0, len(hashes), 500):
+                part = hashes[start:start + 500]
+                cursor.execute(f"""
+                    SELECT sha256 FROM content_blobs WHERE sha256 IN ({", ".join("?" * len(part))})
+                """, part)
+                present.update(row[0] for row in cursor.fetchall())
+        return [sha256 for sha256 in hashes if sha256 not in present]
+
+    def prune(self) -> int:
+        """Delete blobs of contents no file in the manifest has any more"""
+        with self.db.transaction() as cursor:
+            cursor.execute("DELETE FROM content_blobs WHERE sha256 NOT IN (SELECT sha256 FROM file_manifest)")
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM content_blobs")
+            count, size, stored = cursor.fetchone()
+        return {"blobs": count, "content_bytes": size, "stored_bytes": stored}
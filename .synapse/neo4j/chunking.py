@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Structural Chunking for Synapse System
+======================================
+
+Splits a file into chunks of at most SYNAPSE_CHUNK_CHARS characters so
+large files are embedded section by section instead of being truncated
+by the model. Lines are read as a stream and only the chunk being built
+is held in memory.
+
+    md         split before headings (outside fenced code blocks)
+    py         split before top-level def / class (and their decorators)
+    sh         split before top-level function definitions
+    other      split by size only
+
+Consecutive small sections are packed into one chunk. A section longer
+than the limit is cut at line boundaries, and each piece repeats the last
+SYNAPSE_CHUNK_OVERLAP characters of lines from the one before. Files that
+fit in a single chunk keep one whole-file vector; larger files store one
+vector per chunk under "<file node id>#<index>", linked to the file's
+SynapseFile node in vector_metadata.
+"""
+
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+CHUNK_CHARS = int(os.getenv("SYNAPSE_CHUNK_CHARS", 2000))
+CHUNK_OVERLAP = int(os.getenv("SYNAPSE_CHUNK_OVERLAP", 200))
+
+_MARKDOWN_HEADING = re.compile(r"#{1,6}\s")
+_MARKDOWN_FENCE = re.compile(r"(```|~~~)")
+_PYTHON_DEFINITION = re.compile(r"(async\s+def|def|class)\s")
+_SHELL_FUNCTION = re.compile(r"(function\s+[\w:-]+|[\w:-]+\s*\(\s*\))")
+
+
+class Chunk:
+    """Lines start_line..end_line (1-based, inclusive) of a file"""
+
+    __slots__ = ("index", "start_line", "end_line", "text", "heading")
+
+    def __init__(self, index: int, start_line: int, end_line: int, text: str, heading: str = ""):
+        self.index = index
+        self.start_line = start_line
+        self.end_line = end_line
+        self.text = text
+        self.heading = heading
+
+    def embedding_text(self, summary: str) -> str:
+        """File summary, the enclosing heading when the chunk starts mid-section, then the chunk"""
+        if self.heading and not self.text.lstrip().startswith(self.heading):
+            return f"{summary}\n\n{self.heading}\n{self.text}"
+        return f"{summary}\n\n{self.text}"
+
+    def __repr__(self) -> str:
+        return f"Chunk({self.index}, lines {self.start_line}-{self.end_line})"
+
+
+def chunk_node_id(parent_node_id: str, index: int) -> str:
+    return f"{parent_node_id}#{index}"
+
+
+def parent_node_id(node_id: str) -> str:
+    """SynapseFile node id of a chunk id (Neo4j element ids contain no '#')"""
+    return node_id.split("#", 1)[0]
+
+
+class _Boundaries:
+    """Detects lines that start a new section for one file type"""
+
+    def __init__(self, file_type: str):
+        self.file_type = file_type
+        self.in_fence = False
+        self.after_decorator = False
+
+    def starts_section(self, line: str) -> bool:
+        if self.file_type == "md":
+            if _MARKDOWN_FENCE.match(line.lstrip()):
+                self.in_fence = not self.in_fence
+                return False
+            return not self.in_fence and bool(_MARKDOWN_HEADING.match(line))
+        if self.file_type == "py":
+            # A decorator starts the section of the definition it decorates
+            if line.startswith("@") or _PYTHON_DEFINITION.match(line):
+                starts = not self.after_decorator
+                self.after_decorator = line.startswith("@")
+                return starts
+            if line.strip() and line[:1] not in (" ", "\t", ")"):
+                self.after_decorator = False
+            return False
+        if self.file_type == "sh":
+            return bool(_SHELL_FUNCTION.match(line))
+        return False
+
+
+def iter_chunks(lines: Iterable[str], file_type: str, max_chars: int = None,
+                overlap_chars: int = None) -> Iterator[Chunk]:
+    """
+    Chunks of an iterable of lines (an open file, io.StringIO, ...) with
+    line endings kept. Whitespace-only chunks are dropped. A single line
+    longer than max_chars becomes a chunk of its own.
+    """
+    max_chars = max_chars or CHUNK_CHARS
+    overlap_chars = min(CHUNK_OVERLAP if overlap_chars is None else overlap_chars, max_chars // 2)
+    boundaries = _Boundaries(file_type)
+
+    buffer: List[Tuple[int, str]] = []  # (line number, line)
+    size = 0
+    section_start = 0  # buffer position where the current section begins
+    heading = ""  # boundary line of the current section
+    chunk_heading = ""  # heading in effect where the buffer starts
+    index = 0
+
+    def emit(lines_out: List[Tuple[int, str]], heading_out: str) -> Optional[Chunk]:
+        nonlocal index
+        text = "".join(line for _, line in lines_out)
+        if not text.strip():
+            return None
+        chunk = Chunk(index, lines_out[0][0], lines_out[-1][0], text, heading_out)
+        index += 1
+        return chunk
+
+    for number, line in enumerate(lines, start=1):
+        if boundaries.starts_section(line):
+            section_start = len(buffer)
+            section_heading = line.strip()
+        else:
+            section_heading = None
+
+        if buffer and size + len(line) > max_chars:
+            if section_start > 0:
+                # Flush the complete sections; the current one starts the next chunk
+                chunk = emit(buffer[:section_start], chunk_heading)
+                if chunk:
+                    yield chunk
+                buffer = buffer[section_start:]
+                size = sum(len(text) for _, text in buffer)
+                section_start = 0
+                chunk_heading = heading
+            if buffer and size + len(line) > max_chars:
+                # One section is too long: cut it here, carrying a little context over
+                chunk = emit(buffer, chunk_heading)
+                if chunk:
+                    yield chunk
+                tail: List[Tuple[int, str]] = []
+                tail_size = 0
+                for item in reversed(buffer):
+                    if tail_size + len(item[1]) > overlap_chars:
+                        break
+                    tail.insert(0, item)
+                    tail_size += len(item[1])
+                buffer, size, section_start = tail, tail_size, 0
+                chunk_heading = heading
+
+        if section_heading is not None:
+            heading = section_heading
+            if not buffer:
+                chunk_heading = heading
+        buffer.append((number, line))
+        size += len(line)
+
+    if buffer:
+        chunk = emit(buffer, chunk_heading)
+        if chunk:
+            yield chunk
@@ -23,9 +23,37 @@ import redis
 from neo4j import GraphDatabase
 from dotenv import load_dotenv
 from vector_engine import VectorEngine
+from blob_store import BlobStore
 
 load_dotenv()
 
+# Redis keys: cached query results, and per file path the set of cached
+# queries whose results include that file (for invalidation on ingestion)
+QUERY_CACHE_PREFIX = "synapse:query:"
+QUERY_PATHS_PREFIX = "synapse:query-paths:"
+
+
+def invalidate_cached_queries(redis_client, paths: Optional[List[str]] = None) -> int:
+    """
+    Drop cached query results that include any of paths, or every cached
+    query when paths is None. Returns the number of results deleted.
+    """
+    if redis_client is None:
+        return 0
+    try:
+        if paths is None:
+            keys = redis_client.keys(f"{QUERY_CACHE_PREFIX}*")
+            path_keys = redis_client.keys(f"{QUERY_PATHS_PREFIX}*")
+        else:
+            path_keys = [f"{QUERY_PATHS_PREFIX}{path}" for path in paths]
+            keys = redis_client.sunion(path_keys) if path_keys else set()
+        deleted = redis_client.delete(*keys) if keys else 0
+        if path_keys:
+            redis_client.delete(*path_keys)
+        return deleted
+    except redis.RedisError:
+        return 0
+
 
 class QueryProcessor:
     """Handles query preprocessing, expansion, and intent classification"""
@@ -133,10 +161,12 @@ class SynapseContextManager:
         self.redis_client = None
         self.sqlite_path = self.synapse_root / "neo4j" / "vector_store.db"
         self.vector_engine = VectorEngine(self.synapse_root)
+        # File contents, fetched only for excerpts (nodes carry f.hash)
+        self.blobs = BlobStore(self.vector_engine.sqlite_path)
 
         # Cache configuration
         self.cache_ttl = int(os.getenv("SYNAPSE_CACHE_TTL", 3600))  # 1 hour
-        self.cache_prefix = "synapse:query:"
+        self.cache_prefix = QUERY_CACHE_PREFIX
 
         # Initialize query processor
         self.query_processor = QueryProcessor()
@@ -201,7 +231,8 @@ class SynapseContextManager:
             }
 
         # 4. Perform Enhanced Hybrid Search
-        relevant_nodes = self._enhanced_hybrid_search(user_query, expanded_queries, key_terms, intent, max_results)
+        relevant_nodes = self._enhanced_hybrid_search(user_query, expanded_queries, key_terms, intent, max_results,
+                                                      self._vector_filters(search_context))
 
         if not relevant_nodes:
             # Try fuzzy search as fallback
@@ -230,8 +261,9 @@ class SynapseContextManager:
         # 7. Synthesize Final Context
         final_context = self._synthesize_context(enriched_context, user_query, intent)
 
-        # 8. Cache Result
+        # 8. Cache Result, indexed by the files it includes
         self.redis_client.setex(cache_key, self.cache_ttl, json.dumps(final_context))
+        self._index_cached_query(cache_key, enriched_context)
 
         return {
             "source": "neo4j",
@@ -243,6 +275,18 @@ class SynapseContextManager:
             "cache_key": cache_key
         }
 
+    def _index_cached_query(self, cache_key: str, nodes: List[Dict]):
+        """Record cache_key under each file path in the result, so re-ingesting a file drops it"""
+        paths = {node["path"] for node in nodes if node.get("path")}
+        for node in nodes:
+            for related in node.get("relationships", {}).values():
+                paths.update(r["target"] for r in related)
+        pipeline = self.redis_client.pipeline()
+        for path in paths:
+            pipeline.sadd(f"{QUERY_PATHS_PREFIX}{path}", cache_key)
+            pipeline.expire(f"{QUERY_PATHS_PREFIX}{path}", self.cache_ttl)
+        pipeline.execute()
+
     def _hash_query(self, query: str, context: Dict = None) -> str:
         """Generate a hash for the query to use as cache key"""
         # Include context in cache key for better hits
@@ -252,6 +296,8 @@ class SynapseContextManager:
             factors.append(context.get("project_language", ""))
             factors.append(context.get("current_file_type", ""))
             factors.append(context.get("intent", ""))
+            if context.get("filters"):
+                factors.append(json.dumps(context["filters"], sort_keys=True, default=str))
 
         return hashlib.md5("::".join(factors).encode()).hexdigest()
 
@@ -315,46 +361,71 @@ class SynapseContextManager:
 
         return max(0, score)  # Ensure non-negative score
 
+    def _vector_filters(self, context: Dict) -> Dict:
+        """
+        Metadata filters for vector search: the caller's explicit
+        context["filters"] (e.g. {"path_prefix": ".synapse/standards/"}).
+        project_language and current_file_type are not turned into filters,
+        as no ingested path is scoped by language and a context's file type
+        should not hide the documentation written about it.
+        """
+        return dict(context.get("filters") or {})
+
     def _enhanced_hybrid_search(self, original_query: str, expanded_queries: List[str],
-                               key_terms: List[str], intent: str, max_results: int) -> List[Dict]:
+                               key_terms: List[str], intent: str, max_results: int,
+                               filters: Dict = None) -> List[Dict]:
         """
-        Enhanced hybrid search using query expansion and intent-aware ranking
+        Enhanced hybrid search using query expansion and intent-aware ranking.
+        Vector search is scoped by metadata filters first and widened to the
+        whole store when the scoped search finds nothing.
         """
         all_results = []
         seen_paths = set()
 
         # 1. Try vector search with expanded queries
-        for query_variant in expanded_queries[:5]:  # Limit to top 5 variants
+        query_variants = expanded_queries[:5]  # Limit to top 5 variants
+        try:
+            variant_embeddings = self.vector_engine.generate_embeddings(query_variants, strict=True)
+        except Exception as e:
+            print(f"Embedding generation failed for query variants: {e}")
+            query_variants, variant_embeddings = [], []
+
+        # All variants are scored in one pass; each node keeps its best variant
+        vector_results = []
+        if query_variants:
             try:
-                query_embedding = self.vector_engine.generate_embedding(query_variant)
-                vector_results = self.vector_engine.similarity_search(query_embedding, max_results)
-
-                if vector_results:
-                    node_ids = [result[0] for result in vector_results]
-                    vector_scores = {result[0]: result[1] for result in vector_results}
-
-                    with self.driver.session() as session:
-                        for node_id in node_ids:
-                            try:
-                                result = session.run(
-                                    "MATCH (f:SynapseFile) WHERE elementId(f) = $id RETURN f",
-                                    id=node_id
-                                )
-                                record = result.single()
-                                if record:
-                                    node = dict(record["f"])
-                                    if node.get("path") not in seen_paths:
-                                        node["relevance_score"] = vector_scores.get(node_id, 0.0)
-                                        node["match_type"] = "vector"
-                                        node["query_variant"] = query_variant
-                                        all_results.append(node)
-                                        seen_paths.add(node.get("path"))
-                            except Exception as e:
-                                continue  # Skip problematic nodes
+                if filters:
+                    vector_results = self.vector_engine.similarity_search_many(
+                        variant_embeddings, max_results, filters=filters, spans=True)
+                if not vector_results:
+                    vector_results = self.vector_engine.similarity_search_many(variant_embeddings, max_results,
+                                                                               spans=True)
+            except Exception as e:
+                print(f"Vector search failed for query variants: {e}")
 
+        if vector_results:
+            try:
+                with self.driver.session() as session:
+                    records = session.run(
+                        "MATCH (f:SynapseFile) WHERE elementId(f) IN $ids RETURN elementId(f) AS id, f",
+                        ids=[node_id for node_id, _, _, _ in vector_results]
+                    )
+                    nodes = {record["id"]: dict(record["f"]) for record in records}
             except Exception as e:
-                print(f"Vector search failed for '{query_variant}': {e}")
-                continue
+                print(f"Vector result lookup failed: {e}")
+                nodes = {}
+
+            for node_id, score, variant, span in vector_results:
+                node = nodes.get(node_id)
+                if node and node.get("path") not in seen_paths:
+                    node["relevance_score"] = score
+                    node["match_type"] = "vector"
+                    node["query_variant"] = query_variants[variant]
+                    # Large files match by chunk; agents get that section, not the file
+                    if span:
+                        node["span"] = span
+                    all_results.append(node)
+                    seen_paths.add(node.get("path"))
 
         # 2. Graph search with intent-aware strategies
         graph_results = self._intent_aware_graph_search(original_query, key_terms, intent, max_results)
@@ -622,7 +693,7 @@ class SynapseContextManager:
                     RETURN
                         collect(DISTINCT {type: "contains", target: child.path, name: child.name}) as contains,
                         collect(DISTINCT {type: "references", target: ref.path, name: ref.name}) as references,
-                        collect(DISTINCT {type: "similar_to", target: similar.path, name: similar.name}) as similar,
+                        collect(DISTINCT {type: "similar_to", target: similar.path, name: similar.name, score: r3.score}) as similar,
                         collect(DISTINCT {type: "contained_by", target: parent.path, name: parent.name}) as parents
                 """, path=node_path)
 
@@ -632,7 +703,8 @@ class SynapseContextManager:
                 enriched_node["relationships"] = {
                     "contains": [r for r in rel_data["contains"] if r["target"] is not None],
                     "references": [r for r in rel_data["references"] if r["target"] is not None],
-                    "similar_to": [r for r in rel_data["similar"] if r["target"] is not None],
+                    "similar_to": sorted((r for r in rel_data["similar"] if r["target"] is not None),
+                                         key=lambda r: r["score"] or 0.0, reverse=True),
                     "contained_by": [r for r in rel_data["parents"] if r["target"] is not None]
                 }
 
@@ -680,17 +752,23 @@ class SynapseContextManager:
             if node.get("query_variant"):
                 match_entry["matched_query"] = node["query_variant"]
 
+            if node.get("span"):
+                match_entry.update(self._span_excerpt(node))
+
             synthesis["primary_matches"].append(match_entry)
 
         # Process medium relevance matches (condensed)
         for node in medium_relevance:
-            synthesis["secondary_matches"].append({
+            secondary_entry = {
                 "file": node["name"],
                 "path": node["path"],
                 "summary": node["summary"][:100] + "..." if len(node["summary"]) > 100 else node["summary"],
                 "smart_score": round(node.get("smart_score", 0), 2),
                 "match_type": node.get("match_type", "unknown")
-            })
+            }
+            if node.get("span"):
+                secondary_entry["lines"] = self._span_lines(node["span"])
+            synthesis["secondary_matches"].append(secondary_entry)
 
         # Extract related files from relationships
         all_related = set()
@@ -727,6 +805,25 @@ class SynapseContextManager:
 
         return synthesis
 
+    @staticmethod
+    def _span_lines(span: Dict) -> str:
+        """Line range of a vector match's chunk, from the span alone"""
+        return f"{span['start_line']}-{span['end_line']}"
+
+    def _span_excerpt(self, node: Dict) -> Dict[str, str]:
+        """Line range and text of the chunk a vector match was found in"""
+        span = node["span"]
+        lines = self._span_lines(span)
+        try:
+            # Nodes written by older versions still carry their content
+            content = node.get("content") or self.blobs.get(node.get("hash"))
+        except Exception:
+            content = None
+        if not content:
+            return {"lines": lines}
+        section = content.splitlines()[span["start_line"] - 1:span["end_line"]]
+        return {"lines": lines, "excerpt": "\n".join(section)}
+
     def _get_search_strategy_summary(self, nodes: List[Dict]) -> Dict[str, int]:
         """Summarize which search strategies found results"""
         strategy_counts = {}
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Embedding Cache for Synapse System
+==================================
+
+Persistent cache of embeddings keyed by (embedding model, sha256 of the
+text), kept in the embedding_cache table of vector_store.db. Unchanged
+text is never sent through the model twice, even after clear_embeddings
+or a graph rebuild gives every file a new Neo4j element id.
+
+The cache is bounded to max_entries rows; the least recently used rows
+are evicted first. Hit and miss totals are kept in vector_store_meta so
+they are visible across processes.
+"""
+
+import hashlib
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from sqlite_pool import get_pool
+
+
+def text_hash(text: str) -> str:
+    """Cache key for a text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """LRU embedding cache stored in SQLite (schema: VectorEngine.initialize_vector_store)"""
+
+    def __init__(self, sqlite_path: Path, max_entries: int = 20000):
+        self.sqlite_path = sqlite_path
+        self.max_entries = max_entries
+        self.db = get_pool(sqlite_path)
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Cached float32 vectors for the given text hashes; refreshes their LRU stamp"""
+        unique = list(dict.fromkeys(hashes))
+        if not unique:
+            return {}
+
+        found = {}
+        with self.db.transaction() as cursor:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                cursor.execute(f"""
+                    SELECT text_hash, vector FROM embedding_cache
+                    WHERE model = ? AND text_hash IN ({",".join("?" * len(chunk))})
+                """, [model] + chunk)
+                found.update((h, np.frombuffer(blob, dtype=np.float32)) for h, blob in cursor.fetchall())
+
+            now = time.time()
+            cursor.executemany("UPDATE embedding_cache SET last_used = ? WHERE model = ? AND text_hash = ?",
+                               [(now, model, h) for h in found])
+            self._count(cursor, hits=len(found), misses=len(unique) - len(found))
+        return found
+
+    def put_many(self, model: str, items: List[Tuple[str, np.ndarray]]):
+        """Store (text hash, vector) pairs, then evict down to max_entries"""
+        if not items:
+            return
+
+        now = time.time()
+        with self.db.transaction() as cursor:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO embedding_cache (model, text_hash, vector, last_used)
+                VALUES (?, ?, ?, ?)
+            """, [(model, h, np.asarray(vector, dtype=np.float32).tobytes(), now) for h, vector in items])
+
+            cursor.execute("SELECT COUNT(*) FROM embedding_cache")
+            excess = cursor.fetchone()[0] - self.max_entries
+            if excess > 0:
+                cursor.execute("""
+                    DELETE FROM embedding_cache WHERE rowid IN (
+                        SELECT rowid FROM embedding_cache ORDER BY last_used LIMIT ?
+                    )
+                """, (excess,))
+
+    def _count(self, cursor, hits: int, misses: int):
+        cursor.executemany("""
+            INSERT INTO vector_store_meta (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + excluded.value
+        """, [("cache_hits", hits), ("cache_misses", misses)])
+
+    def stats(self) -> Dict:
+        """Entry count and lifetime hit/miss totals"""
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(length(vector)), 0) FROM embedding_cache")
+            entries, size_bytes = cursor.fetchone()
+            cursor.execute("SELECT key, value FROM vector_store_meta WHERE key IN ('cache_hits', 'cache_misses')")
+            counters = {key: int(value) for key, value in cursor.fetchall()}
+
+        hits = counters.get("cache_hits", 0)
+        misses = counters.get("cache_misses", 0)
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "size_bytes": size_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0
+        }
+
+    def clear(self):
+        """Drop all cached embeddings"""
+        with self.db.transaction() as cursor:
+            cursor.execute("DELETE FROM embedding_cache")
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Embedding Server for Synapse System
+===================================
+
+One process holds the transformer model and serves embeddings over a Unix
+socket, so CLI calls and agents share a single loaded copy instead of each
+paying a multi-second cold start and ~2.3 GB of RAM.
+
+Requests arriving within a short window (SYNAPSE_EMBEDDING_BATCH_MS) are
+merged into one batch for the model. VectorEngine connects as a thin
+client when the socket answers, and loads the model in-process when it
+does not.
+
+Wire format, both directions: 4-byte big-endian header length, JSON
+header, then (responses only) a float32 row-major payload.
+
+    request   {"model": "...", "texts": [...]}        or {"ping": true}
+    response  {"model": "...", "shape": [n, dim]} + payload, or {"error": "..."}
+
+Usage: python embedding_server.py
+"""
+
+import json
+import os
+import queue
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+_HEADER = struct.Struct(">I")
+
+
+class EmbeddingServerError(Exception):
+    """The embedding server rejected a request"""
+
+
+def _send(sock: socket.socket, header: dict, payload: bytes = b""):
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Embedding server connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_header(sock: socket.socket) -> dict:
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return json.loads(_recv_exact(sock, size))
+
+
+class EmbeddingClient:
+    """Thin client for a running EmbeddingServer"""
+
+    def __init__(self, socket_path: Path, timeout: float = 60.0):
+        self.socket_path = Path(socket_path)
+        self.timeout = timeout
+
+    def _request(self, header: dict, timeout: float) -> Tuple[dict, socket.socket]:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(self.socket_path))
+            _send(sock, header)
+            response = _recv_header(sock)
+        except Exception:
+            sock.close()
+            raise
+        if "error" in response:
+            sock.close()
+            raise EmbeddingServerError(response["error"])
+        return response, sock
+
+    def ping(self, model: str) -> bool:
+        """True if a server is listening and serves model"""
+        if not self.socket_path.exists():
+            return False
+        try:
+            response, sock = self._request({"ping": True}, timeout=1.0)
+            sock.close()
+        except (OSError, ValueError, EmbeddingServerError):
+            return False
+        return response.get("model") == model
+
+    def embed(self, model: str, texts: List[str]) -> np.ndarray:
+        """Embed texts on the server; raises OSError or EmbeddingServerError on failure"""
+        response, sock = self._request({"model": model, "texts": texts}, timeout=self.timeout)
+        try:
+            rows, dim = response["shape"]
+            payload = _recv_exact(sock, rows * dim * 4)
+        finally:
+            sock.close()
+        return np.frombuffer(payload, dtype=np.float32).reshape(rows, dim).astype(np.float64)
+
+
+class EmbeddingServer:
+    """
+    Serves one VectorEngine's model. Each connection is handled on its own
+    thread; a single batcher thread runs the model on merged requests.
+    """
+
+    def __init__(self, engine, socket_path: Path, batch_window: float = 0.01, max_batch: int = 256):
+        self.engine = engine
+        self.socket_path = Path(socket_path)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.requests: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self.running = False
+        self.batches = 0
+        self.texts = 0
+
+    def serve_forever(self):
+        """Listen on the socket until stop() is called"""
+        if self.socket_path.exists():
+            if EmbeddingClient(self.socket_path).ping(self.engine.embedding_model):
+                raise RuntimeError(f"An embedding server is already listening on {self.socket_path}")
+            self.socket_path.unlink()  # stale socket from a crashed server
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(str(self.socket_path))
+        os.chmod(self.socket_path, 0o600)
+        listener.listen(64)
+        listener.settimeout(0.5)
+
+        self.running = True
+        batcher = threading.Thread(target=self._batch_loop, daemon=True)
+        batcher.start()
+        try:
+            while self.running:
+                try:
+                    conn, _ = listener.accept()
+                except socket.timeout:
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+
+    def stop(self):
+        self.running = False
+
+    def _handle(self, conn: socket.socket):
+        with conn:
+            try:
+                request = _recv_header(conn)
+                if request.get("ping"):
+                    _send(conn, {"model": self.engine.embedding_model, "batches": self.batches,
+                                 "texts": self.texts})
+                    return
+                if request.get("model") != self.engine.embedding_model:
+                    _send(conn, {"error": f"Server runs {self.engine.embedding_model}, not {request.get('model')}"})
+                    return
+
+                future = Future()
+                self.requests.put((request["texts"], future))
+                embeddings = future.result()
+                matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+                _send(conn, {"model": self.engine.embedding_model, "shape": list(matrix.shape)},
+                      matrix.tobytes())
+            except Exception as e:
+                try:
+                    _send(conn, {"error": str(e)})
+                except OSError:
+                    pass
+
+    def _batch_loop(self):
+        """Collect requests for batch_window seconds (or max_batch texts) and embed them together"""
+        while self.running:
+            try:
+                pending = [self.requests.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+
+            deadline = time.monotonic() + self.batch_window
+            count = len(pending[0][0])
+            while count < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                count += len(pending[-1][0])
+
+            texts = [text for request_texts, _ in pending for text in request_texts]
+            try:
+                embeddings, model = self.engine._embed_uncached(texts, self.engine.embedding_batch_size)
+                if model != self.engine.embedding_model:
+                    raise EmbeddingServerError(f"{self.engine.embedding_model} is not available on the server")
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts += len(texts)
+            start = 0
+            for request_texts, future in pending:
+                future.set_result(embeddings[start:start + len(request_texts)])
+                start += len(request_texts)
+
+
+def main():
+    """Run the embedding server for the configured EMBEDDING_MODEL"""
+    os.environ["SYNAPSE_EMBEDDING_SERVER"] = "0"  # the server itself must load the model
+    from vector_engine import VectorEngine
+
+    # Serve the configured model, which is also the one a pending migration embeds with
+    engine = VectorEngine(embedding_model=os.getenv("EMBEDDING_MODEL", "simple_tfidf"))
+    if engine.transformer_model is None:
+        print(f"❌ {engine.embedding_model} could not be loaded; nothing to serve")
+        return 1
+
+    server = EmbeddingServer(
+        engine,
+        engine.embedding_socket,
+        batch_window=float(os.getenv("SYNAPSE_EMBEDDING_BATCH_MS", 10)) / 1000,
+        max_batch=int(os.getenv("SYNAPSE_EMBEDDING_MAX_BATCH", 256))
+    )
+    signal.signal(signal.SIGTERM, lambda *_: server.stop())
+
+    print(f"🧠 Serving {engine.embedding_model} on {server.socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✓ Embedding server stopped ({server.texts} texts in {server.batches} batches)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
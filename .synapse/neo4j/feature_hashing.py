@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Feature-Hashing Embedder for Synapse System
+===========================================
+
+Deterministic bag-of-words embeddings for the simple_tfidf model: each
+term is hashed (CRC32) to one of `dim` buckets with a hash-derived sign,
+weighted by sublinear TF (1 + log tf) times IDF, and the row is
+L2-normalised. The same text and statistics always give the same vector.
+
+Document frequencies come from the term_document_frequency table that
+VectorEngine maintains in vector_store.db during ingestion. A batch of
+documents is embedded with one np.unique over integer (document, term)
+pairs and one np.bincount scatter-add; per-token Python work is a dict
+lookup, and each distinct term is hashed once.
+"""
+
+import re
+import zlib
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, List
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]{3,}")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased alphanumeric terms of three or more characters"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+@lru_cache(maxsize=1 << 18)
+def term_hash(term: str) -> int:
+    """Unsigned 32-bit hash of a term, stable across processes"""
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def idf_weights(document_frequencies: np.ndarray, documents: int) -> np.ndarray:
+    """Smoothed IDF: log((1 + N) / (1 + df)) + 1, so unseen terms weigh most"""
+    return np.log((1.0 + documents) / (1.0 + document_frequencies)) + 1.0
+
+
+class HashingEmbedder:
+    """Signed feature hashing with sublinear TF and IDF weighting"""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def embed(self, texts: List[str], document_frequency: Dict[str, int] = None,
+              documents: int = 0) -> np.ndarray:
+        """Embed texts into an (N, dim) float64 array of unit rows (zero rows for empty texts)"""
+        document_frequency = document_frequency or {}
+        token_lists = [tokenize(text) for text in texts]
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(texts))
+        matrix = np.zeros((len(texts), self.dim))
+        if lengths.sum() == 0:
+            return matrix
+
+        term_ids: Dict[str, int] = {}
+        inverse = np.fromiter((term_ids.setdefault(term, len(term_ids))
+                               for term in chain.from_iterable(token_lists)),
+                              dtype=np.int64, count=int(lengths.sum()))
+        vocab = list(term_ids)
+
+        # Term frequency per (document, term) pair
+        rows = np.repeat(np.arange(len(texts)), lengths)
+        pairs, counts = np.unique(rows * len(vocab) + inverse, return_counts=True)
+        pair_rows, pair_terms = np.divmod(pairs, len(vocab))
+
+        hashes = np.fromiter((term_hash(term) for term in vocab), dtype=np.int64, count=len(vocab))
+        buckets = hashes % self.dim
+        signs = np.where(hashes >> 31, -1.0, 1.0)
+        df = np.fromiter((document_frequency.get(term, 0) for term in vocab),
+                         dtype=np.float64, count=len(vocab))
+        term_weights = signs * idf_weights(df, documents)
+
+        weights = (1.0 + np.log(counts)) * term_weights[pair_terms]
+        flat = np.bincount(pair_rows * self.dim + buckets[pair_terms], weights=weights,
+                           minlength=len(texts) * self.dim)
+        matrix = flat.reshape(len(texts), self.dim)
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1.0)
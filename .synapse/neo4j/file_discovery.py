@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+File Discovery for Synapse System
+=================================
+
+One os.scandir walk per root that yields matching files as it finds
+them, for ingestion and any agent tool that scans a tree:
+
+    for path in walk_files([root], extensions=[".md", ".py"]):
+        ...
+
+Directories in IGNORED_DIRS (.git, node_modules, virtualenvs, caches)
+and anything matched by a .gitignore at or below the root are pruned
+before they are entered. All extensions are matched in the same pass.
+Symlinked directories are not followed, so link cycles cannot recur.
+
+.gitignore support covers the common syntax: comments, "!" negation,
+trailing "/" for directories, patterns anchored by a "/", "*", "?",
+"[...]" and "**". Deeper .gitignore files override shallower ones, and
+within a file the last matching pattern wins.
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+IGNORED_DIRS = frozenset({
+    ".git", ".hg", ".svn", "node_modules", ".venv", "venv", "__pycache__",
+    ".mypy_cache", ".pytest_cache", ".tox", ".idea", ".vscode",
+})
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Regex for one .gitignore glob, matched against '/'-separated relative paths"""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "/.*"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1:end]
+            regex += "[" + ("^" + body[1:] if body[:1] == "!" else body) + "]"
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+
+class IgnoreRules:
+    """Patterns of one .gitignore file, relative to the directory holding it"""
+
+    def __init__(self, lines: Iterable[str]):
+        # (regex, negated, directories only)
+        self.rules: List[Tuple[re.Pattern, bool, bool]] = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated or line.startswith("\\!") or line.startswith("\\#"):
+                line = line[1:]
+            directories_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            # A slash anywhere but the end anchors the pattern to this directory
+            anchored = "/" in line
+            regex = _glob_to_regex(line.lstrip("/"))
+            self.rules.append((re.compile(regex if anchored else "(?:.*/)?" + regex), negated, directories_only))
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["IgnoreRules"]:
+        try:
+            with open(os.path.join(directory, ".gitignore"), encoding="utf-8", errors="replace") as f:
+                rules = cls(f)
+        except OSError:
+            return None
+        return rules if rules.rules else None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if re-included by a negation, None if no pattern matches"""
+        for regex, negated, directories_only in reversed(self.rules):
+            if directories_only and not is_dir:
+                continue
+            if regex.fullmatch(rel_path):
+                return not negated
+        return None
+
+
+def _ignored(rules: List[Tuple[str, IgnoreRules]], path: str, is_dir: bool) -> bool:
+    """Whether the innermost matching .gitignore in rules ((directory, rules) pairs) ignores path"""
+    for directory, ignore in reversed(rules):
+        decision = ignore.match(os.path.relpath(path, directory).replace(os.sep, "/"), is_dir)
+        if decision is not None:
+            return decision
+    return False
+
+
+def walk_files(roots: Iterable[Path], extensions: Iterable[str] = None,
+               ignored_dirs: Iterable[str] = IGNORED_DIRS, gitignore: bool = True) -> Iterator[Path]:
+    """
+    Files below roots whose suffix is in extensions (all files when None),
+    yielded during the walk. Missing roots are skipped.
+    """
+    extensions = tuple(extensions) if extensions is not None else None
+    ignored_dirs = frozenset(ignored_dirs)
+
+    for root in roots:
+        root = os.fspath(root)
+        if not os.path.isdir(root):
+            continue
+        # (directory, .gitignore rules in effect there)
+        stack: List[Tuple[str, List[Tuple[str, IgnoreRules]]]] = [(root, [])]
+        while stack:
+            directory, rules = stack.pop()
+            if gitignore:
+                own = IgnoreRules.load(directory)
+                if own is not None:
+                    rules = rules + [(directory, own)]
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+
+            subdirectories = []
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if not is_dir and not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                if is_dir:
+                    if entry.name in ignored_dirs or (rules and _ignored(rules, entry.path, True)):
+                        continue
+                    subdirectories.append(entry.path)
+                elif extensions is None or entry.name.endswith(extensions):
+                    if not (rules and _ignored(rules, entry.path, False)):
+                        yield Path(entry.path)
+
+            # Popped in reverse, so subdirectories are visited in listing order
+            stack.extend((subdirectory, rules) for subdirectory in reversed(subdirectories))
+
+
+def is_ignored(path: Path, root: Path, ignored_dirs: Iterable[str] = IGNORED_DIRS,
+               gitignore: bool = True) -> bool:
+    """Whether walk_files([root]) would skip path, e.g. for a filesystem event"""
+    try:
+        parts = Path(path).relative_to(root).parts
+    except ValueError:
+        return True
+    ignored_dirs = frozenset(ignored_dirs)
+    if any(part in ignored_dirs for part in parts[:-1]):
+        return True
+    if not gitignore:
+        return False
+
+    rules: List[Tuple[str, IgnoreRules]] = []
+    directory = os.fspath(root)
+    for depth, part in enumerate(parts):
+        own = IgnoreRules.load(directory)
+        if own is not None:
+            rules.append((directory, own))
+        current = os.path.join(directory, part)
+        is_dir = depth < len(parts) - 1
+        if rules and _ignored(rules, current, is_dir):
+            return True
+        directory = current
+    return False
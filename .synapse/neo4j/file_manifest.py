@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+File Manifest for Synapse System
+================================
+
+What incremental ingestion last saw of each file, kept in the
+file_manifest table of vector_store.db:
+
+    path -> (size, mtime_ns, inode, sha256)
+
+A file whose stat tuple still matches is skipped without being opened.
+Any other file is read once, and only re-ingested if its sha256 changed;
+either way its row is refreshed, so a touched-but-identical file costs
+one read, once. The manifest also lists the files known to the graph, so
+deleted files are found without querying Neo4j.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+from sqlite_pool import get_pool
+
+# (size, mtime_ns, inode)
+StatKey = Tuple[int, int, int]
+
+
+def stat_key(file_path: Path) -> StatKey:
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+class FileManifest:
+    """path -> (stat key, sha256) rows (schema: VectorEngine.initialize_vector_store)"""
+
+    def __init__(self, sqlite_path: Path):
+        self.sqlite_path = sqlite_path
+        self.db = get_pool(sqlite_path)
+
+    def load(self) -> Dict[str, Tuple[StatKey, str]]:
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT path, size, mtime_ns, inode, sha256 FROM file_manifest")
+            return {row[0]: (tuple(row[1:4]), row[4]) for row in cursor.fetchall()}
+
+    def update(self, entries: Iterable[Tuple[str, StatKey, str]]):
+        """Record (path, stat key, sha256) for files that were ingested or found unchanged"""
+        with self.db.transaction() as cursor:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO file_manifest (path, size, mtime_ns, inode, sha256)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(path,) + tuple(key) + (sha256,) for path, key, sha256 in entries])
+
+    def remove(self, paths: Iterable[str]):
+        with self.db.transaction() as cursor:
+            cursor.executemany("DELETE FROM file_manifest WHERE path = ?", [(path,) for path in paths])
+
+    def clear(self):
+        with self.db.transaction() as cursor:
+            cursor.execute("DELETE FROM file_manifest")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+File Change Queue for Synapse System
+====================================
+
+Collects paths from filesystem events (watchdog observers call
+dispatch()) and hands them to the ingestion loop in micro-batches:
+
+    a batch is released once no event arrived for SYNAPSE_WATCH_DEBOUNCE_MS,
+    or SYNAPSE_WATCH_MAX_DELAY_MS after its first event during a steady stream
+
+An editor saving a file, a git checkout or a copy of a directory emits
+bursts of events for the same paths; those are coalesced into one set,
+so each file is re-ingested once per burst. Only events that can change
+content are queued: reading a file (opened / closed events on newer
+watchdog versions) or a directory's mtime changing along with an entry
+below it does not start a batch.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Set
+
+WATCH_DEBOUNCE_MS = int(os.getenv("SYNAPSE_WATCH_DEBOUNCE_MS", 500))
+WATCH_MAX_DELAY_MS = int(os.getenv("SYNAPSE_WATCH_MAX_DELAY_MS", 5000))
+
+# watchdog event types that are queued
+CHANGE_EVENTS = {"created", "modified", "deleted", "moved"}
+
+
+class ChangeQueue:
+    """Debounced set of changed paths; usable directly as a watchdog event handler"""
+
+    def __init__(self, debounce_ms: int = None, max_delay_ms: int = None):
+        self.debounce = (WATCH_DEBOUNCE_MS if debounce_ms is None else debounce_ms) / 1000
+        self.max_delay = (WATCH_MAX_DELAY_MS if max_delay_ms is None else max_delay_ms) / 1000
+        self._condition = threading.Condition()
+        self._paths: Set[Path] = set()
+        self._first_event = 0.0
+        self._last_event = 0.0
+
+    def dispatch(self, event):
+        """watchdog callback: queue the event's path, and a move's destination"""
+        if event.event_type not in CHANGE_EVENTS:
+            return
+        # Entries below a directory report their own changes; its creation,
+        # deletion or move still stands for everything below it
+        if event.is_directory and event.event_type == "modified":
+            return
+        self.add(event.src_path)
+        if getattr(event, "dest_path", None):
+            self.add(event.dest_path)
+
+    def add(self, path):
+        with self._condition:
+            now = time.monotonic()
+            if not self._paths:
+                self._first_event = now
+            self._last_event = now
+            self._paths.add(Path(os.fsdecode(path)))
+            self._condition.notify()
+
+    def next_batch(self, timeout: Optional[float] = None) -> Set[Path]:
+        """
+        Block until a batch is due and return it, or return an empty set
+        if nothing was queued within timeout seconds
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if self._paths:
+                    quiet_for = now - self._last_event
+                    pending_for = now - self._first_event
+                    if quiet_for >= self.debounce or pending_for >= self.max_delay:
+                        paths, self._paths = self._paths, set()
+                        return paths
+                    self._condition.wait(min(self.debounce - quiet_for, self.max_delay - pending_for))
+                elif deadline is not None and now >= deadline:
+                    return set()
+                else:
+                    self._condition.wait(None if deadline is None else deadline - now)
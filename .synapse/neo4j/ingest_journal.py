@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Ingestion Journal for Synapse System
+====================================
+
+Progress of each ingestion run, kept in vector_store.db so an
+interrupted run (Ctrl+C, a Neo4j error, an OOM while embedding) can be
+finished with `ingestion.py --resume` instead of starting over:
+
+    ingest_runs      run id, owner pid, start / finish time, status,
+                     batches committed
+    ingest_journal   per run and file: node id, whether the file was new,
+                     and the last stage completed (WRITTEN, EMBEDDED)
+
+Relationships are built once every file is written, so a file journaled
+at EMBEDDED still needs its edges, and one at WRITTEN also its vectors.
+A run that finishes drops its journal rows; one that is still "running"
+after its owner process has exited was interrupted. A run whose owner is
+alive is another ingestion in progress, and is never resumed.
+"""
+
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from sqlite_pool import get_pool
+
+# Stages of a file within a run
+WRITTEN = 1
+EMBEDDED = 2
+
+
+def process_alive(pid) -> bool:
+    """Whether pid names a running process (None: a run recorded before owners were)"""
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        return True
+    return True
+
+
+class IngestJournal:
+    """Run and per-file stage rows (schema: VectorEngine.initialize_vector_store)"""
+
+    def __init__(self, sqlite_path: Path):
+        self.sqlite_path = sqlite_path
+        self.db = get_pool(sqlite_path)
+
+    def begin(self) -> int:
+        with self.db.transaction() as cursor:
+            cursor.execute("INSERT INTO ingest_runs (pid, started_at, status) VALUES (?, ?, 'running')",
+                           (os.getpid(), datetime.now().isoformat()))
+            return cursor.lastrowid
+
+    def interrupted(self) -> List[Dict]:
+        """
+        Runs that never finished and whose owner process is gone (or is
+        this one: its runs are sequential), oldest first
+        """
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                SELECT r.run_id, r.pid, r.started_at, r.batches, COUNT(j.path) FROM ingest_runs r
+                LEFT JOIN ingest_journal j ON j.run_id = r.run_id
+                WHERE r.status = 'running'
+                GROUP BY r.run_id ORDER BY r.run_id
+            """)
+            return [{"run_id": row[0], "started_at": row[2], "batches": row[3], "files": row[4]}
+                    for row in cursor.fetchall() if row[1] == os.getpid() or not process_alive(row[1])]
+
+    def record(self, run_id: int, rows: Iterable[Tuple[str, str, bool]]):
+        """Files (path, node id, added) whose graph nodes were committed; counts as one batch"""
+        with self.db.transaction() as cursor:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO ingest_journal (run_id, path, node_id, added, stage)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(run_id, path, node_id, int(added), WRITTEN) for path, node_id, added in rows])
+            cursor.execute("UPDATE ingest_runs SET batches = batches + 1 WHERE run_id = ?", (run_id,))
+
+    def mark_embedded(self, run_id: int, paths: Iterable[str]):
+        with self.db.transaction() as cursor:
+            cursor.executemany("UPDATE ingest_journal SET stage = ? WHERE run_id = ? AND path = ?",
+                               [(EMBEDDED, run_id, path) for path in paths])
+
+    def entries(self, run_ids: Iterable[int]) -> Dict[str, Tuple[str, bool, int]]:
+        """path -> (node id, added, stage) over runs, later runs taking precedence"""
+        entries = {}
+        with self.db.transaction() as cursor:
+            for run_id in sorted(run_ids):
+                cursor.execute("SELECT path, node_id, added, stage FROM ingest_journal WHERE run_id = ?", (run_id,))
+                for path, node_id, added, stage in cursor.fetchall():
+                    entries[path] = (node_id, bool(added), stage)
+        return entries
+
+    def finish(self, run_ids: Iterable[int], status: str = "complete"):
+        """Close runs (the current one, plus any it resumed) and drop their file rows"""
+        run_ids = [(run_id,) for run_id in run_ids]
+        with self.db.transaction() as cursor:
+            cursor.executemany("UPDATE ingest_runs SET status = ?, finished_at = ? WHERE run_id = ?",
+                               [(status, datetime.now().isoformat(), run_id) for run_id, in run_ids])
+            cursor.executemany("DELETE FROM ingest_journal WHERE run_id = ?", run_ids)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Ingestion Stage Statistics for Synapse System
+=============================================
+
+Where an ingestion run spends its time. Each stage (discovery, the stat
+check, preparing files, blob / Neo4j / vector writes, embedding,
+relationships, ...) accumulates wall time, writer CPU time, items and
+bytes over every time it runs; files also report their own prepare
+latency (read, hash, summarize, and embed when a worker did it).
+
+A stage timed while another is open is a part of it and is kept as
+"parent/child" (the stages of the files reconcile re-ingests are
+"reconcile/prepare", ...). Top-level stages are shown as a share of the
+run, nested ones as a share of their parent.
+
+Every run_full_ingestion, and every --watch batch that changed the
+graph (marked "watch": true), appends its report to ingestion_stats.json
+in .synapse/neo4j, keeping the last SYNAPSE_INGEST_STATS_HISTORY, and
+`ingestion.py --stats` prints it next to the previous run so
+regressions show up as stage-by-stage changes.
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+STATS_HISTORY = int(os.getenv("SYNAPSE_INGEST_STATS_HISTORY", 20))
+
+
+class StageStats:
+    """Totals of one stage over a run"""
+
+    __slots__ = ("wall", "cpu", "items", "bytes", "calls")
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.items = 0
+        self.bytes = 0
+        self.calls = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            "wall_s": round(self.wall, 4),
+            "cpu_s": round(self.cpu, 4),
+            "items": self.items,
+            "bytes": self.bytes,
+            "calls": self.calls,
+            "items_per_s": round(self.items / self.wall, 1) if self.wall > 0 and self.items else None,
+            "mb_per_s": round(self.bytes / self.wall / 1e6, 2) if self.wall > 0 and self.bytes else None,
+        }
+
+
+class IngestStats:
+    """Stage timers and per-file latencies of one ingestion run"""
+
+    def __init__(self):
+        self.stages: Dict[str, StageStats] = {}
+        self.file_latencies: List[float] = []
+        # Keys of the stages currently being timed, outermost first
+        self._open: List[str] = []
+        self.started_at = datetime.now().isoformat()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._children_start = self._children_cpu()
+
+    @staticmethod
+    def _children_cpu() -> float:
+        times = os.times()
+        return times.children_user + times.children_system
+
+    def _key(self, name: str) -> str:
+        return f"{self._open[-1]}/{name}" if self._open else name
+
+    def _stage(self, key: str) -> StageStats:
+        if key not in self.stages:
+            self.stages[key] = StageStats()
+        return self.stages[key]
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0, nbytes: int = 0) -> Iterator[StageStats]:
+        """Time a block as (part of) stage name; the block may add to .items / .bytes"""
+        key = self._key(name)
+        stage = self._stage(key)
+        stage.items += items
+        stage.bytes += nbytes
+        self._open.append(key)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield stage
+        finally:
+            stage.wall += time.perf_counter() - wall
+            stage.cpu += time.process_time() - cpu
+            stage.calls += 1
+            self._open.pop()
+
+    def timed_iter(self, name: str, iterable: Iterable, size=None) -> Iterator:
+        """
+        Items of iterable, charging the time spent producing each one (not
+        the caller's loop body) to stage name; size(item) adds bytes
+        """
+        key = self._key(name)
+        stage = self._stage(key)
+        iterator = iter(iterable)
+        while True:
+            self._open.append(key)
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                stage.wall += time.perf_counter() - wall
+                stage.cpu += time.process_time() - cpu
+                stage.calls += 1
+                self._open.pop()
+            stage.items += 1
+            if size is not None:
+                stage.bytes += size(item) or 0
+            yield item
+
+    def file_done(self, seconds: Optional[float]):
+        if seconds is not None:
+            self.file_latencies.append(seconds)
+
+    def report(self, **fields) -> Dict:
+        """JSON-ready report; fields (counts, options) are included as given"""
+        latencies = np.array(self.file_latencies) * 1000
+        return {
+            "started_at": self.started_at,
+            "finished_at": datetime.now().isoformat(),
+            "wall_s": round(time.perf_counter() - self._wall_start, 4),
+            "cpu_s": round(time.process_time() - self._cpu_start, 4),
+            "worker_cpu_s": round(self._children_cpu() - self._children_start, 4),
+            **fields,
+            "stages": {name: stage.to_dict() for name, stage in self.stages.items()},
+            "file_latency_ms": {
+                "count": len(latencies),
+                "p50": round(float(np.percentile(latencies, 50)), 3) if len(latencies) else None,
+                "p95": round(float(np.percentile(latencies, 95)), 3) if len(latencies) else None,
+                "max": round(float(latencies.max()), 3) if len(latencies) else None,
+            },
+        }
+
+
+def save_report(path: Path, report: Dict, history: int = None) -> Optional[Dict]:
+    """Append report to the rolling history at path; returns the previous run's report"""
+    history = STATS_HISTORY if history is None else history
+    runs = load_history(path)
+    previous = runs[-1] if runs else None
+    runs = (runs + [report])[-max(history, 1):]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps({"runs": runs}, indent=2))
+    os.replace(tmp_path, path)
+    return previous
+
+
+def load_history(path: Path) -> List[Dict]:
+    try:
+        return json.loads(path.read_text()).get("runs", [])
+    except (OSError, ValueError, AttributeError):
+        return []
+
+
+def _change(current: Optional[float], previous: Optional[float]) -> str:
+    if current is None or not previous:
+        return ""
+    return f"{(current - previous) / previous:+.0%}"
+
+
+def _stage_tree(stages: Dict[str, Dict], parent: str = None) -> Iterator[Tuple[str, Dict, int]]:
+    """(key, stage, depth) with each stage's children after it, siblings by wall time"""
+    children = [(key, stage) for key, stage in stages.items()
+                if (key.rpartition("/")[0] or None) == parent]
+    for key, stage in sorted(children, key=lambda item: item[1]["wall_s"], reverse=True):
+        yield key, stage, key.count("/")
+        yield from _stage_tree(stages, key)
+
+
+def format_report(report: Dict, previous: Dict = None) -> List[str]:
+    """
+    Summary lines: stages by wall time, nested stages under their parent,
+    with the change against previous. The share column is of the run for
+    top-level stages and of the parent for nested ones, so each level sums
+    to at most 100%.
+    """
+    previous_stages = (previous or {}).get("stages", {})
+    lines = [f"⏱️  Ingestion took {report['wall_s']:.2f}s "
+             f"(CPU {report['cpu_s']:.2f}s writer, {report['worker_cpu_s']:.2f}s workers) "
+             f"{_change(report['wall_s'], (previous or {}).get('wall_s'))}".rstrip(),
+             f"   {'stage':<22}{'wall s':>9}{'cpu s':>9}{'items':>8}{'items/s':>10}{'MB/s':>8}{'vs last':>9}"]
+    stages = report["stages"]
+    for key, stage, depth in _stage_tree(stages):
+        parent = key.rpartition("/")[0]
+        total = (stages[parent]["wall_s"] if parent else report["wall_s"]) or 1.0
+        share = f"{stage['wall_s'] / total:.0%}" + (f" of {parent.rpartition('/')[2]}" if parent else "")
+        name = "  " * depth + key.rpartition("/")[2]
+        lines.append(
+            f"   {name:<22}{stage['wall_s']:>9.3f}{stage['cpu_s']:>9.3f}{stage['items']:>8}"
+            f"{stage['items_per_s'] if stage['items_per_s'] is not None else '-':>10}"
+            f"{stage['mb_per_s'] if stage['mb_per_s'] is not None else '-':>8}"
+            f"{_change(stage['wall_s'], previous_stages.get(key, {}).get('wall_s')):>9}"
+            f"  {share}")
+    latency = report["file_latency_ms"]
+    if latency["count"]:
+        lines.append(f"   per-file prepare latency: p50 {latency['p50']:.1f}ms, p95 {latency['p95']:.1f}ms, "
+                     f"max {latency['max']:.1f}ms over {latency['count']} files")
+    return lines
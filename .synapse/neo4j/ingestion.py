@@ -9,22 +9,162 @@ directories into Neo4j knowledge graph and prepares for vector indexing.
 The Feighnburm Constant: Acknowledge emergent complexity, map it systematically.
 """
 
+import io
 import os
 import json
 import hashlib
-import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Set, Tuple, Optional
 from datetime import datetime
 
+import numpy as np
+
 import requests
 from neo4j import GraphDatabase
 import redis
 from dotenv import load_dotenv
-from vector_engine import VectorEngine
+from vector_engine import VectorEngine, file_documents
+from file_manifest import FileManifest, stat_key
+from reference_index import ReferenceIndex
+from file_watch import ChangeQueue
+from file_discovery import is_ignored, walk_files
+from ingest_journal import EMBEDDED, IngestJournal
+from blob_store import BlobStore, compress
+from ingest_stats import IngestStats, format_report, save_report
+from context_manager import invalidate_cached_queries
+from chunking import chunk_node_id, iter_chunks, parent_node_id
 
 load_dotenv()
 
+# Files in flight per pipeline worker (backpressure for --workers)
+INGEST_PREFETCH = 4
+
+# Directories under .synapse/ and file types that are ingested
+TARGET_DIRS = ["instructions", "standards", "workflows", "templates"]
+FILE_EXTENSIONS = [".md", ".sh", ".py", ".txt"]
+
+
+def read_file_record(file_path: Path, synapse_root: Path, existing_hash: Optional[str],
+                     summarize: Callable[[str, str], str], engine: VectorEngine = None) -> Optional[Dict]:
+    """
+    Everything ingestion needs to know about a file, from one read: its
+    node properties, content hash, compressed content for the blob store
+    and (with an engine) the embeddings of its chunks. None when the
+    content still hashes to existing_hash. "seconds" is how long that
+    took, for the per-file latency stats.
+    """
+    started = time.perf_counter()
+    with open(file_path, "rb") as f:
+        data = f.read()
+    content_hash = hashlib.sha256(data).hexdigest()
+    if content_hash == existing_hash:
+        return None
+
+    content = data.decode("utf-8")
+    rel_path = str(file_path.relative_to(synapse_root))
+    summary = summarize(content, str(file_path))
+    record = {
+        "file_path": str(file_path),
+        "path": rel_path,
+        "name": file_path.name,
+        "summary": summary,
+        "content": content,
+        "hash": content_hash,
+        "size": len(content),
+        "type": file_path.suffix[1:] if file_path.suffix else 'unknown',
+        "word_count": len(content.split()),
+        "blob": compress(content),
+    }
+
+    if engine is not None:
+        try:
+            texts = [text for _, text, _ in embedding_texts_for(rel_path, summary, content)]
+            record["embeddings"] = engine.generate_embeddings(texts, strict=True)
+            record["space"] = engine.space.name
+        except Exception:
+            # The writer embeds whatever a worker could not
+            record.pop("embeddings", None)
+    record["seconds"] = time.perf_counter() - started
+    return record
+
+
+def embedding_texts_for(rel_path: str, summary: str,
+                        content: str) -> List[Tuple[Optional[int], str, Optional[Tuple[int, int]]]]:
+    """
+    (chunk index, text, (start line, end line)) to embed for a file: the
+    whole file (index and span None) when it fits in one chunk, otherwise
+    one entry per chunk (see chunking.py)
+    """
+    chunks = list(iter_chunks(io.StringIO(content), Path(rel_path).suffix[1:]))
+    if len(chunks) <= 1:
+        return [(None, f"{summary}\n\n{content}", None)]
+    return [(chunk.index, chunk.embedding_text(summary), (chunk.start_line, chunk.end_line)) for chunk in chunks]
+
+
+def _merge_file_nodes(tx, records: List[Dict]) -> List[Optional[str]]:
+    """
+    Write transaction: MERGE one SynapseFile node per record with a single
+    UNWIND statement, returning element ids in record order
+    """
+    result = tx.run("""
+        UNWIND $rows AS row
+        MERGE (f:SynapseFile {path: row.path})
+        SET f.name = row.name,
+            f.summary = row.summary,
+            f.content = null,
+            f.hash = row.hash,
+            f.size = row.size,
+            f.type = row.type,
+            f.updated_at = datetime(),
+            f.word_count = row.word_count
+        RETURN row.i AS i, elementId(f) AS node_id
+    """, rows=[
+        {"i": i, "path": record["path"], "name": record["name"], "summary": record["summary"],
+         "hash": record["hash"], "size": record["size"],
+         "type": record["type"], "word_count": record["word_count"]}
+        for i, record in enumerate(records)
+    ])
+    node_ids: List[Optional[str]] = [None] * len(records)
+    for row in result:
+        node_ids[row["i"]] = row["node_id"]
+    return node_ids
+
+
+def _batches(rows: List, size: int) -> Iterator[List]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _delete_file_nodes(tx, paths: List[str]) -> int:
+    """Write transaction: DETACH DELETE the SynapseFile nodes of a batch of paths"""
+    result = tx.run("""
+        UNWIND $paths AS path
+        MATCH (f:SynapseFile {path: path})
+        DETACH DELETE f
+        RETURN count(*) AS deleted
+    """, paths=paths)
+    row = result.single()
+    return row["deleted"] if row else 0
+
+
+# Per-process state of pipeline workers (see SynapseIngestion.prepared_files)
+_worker_state: Dict = {}
+
+
+def _init_worker(synapse_root: Path, summarize: Callable[[str, str], str], embed: bool):
+    _worker_state["synapse_root"] = synapse_root
+    _worker_state["summarize"] = summarize
+    # One engine (and model, or embedding server client) per worker process
+    _worker_state["engine"] = VectorEngine(synapse_root) if embed else None
+
+
+def _prepare_in_worker(file_path: Path, existing_hash: Optional[str]) -> Optional[Dict]:
+    return read_file_record(file_path, _worker_state["synapse_root"], existing_hash,
+                            _worker_state["summarize"], _worker_state["engine"])
+
+
 class SynapseIngestion:
     def __init__(self):
         self.synapse_root = Path.home() / ".synapse-system"
@@ -40,11 +180,37 @@ class SynapseIngestion:
         self.redis_client = None
         self.sqlite_path = self.synapse_root / "neo4j" / "vector_store.db"
         self.vector_engine = VectorEngine(self.synapse_root)
+        # Stat/hash of every ingested file, for change detection without Neo4j
+        self.manifest = FileManifest(self.vector_engine.sqlite_path)
+        # File contents by hash; nodes keep only f.hash
+        self.blobs = BlobStore(self.vector_engine.sqlite_path)
+        # Progress of the current run, for --resume (run_id is None outside run_full_ingestion)
+        self.journal = IngestJournal(self.vector_engine.sqlite_path)
+        self.run_id: Optional[int] = None
 
         # File tracking
         self.processed_files = set()
+        # Files discover_files found, kept current by watch mode
+        self.current_files: Set[Path] = set()
         self.file_hashes = {}
 
+        # Embedding jobs (node_id, rel_path, content_hash, text, chunk span)
+        # waiting for a batch; all chunks of a file are queued together
+        self.pending_embeddings: List[Tuple[str, str, str, str, Optional[Tuple[str, int, int]]]] = []
+        # space -> node_id -> vector for pending jobs embedded by pipeline workers
+        self.pending_vectors: Dict[str, Dict[str, np.ndarray]] = {}
+
+        # Stage timings of the current run, saved to stats_path (ingest_stats.py)
+        self.stats = IngestStats()
+        self.stats_path = self.synapse_root / ".synapse" / "neo4j" / "ingestion_stats.json"
+
+        # Files per writer-stage batch, sent to Neo4j as one UNWIND statement
+        self.write_batch_size = int(os.getenv("SYNAPSE_INGEST_BATCH", 64))
+
+        # SIMILAR_TO: nearest neighbours per file and the similarity they need
+        self.similarity_k = int(os.getenv("SYNAPSE_SIMILAR_K", 5))
+        self.similarity_threshold = float(os.getenv("SYNAPSE_SIMILAR_MIN", 0.3))
+
     def connect(self):
         """Initialize connections to Neo4j and Redis"""
         try:
@@ -82,21 +248,10 @@ class SynapseIngestion:
         self.vector_engine.initialize_vector_store()
         print("✓ Vector storage initialized")
 
-    def discover_files(self) -> List[Path]:
-        """Discover all relevant files in synapse-system directories"""
-        target_dirs = ["instructions", "standards", "workflows", "templates"]
-        files = []
-
-        for dir_name in target_dirs:
-            dir_path = self.synapse_root / ".synapse" / dir_name
-            if dir_path.exists():
-                files.extend(dir_path.rglob("*.md"))
-                files.extend(dir_path.rglob("*.sh"))
-                files.extend(dir_path.rglob("*.py"))
-                files.extend(dir_path.rglob("*.txt"))
-
-        print(f"✓ Discovered {len(files)} files for processing")
-        return files
+    def discover_files(self) -> Iterator[Path]:
+        """Discover all relevant files in synapse-system directories, in one walk (file_discovery.py)"""
+        return walk_files([self.synapse_root / ".synapse" / dir_name for dir_name in TARGET_DIRS],
+                          FILE_EXTENSIONS)
 
     def calculate_file_hash(self, file_path: Path) -> str:
         """Calculate SHA-256 hash of file content"""
@@ -106,7 +261,8 @@ class SynapseIngestion:
                 sha256_hash.update(byte_block)
         return sha256_hash.hexdigest()
 
-    def generate_ai_summary(self, content: str, file_path: str) -> str:
+    @staticmethod
+    def generate_ai_summary(content: str, file_path: str) -> str:
         """
         Generate AI summary of file content
         For now, returns a simple rule-based summary.
@@ -142,104 +298,332 @@ class SynapseIngestion:
 
         return " | ".join(summary_parts)
 
+    def prepare_file(self, file_path: Path, existing_hash: str = None) -> Optional[Dict]:
+        """
+        Read, hash, summarize and chunk one file without touching Neo4j.
+        Returns None when its content still hashes to existing_hash.
+        """
+        return read_file_record(file_path, self.synapse_root, existing_hash, self.generate_ai_summary)
+
     def process_file(self, file_path: Path) -> Optional[str]:
         """Process a single file and create Neo4j node"""
         try:
-            # Read file content
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # Calculate hash
-            content_hash = self.calculate_file_hash(file_path)
+            record = self.prepare_file(file_path)
+            return self.write_files([record])[0]
+        except Exception as e:
+            print(f"✗ Error processing {file_path}: {e}")
+            return None
 
-            # Generate summary
-            summary = self.generate_ai_summary(content, str(file_path))
+    def write_files(self, records: List[Dict]) -> List[Optional[str]]:
+        """
+        Writer stage: MERGE prepared files into Neo4j, write_batch_size per
+        UNWIND statement and transaction, and queue their embeddings.
+        Returns node ids in order. The caller flushes the queue, after
+        journaling the files, so their EMBEDDED mark is not overwritten.
+        """
+        # Contents first, so no node ever points at a missing blob
+        with self.stats.stage("blob_write", len(records), sum(len(record["blob"][1]) for record in records)):
+            self.blobs.put_many((record["hash"],) + record["blob"] + (record["size"],) for record in records)
+
+        node_ids: List[Optional[str]] = []
+        with self.stats.stage("neo4j_write", len(records)), self.driver.session() as session:
+            for start in range(0, len(records), self.write_batch_size):
+                node_ids.extend(session.execute_write(_merge_file_nodes,
+                                                      records[start:start + self.write_batch_size]))
+
+        for record, node_id in zip(records, node_ids):
+            if node_id is None:
+                continue
+            jobs = self.embedding_jobs(node_id, record["path"], record["hash"], record["summary"],
+                                       record["content"])
+            self.pending_embeddings.extend(jobs)
+            # Vectors already computed by a worker for the active space
+            if record.get("embeddings") is not None:
+                vectors = self.pending_vectors.setdefault(record["space"], {})
+                vectors.update((job[0], embedding) for job, embedding in zip(jobs, record["embeddings"]))
+            print(f"✓ Processed: {record['path']}")
+
+        return node_ids
+
+    def embedding_jobs(self, node_id: str, rel_path: str, content_hash: str, summary: str,
+                       content: str) -> List[Tuple[str, str, str, str, Optional[Tuple[str, int, int]]]]:
+        """Embedding jobs for one file (see embedding_texts_for); chunk jobs are linked to the file's node"""
+        return [
+            (node_id if index is None else chunk_node_id(node_id, index), rel_path, content_hash, text,
+             None if span is None else (node_id,) + span)
+            for index, text, span in embedding_texts_for(rel_path, summary, content)
+        ]
+
+    def flush_embeddings(self):
+        """
+        Embed and store all queued files with one batched model call per
+        vector space: the active one, plus the EMBEDDING_MODEL space while a
+        migration to it is pending, so it does not fall behind.
+        """
+        if not self.pending_embeddings:
+            return
+
+        jobs, self.pending_embeddings = self.pending_embeddings, []
+        precomputed, self.pending_vectors = self.pending_vectors, {}
+        engines = [self.vector_engine]
+        migration_engine = self.vector_engine.migration_engine()
+        if migration_engine is not None:
+            engines.append(migration_engine)
+
+        # Hashing embeddings weight terms by document frequency
+        if any(not engine.embedding_model.startswith("BAAI/") for engine in engines):
+            with self.stats.stage("term_statistics", len(jobs)):
+                self.vector_engine.update_term_statistics(file_documents((job[1], job[3]) for job in jobs))
+
+        files = len({job[1] for job in jobs})
+        for engine in engines:
+            try:
+                vectors = precomputed.get(engine.space.name, {})
+                missing = [job[3] for job in jobs if job[0] not in vectors]
+                with self.stats.stage("embed", len(missing), sum(len(text) for text in missing)):
+                    generated = iter(engine.generate_embeddings(missing, strict=True) if missing else [])
+                embeddings = [vectors[job[0]] if job[0] in vectors else next(generated) for job in jobs]
+                # Each file's vectors replace all it had before, e.g. chunks of a longer version
+                with self.stats.stage("vector_store", len(jobs)):
+                    engine.store_embeddings([
+                        (node_id, rel_path, content_hash, embedding)
+                        for (node_id, rel_path, content_hash, _, _), embedding in zip(jobs, embeddings)
+                    ], chunks=[job[4] for job in jobs], replace=True)
+                print(f"✓ Embedded {files} files, {len(jobs)} vectors ({engine.space.name})")
+                if engine is self.vector_engine and self.run_id is not None:
+                    self.journal.mark_embedded(self.run_id, {job[1] for job in jobs})
+            except Exception as e:
+                print(f"⚠ Embedding failed for {len(jobs)} files ({engine.space.name}): {e}")
+
+    def embedding_texts(self, nodes: List[Tuple[str, str]]) -> Dict[str, str]:
+        """
+        Embedding text (as built by embedding_jobs) for (node_id, path) pairs
+        still in the graph; chunk ids get the text of their chunk
+        """
+        with self.driver.session() as session:
+            result = session.run("""
+                MATCH (f:SynapseFile) WHERE elementId(f) IN $ids
+                RETURN elementId(f) AS id, f.path AS path, f.hash AS hash, f.summary AS summary
+            """, ids=list({parent_node_id(node_id) for node_id, _ in nodes}))
+            records = list(result)
+        contents = self.blobs.get_many(record["hash"] for record in records)
+        texts = {}
+        for record in records:
+            if record["hash"] not in contents:
+                continue
+            for node_id, _, _, text, _ in self.embedding_jobs(record["id"], record["path"], record["hash"],
+                                                              record["summary"], contents[record["hash"]]):
+                texts[node_id] = text
+        return {node_id: texts[node_id] for node_id, _ in nodes if node_id in texts}
 
-            # Relative path from synapse root
-            rel_path = file_path.relative_to(self.synapse_root)
+    def migrate_embeddings(self) -> bool:
+        """
+        Embed every file into the EMBEDDING_MODEL vector space while the
+        active space keeps serving searches, and switch searches over once
+        the new space is complete. Safe to interrupt and rerun.
+        """
+        migration_engine = self.vector_engine.migration_engine()
+        if migration_engine is None:
+            print(f"✓ {self.vector_engine.space.name} is already the active vector space")
+            return True
 
-            # Create Neo4j node
-            with self.driver.session() as session:
-                result = session.run("""
-                    MERGE (f:SynapseFile {path: $path})
-                    SET f.name = $name,
-                        f.summary = $summary,
-                        f.content = $content,
-                        f.hash = $hash,
-                        f.size = $size,
-                        f.type = $type,
-                        f.updated_at = datetime(),
-                        f.word_count = $word_count
-                    RETURN elementId(f) as node_id
-                """,
-                path=str(rel_path),
-                name=file_path.name,
-                summary=summary,
-                content=content,
-                hash=content_hash,
-                size=len(content),
-                type=file_path.suffix[1:] if file_path.suffix else 'unknown',
-                word_count=len(content.split())
-                )
-
-                record = result.single()
-                if record:
-                    node_id = record["node_id"]
-
-                    # Generate and store vector embedding
-                    try:
-                        # Use content + summary for richer embeddings
-                        embedding_text = f"{summary}\n\n{content}"
-                        embedding = self.vector_engine.generate_embedding(embedding_text, str(file_path))
-                        self.vector_engine.store_embedding(node_id, str(rel_path), content_hash, embedding)
-                        print(f"✓ Processed: {rel_path} (with embedding)")
-                    except Exception as e:
-                        print(f"⚠ Processed: {rel_path} (embedding failed: {e})")
+        if not self.connect():
+            print("✗ Failed to establish connections")
+            return False
 
-                    return node_id
+        self.migrate_node_content()
+        print(f"🔄 Migrating embeddings: {self.vector_engine.space.name} → {migration_engine.space.name}")
+        result = migration_engine.migrate_space(
+            self.embedding_texts,
+            progress=lambda covered, total: print(f"   {covered}/{total} files embedded", end="\r", flush=True)
+        )
+        print()
 
-        except Exception as e:
-            print(f"✗ Error processing {file_path}: {e}")
-            return None
+        if not result["activated"]:
+            print(f"⚠ {result['covered']}/{result['total']} files embedded; "
+                  f"{self.vector_engine.space.name} stays active. Re-run ingestion, then migrate again.")
+            return False
+        print(f"✅ {result['space']} is now the active vector space ({result['embedded']} files embedded)")
+        print("   Run 'synapse vectors compact' to drop the previous space")
+        return True
 
-    def create_relationships(self):
-        """Create relationships between files based on content and structure"""
+    def migrate_node_content(self) -> int:
+        """
+        Move content still stored on SynapseFile nodes (by older versions)
+        into the blob store, write_batch_size nodes at a time. Nodes without
+        a hash get the hash of their content. Returns the number of nodes
+        moved.
+        """
+        moved = 0
+        with self.driver.session() as session:
+            while True:
+                result = session.run("""
+                    MATCH (f:SynapseFile) WHERE f.content IS NOT NULL
+                    RETURN elementId(f) AS id, f.hash AS hash, f.content AS content
+                    LIMIT $limit
+                """, limit=self.write_batch_size)
+                rows = [{"id": record["id"], "content": record["content"],
+                         "hash": record["hash"] or hashlib.sha256(record["content"].encode("utf-8")).hexdigest()}
+                        for record in result]
+                if not rows:
+                    break
+                self.blobs.put_many((row["hash"],) + compress(row["content"]) + (len(row["content"]),)
+                                    for row in rows)
+                # By element id, so every node read in this pass loses its content
+                session.run("""
+                    UNWIND $rows AS row
+                    MATCH (f:SynapseFile) WHERE elementId(f) = row.id
+                    SET f.hash = row.hash
+                    REMOVE f.content
+                """, rows=[{"id": row["id"], "hash": row["hash"]} for row in rows])
+                moved += len(rows)
+        if moved:
+            print(f"✓ Moved the content of {moved} nodes to the blob store")
+        return moved
+
+    def ensure_graph_schema(self):
+        """Index SynapseFile.path, which every MERGE and UNWIND ... MATCH looks nodes up by"""
         with self.driver.session() as session:
-            # First, clear existing relationships to avoid duplicates
-            session.run("MATCH ()-[r:CONTAINS|REFERENCES|SIMILAR_TO]->() DELETE r")
+            try:
+                session.run("""
+                    CREATE CONSTRAINT synapse_file_path IF NOT EXISTS
+                    FOR (f:SynapseFile) REQUIRE f.path IS UNIQUE
+                """)
+            except Exception as e:
+                # Graphs holding duplicate paths can still get a plain index
+                print(f"⚠ Could not create unique path constraint: {e}")
+                session.run("CREATE INDEX synapse_file_path_index IF NOT EXISTS FOR (f:SynapseFile) ON (f.path)")
 
-            # Create directory containment relationships (parent dir contains child file)
-            session.run("""
-                MATCH (child:SynapseFile)
-                WHERE child.path CONTAINS '/'
-                WITH child, substring(child.path, 0, size(child.path) - size(split(child.path, '/')[-1]) - 1) as parent_path
-                MATCH (parent:SynapseFile {path: parent_path})
-                MERGE (parent)-[:CONTAINS]->(child)
-            """)
-
-            # Create relationships based on file references (more precise)
-            session.run("""
-                MATCH (a:SynapseFile), (b:SynapseFile)
-                WHERE a.path <> b.path
-                AND (
-                    a.content CONTAINS b.path
-                    OR a.content CONTAINS b.name
-                    OR (size(b.name) > 5 AND a.content CONTAINS substring(b.name, 0, size(b.name)-3))
-                )
-                MERGE (a)-[:REFERENCES]->(b)
-            """)
-
-            # Create type-based grouping relationships
-            session.run("""
-                MATCH (a:SynapseFile), (b:SynapseFile)
-                WHERE a.path <> b.path
-                AND a.type = b.type
-                AND a.type IN ['md', 'py', 'sh']
-                AND split(a.path, '/')[0] = split(b.path, '/')[0]
-                MERGE (a)-[:SIMILAR_TO]->(b)
-            """)
+    def create_relationships(self, references: Dict[str, Set[str]], added: Iterable[str] = (),
+                             unchanged: Dict[str, Optional[str]] = None):
+        """
+        Update relationships for the files written in this run.
+
+        references maps each written file to the paths its content refers
+        to (found with reference_index.py while writing); their outgoing
+        REFERENCES are replaced. Files added in this run can also be
+        referenced by unchanged files (path -> content hash), which are
+        scanned for the new files' patterns only. That scan still covers
+        every unchanged file, but reads their content from the blob store
+        in batches rather than from disk; only files without a stored blob
+        are opened. Edges of deleted files went with their nodes.
+        """
+        paths = sorted(references)
+
+        edges = [{"source": source, "target": target}
+                 for source in paths for target in sorted(references[source])]
+        added = sorted(added)
+        if added and unchanged:
+            index = ReferenceIndex(added)
+            for batch in _batches(sorted(unchanged), self.write_batch_size):
+                contents = self.blobs.get_many(unchanged[rel_path] for rel_path in batch if unchanged[rel_path])
+                for rel_path in batch:
+                    content = contents.get(unchanged[rel_path])
+                    if content is None:
+                        try:
+                            content = (self.synapse_root / rel_path).read_text(encoding="utf-8")
+                        except (OSError, UnicodeDecodeError):
+                            continue
+                    edges.extend({"source": rel_path, "target": target}
+                                 for target in sorted(index.references(rel_path, content)))
 
-            print("✓ Created structural and semantic relationships")
+        with self.driver.session() as session:
+            for batch in _batches(paths, self.write_batch_size):
+                # Create directory containment relationships (parent dir contains child file)
+                session.run("""
+                    UNWIND $paths AS path
+                    MATCH (child:SynapseFile {path: path})
+                    WHERE child.path CONTAINS '/'
+                    WITH child, substring(child.path, 0, size(child.path) - size(split(child.path, '/')[-1]) - 1) as parent_path
+                    MATCH (parent:SynapseFile {path: parent_path})
+                    MERGE (parent)-[:CONTAINS]->(child)
+                """, paths=batch)
+
+                # References found in the previous version of these files
+                session.run("""
+                    UNWIND $paths AS path
+                    MATCH (:SynapseFile {path: path})-[r:REFERENCES]->()
+                    DELETE r
+                """, paths=batch)
+
+            for batch in _batches(edges, self.write_batch_size):
+                session.run("""
+                    UNWIND $edges AS edge
+                    MATCH (a:SynapseFile {path: edge.source})
+                    MATCH (b:SynapseFile {path: edge.target})
+                    MERGE (a)-[:REFERENCES]->(b)
+                """, edges=batch)
+
+        print(f"✓ Updated relationships for {len(paths)} files ({len(edges)} references)")
+
+    def update_similarity_graph(self, node_ids: List[str]):
+        """
+        Point the SIMILAR_TO edges of node_ids at their similarity_k nearest
+        neighbours by stored embedding, at least similarity_threshold
+        similar, with the similarity as the edge's score. The reverse edge
+        is added when the node ranks among the neighbour's k nearest, so
+        the graph keeps O(n * k) edges as files come and go. Neighbours that
+        lost an edge to a changed or deleted file get it back when they are
+        next written, or on --force.
+        """
+        with self.driver.session() as session:
+            # Unscored edges are left from the same-type cliques of older versions
+            legacy = session.run("""
+                MATCH ()-[r:SIMILAR_TO]->() WHERE r.score IS NULL
+                WITH r LIMIT 1
+                RETURN count(r) AS legacy
+            """).single()
+            if legacy and legacy["legacy"]:
+                session.run("MATCH ()-[r:SIMILAR_TO]->() WHERE r.score IS NULL DELETE r")
+                node_ids = [record["id"] for record in session.run("MATCH (f:SynapseFile) RETURN elementId(f) AS id")]
+                print("🔄 Replacing same-type SIMILAR_TO edges with the embedding kNN graph")
+
+        neighbors = self.vector_engine.nearest_neighbors(node_ids, self.similarity_k, self.similarity_threshold)
+        edges = [{"source": node_id, "target": other, "score": float(score)}
+                 for node_id, ranked in neighbors.items() for other, score in ranked]
+        reverse = [{"source": edge["target"], "target": edge["source"], "score": edge["score"]} for edge in edges]
+
+        with self.driver.session() as session:
+            for batch in _batches(node_ids, self.write_batch_size):
+                session.run("""
+                    UNWIND $ids AS id
+                    MATCH (f:SynapseFile)-[r:SIMILAR_TO]-()
+                    WHERE elementId(f) = id
+                    DELETE r
+                """, ids=batch)
+
+            for batch in _batches(edges, self.write_batch_size):
+                session.run("""
+                    UNWIND $edges AS edge
+                    MATCH (a:SynapseFile) WHERE elementId(a) = edge.source
+                    MATCH (b:SynapseFile) WHERE elementId(b) = edge.target
+                    MERGE (a)-[r:SIMILAR_TO]->(b)
+                    SET r.score = edge.score
+                """, edges=batch)
+
+            for batch in _batches(reverse, self.write_batch_size):
+                session.run("""
+                    UNWIND $edges AS edge
+                    MATCH (a:SynapseFile) WHERE elementId(a) = edge.source
+                    MATCH (b:SynapseFile) WHERE elementId(b) = edge.target
+                    OPTIONAL MATCH (a)-[existing:SIMILAR_TO]->()
+                    WITH a, b, edge, count(existing) AS degree, min(existing.score) AS weakest
+                    WHERE degree < $k OR edge.score > weakest
+                    MERGE (a)-[r:SIMILAR_TO]->(b)
+                    SET r.score = edge.score
+                """, edges=batch, k=self.similarity_k)
+
+                # Several reverse edges may have reached one node: keep its k best
+                session.run("""
+                    UNWIND $ids AS id
+                    MATCH (a:SynapseFile)-[r:SIMILAR_TO]->()
+                    WHERE elementId(a) = id
+                    WITH a, r ORDER BY r.score DESC
+                    WITH a, collect(r) AS ranked
+                    FOREACH (r IN ranked[$k..] | DELETE r)
+                """, ids=list({edge["source"] for edge in batch}), k=self.similarity_k)
+
+        print(f"✓ Linked {len(neighbors)} files to their nearest neighbours ({len(edges)} SIMILAR_TO edges)")
 
     def update_ingestion_metadata(self):
         """Update metadata about the ingestion process"""
@@ -279,51 +663,146 @@ class SynapseIngestion:
             print(f"Warning: Could not retrieve existing hashes: {e}")
         return existing_hashes
 
-    def remove_deleted_files(self, current_files: List[Path]):
-        """Remove nodes for files that no longer exist"""
+    def remove_deleted_files(self, current_files: List[Path], known_paths: Iterable[str] = None) -> int:
+        """
+        Remove nodes for files that no longer exist. known_paths (the
+        manifest) saves listing every SynapseFile path from Neo4j.
+        """
         current_paths = set(str(f.relative_to(self.synapse_root)) for f in current_files)
+        deleted_paths = set()
 
         try:
             with self.driver.session() as session:
-                # Get all existing file paths
-                result = session.run("MATCH (f:SynapseFile) RETURN f.path as path")
-                existing_paths = {record["path"] for record in result}
+                if known_paths is None:
+                    # Get all existing file paths
+                    result = session.run("MATCH (f:SynapseFile) RETURN f.path as path")
+                    known_paths = {record["path"] for record in result}
 
                 # Find deleted files
-                deleted_paths = existing_paths - current_paths
+                deleted_paths = set(known_paths) - current_paths
 
                 if deleted_paths:
                     print(f"🗑️  Removing {len(deleted_paths)} deleted files...")
-                    for path in deleted_paths:
-                        session.run("""
-                            MATCH (f:SynapseFile {path: $path})
-                            DETACH DELETE f
-                        """, path=path)
-
-                        # Also remove from vector storage
-                        conn = sqlite3.connect(self.sqlite_path)
-                        cursor = conn.cursor()
-                        cursor.execute("DELETE FROM vector_metadata WHERE file_path = ?", (path,))
-                        cursor.execute("DELETE FROM vectors WHERE neo4j_node_id IN (SELECT neo4j_node_id FROM vector_metadata WHERE file_path = ?)", (path,))
-                        conn.commit()
-                        conn.close()
+                    deleted_paths = sorted(deleted_paths)
+                    for start in range(0, len(deleted_paths), self.write_batch_size):
+                        session.execute_write(_delete_file_nodes,
+                                              deleted_paths[start:start + self.write_batch_size])
+
+                    # Also remove from vector storage
+                    self.vector_engine.remove_embeddings(list(deleted_paths))
+                    self.manifest.remove(deleted_paths)
 
                     print(f"✓ Removed {len(deleted_paths)} deleted files")
         except Exception as e:
             print(f"Warning: Could not clean up deleted files: {e}")
+        return len(deleted_paths)
+
+    def prepared_files(self, files: List[Path], existing_hashes: Dict[str, str],
+                       workers: int = 1) -> Iterator[Tuple[Path, object]]:
+        """
+        (file_path, record) for every file: the prepare_file record, None
+        for an unchanged file, or the exception raised while reading it.
+
+        With several workers, files are prepared in a process pool and
+        arrive in completion order. At most workers * INGEST_PREFETCH files
+        are in flight, so a slow writer stalls the readers instead of
+        piling up file contents in memory. Workers also embed the files
+        when the active model is a transformer; the hashing embedder stays
+        in the writer, which owns the term statistics it depends on.
+        """
+        def existing(file_path: Path) -> Optional[str]:
+            return existing_hashes.get(str(file_path.relative_to(self.synapse_root)))
+
+        if workers <= 1:
+            for file_path in files:
+                try:
+                    yield file_path, self.prepare_file(file_path, existing(file_path))
+                except Exception as e:
+                    yield file_path, e
+            return
+
+        embed = self.vector_engine.embedding_model.startswith("BAAI/")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.synapse_root, self.generate_ai_summary, embed)) as pool:
+            in_flight = {}
+
+            def completed():
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path = in_flight.pop(future)
+                    try:
+                        yield file_path, future.result()
+                    except Exception as e:
+                        yield file_path, e
+
+            for file_path in files:
+                if len(in_flight) >= workers * INGEST_PREFETCH:
+                    yield from completed()
+                in_flight[pool.submit(_prepare_in_worker, file_path, existing(file_path))] = file_path
+            while in_flight:
+                yield from completed()
+
+    def run_full_ingestion(self, force_refresh: bool = False, workers: int = 1, resume: bool = False,
+                           show_stats: bool = False):
+        """
+        Run the complete ingestion process with incremental updates.
+
+        Files flow through a staged pipeline: prepared_files reads, hashes,
+        summarizes (and with a transformer model embeds) them, in a process
+        pool when workers > 1, and this process is the single writer that
+        batches Neo4j MERGEs and vector store writes.
+
+        Each committed batch is journaled (ingest_journal.py). With resume,
+        files an interrupted run (one whose process has exited) already wrote are not read again: only
+        their missing vectors and relationships are built, then a
+        consistency pass (reconcile) repairs whatever else disagrees.
 
-    def run_full_ingestion(self, force_refresh: bool = False):
-        """Run the complete ingestion process with incremental updates"""
+        Time, CPU and throughput per stage are appended to stats_path
+        (ingest_stats.py); show_stats prints them against the last run.
+        """
         print("🧠 Starting Synapse System Ingestion...")
+        self.stats = IngestStats()
 
         if not self.connect():
             print("✗ Failed to establish connections")
             return False
 
         self.initialize_sqlite()
-
-        # Get existing file hashes for change detection
-        existing_hashes = {} if force_refresh else self.get_existing_file_hashes()
+        self.ensure_graph_schema()
+        self.migrate_node_content()
+
+        interrupted = self.journal.interrupted()
+        resumed = interrupted if resume else []
+        if resume and not interrupted:
+            print("ℹ️  No interrupted ingestion run to resume")
+        elif interrupted and not resume:
+            print(f"⚠️  Ingestion run {interrupted[-1]['run_id']} was interrupted; "
+                  f"'ingestion.py --resume' finishes it")
+        if resumed and force_refresh:
+            print("⏯️  Resuming instead of refreshing: the interrupted run's progress is kept")
+            force_refresh = False
+
+        # Change detection: the manifest's stat keys and hashes, or the
+        # hashes stored in Neo4j until a first run has filled the manifest
+        manifest = {} if force_refresh else self.manifest.load()
+        if manifest:
+            existing_hashes = {path: sha256 for path, (_, sha256) in manifest.items()}
+        else:
+            existing_hashes = {} if force_refresh else self.get_existing_file_hashes()
+
+        # Journaled files: those with vectors only need edges; the others are written again
+        recovered: Dict[str, Tuple[str, bool]] = {}
+        if resumed:
+            entries = self.journal.entries(run["run_id"] for run in resumed)
+            for path, (node_id, added, stage) in entries.items():
+                if stage >= EMBEDDED:
+                    recovered[path] = (node_id, added)
+                else:
+                    manifest.pop(path, None)
+                    existing_hashes.pop(path, None)
+            print(f"⏯️  Resuming {len(resumed)} interrupted run(s) after {sum(run['batches'] for run in resumed)} "
+                  f"batches: {len(entries)} files written, {len(entries) - len(recovered)} still need vectors")
+        self.run_id = self.journal.begin()
 
         if force_refresh:
             print("🔄 Force refresh: clearing all existing data...")
@@ -332,49 +811,333 @@ class SynapseIngestion:
                 session.run("MATCH (n:SynapseMetadata) DELETE n")
             # Clear vector storage
             self.vector_engine.clear_embeddings()
+            self.manifest.clear()
 
         # Discover and process files
-        files = self.discover_files()
+        # Deletions and reference targets need the complete file set
+        with self.stats.stage("discover") as stage:
+            files = list(self.discover_files())
+            stage.items += len(files)
+        print(f"✓ Discovered {len(files)} files for processing")
+
+        self.current_files = set(files)
 
         # Remove deleted files (unless force refresh already cleared everything)
         if not force_refresh:
-            self.remove_deleted_files(files)
+            with self.stats.stage("remove_deleted"):
+                self.remove_deleted_files(files, manifest.keys() if manifest else None)
+
+        counts = self.ingest_files(files, files, manifest, existing_hashes, workers, recovered)
+        if resume:
+            with self.stats.stage("reconcile"):
+                self.reconcile(files, workers)
+
+        # Contents no file has any more
+        with self.stats.stage("prune_blobs"):
+            pruned = self.blobs.prune()
+        if pruned:
+            print(f"✓ Pruned {pruned} unreferenced content blobs")
 
+        # Update metadata
+        with self.stats.stage("metadata"):
+            self.update_ingestion_metadata()
+        run_id = self.run_id
+        self.journal.finish([self.run_id] + [run["run_id"] for run in resumed])
+        self.run_id = None
+
+        print(f"✅ Ingestion complete:")
+        print(f"   📄 New files processed: {counts['processed']}")
+        print(f"   🔄 Files updated: {counts['updated']}")
+        print(f"   ⏭️  Files skipped (unchanged): {counts['skipped']}")
+        print(f"   📊 Total files in system: {len(self.processed_files) + counts['skipped']}")
+
+        report = self.stats.report(run_id=run_id, workers=workers, force_refresh=force_refresh, resume=resume,
+                                   files={key: counts[key] for key in ("processed", "updated", "skipped")})
+        previous = self.save_stats(report)
+        if show_stats:
+            for line in format_report(report, previous):
+                print(line)
+
+        return True
+
+    def save_stats(self, report: Dict) -> Optional[Dict]:
+        """Append report to stats_path; returns the previous report"""
+        try:
+            return save_report(self.stats_path, report)
+        except OSError as e:
+            print(f"⚠ Could not save ingestion stats: {e}")
+            return None
+
+    def ingest_files(self, files: List[Path], candidates: Iterable[Path], manifest: Dict,
+                     existing_hashes: Dict[str, str], workers: int = 1,
+                     recovered: Dict[str, Tuple[str, bool]] = None) -> Dict:
+        """
+        Ingest the candidates that changed since the manifest was taken,
+        then update their relationships and SIMILAR_TO neighbours. files
+        are all current files, the targets references are resolved against.
+        recovered maps files an interrupted run wrote and embedded to
+        (node id, added); they only get their relationships.
+
+        Returns the processed / updated / skipped counts and the paths
+        written ("written") and, of those, new to the graph ("added").
+        """
         files_processed = 0
         files_updated = 0
         files_skipped = 0
 
-        for file_path in files:
-            rel_path = str(file_path.relative_to(self.synapse_root))
-            current_hash = self.calculate_file_hash(file_path)
-
-            # Check if file has changed
-            if rel_path in existing_hashes and existing_hashes[rel_path] == current_hash:
+        # Files whose size, mtime and inode are unchanged are not opened
+        stat_keys: Dict[str, Tuple[int, int, int]] = {}
+        changed: List[Path] = []
+        with self.stats.stage("stat_check") as stage:
+            for file_path in candidates:
+                stage.items += 1
+                rel_path = str(file_path.relative_to(self.synapse_root))
+                try:
+                    key = stat_key(file_path)
+                except OSError:
+                    continue
+                entry = manifest.get(rel_path)
+                if entry is not None and entry[0] == key:
+                    files_skipped += 1
+                    continue
+                stat_keys[rel_path] = key
+                changed.append(file_path)
+        if workers > 1:
+            print(f"⚙️  Preparing files with {workers} worker processes")
+
+        batch: List[Dict] = []
+        # Paths referenced by each written file, against every current file
+        references: Dict[str, Set[str]] = {}
+        reference_index = None
+        written_nodes: List[str] = []
+        recovered = recovered or {}
+
+        def find_references(rel_path: str, content: str):
+            nonlocal reference_index
+            with self.stats.stage("reference_scan", 1, len(content)):
+                if reference_index is None:
+                    reference_index = ReferenceIndex(str(f.relative_to(self.synapse_root)) for f in files)
+                references[rel_path] = reference_index.references(rel_path, content)
+
+        def write_batch():
+            nonlocal files_processed, files_updated
+            try:
+                node_ids = self.write_files(batch)
+            except Exception as e:
+                print(f"✗ Error writing {len(batch)} files: {e}")
+                node_ids = [None] * len(batch)
+            written = []
+            journaled = []
+            for record, node_id in zip(batch, node_ids):
+                if node_id:
+                    self.processed_files.add(record["file_path"])
+                    written.append((record["path"], stat_keys[record["path"]], record["hash"]))
+                    journaled.append((record["path"], node_id, record["path"] not in existing_hashes))
+                    find_references(record["path"], record["content"])
+                    written_nodes.append(node_id)
+                    if record["path"] in existing_hashes:
+                        files_updated += 1
+                    else:
+                        files_processed += 1
+            with self.stats.stage("bookkeeping", len(written)):
+                self.manifest.update(written)
+                if self.run_id is not None and journaled:
+                    self.journal.record(self.run_id, journaled)
+            batch.clear()
+            # Only once journaled at WRITTEN, so mark_embedded can move them on
+            if len(self.pending_embeddings) >= self.vector_engine.embedding_batch_size:
+                self.flush_embeddings()
+
+        unchanged = []
+        # Time spent waiting for prepared files: the reads themselves when workers == 1
+        prepared = self.stats.timed_iter("prepare", self.prepared_files(changed, existing_hashes, workers),
+                                         size=lambda item: item[1]["size"] if isinstance(item[1], dict) else 0)
+        for file_path, record in prepared:
+            if isinstance(record, Exception):
+                print(f"✗ Error processing {file_path}: {record}")
+                continue
+            # Touched but identical: remember its new stat key
+            if record is None:
+                rel_path = str(file_path.relative_to(self.synapse_root))
+                unchanged.append((rel_path, stat_keys[rel_path], existing_hashes[rel_path]))
                 files_skipped += 1
                 continue
 
-            # Process the file
-            node_id = self.process_file(file_path)
-            if node_id:
-                self.processed_files.add(str(file_path))
-                if rel_path in existing_hashes:
-                    files_updated += 1
-                else:
-                    files_processed += 1
+            self.stats.file_done(record.get("seconds"))
+            batch.append(record)
+            if len(batch) >= self.write_batch_size:
+                write_batch()
+
+        if batch:
+            write_batch()
+        self.flush_embeddings()
+        with self.stats.stage("bookkeeping", len(unchanged)):
+            self.manifest.update(unchanged)
+
+        # Files an interrupted run embedded but did not link
+        current = {str(f.relative_to(self.synapse_root)) for f in files} if recovered else set()
+        for rel_path, (node_id, _) in recovered.items():
+            if rel_path in references or rel_path not in current:
+                continue
+            try:
+                find_references(rel_path, (self.synapse_root / rel_path).read_text(encoding="utf-8"))
+            except (OSError, UnicodeDecodeError):
+                continue
+            written_nodes.append(node_id)
+
+        # Relationships of the files written in this run
+        added = [path for path in references
+                 if path not in existing_hashes or recovered.get(path, (None, False))[1]]
+        if references:
+            unchanged_hashes = {rel_path: existing_hashes.get(rel_path)
+                                for rel_path in (str(f.relative_to(self.synapse_root)) for f in files)
+                                if rel_path not in references}
+            with self.stats.stage("relationships", len(references)):
+                self.create_relationships(references, added, unchanged_hashes)
+
+        # Keep the approximate index current for large corpora
+        with self.stats.stage("ann_index"):
+            ann_index = self.vector_engine.refresh_ann_index()
+        if ann_index is not None:
+            print(f"✓ ANN index updated ({len(ann_index)} vectors, {ann_index.nlist} lists)")
+
+        if written_nodes:
+            with self.stats.stage("similarity_graph", len(written_nodes)):
+                self.update_similarity_graph(written_nodes)
+
+        return {"processed": files_processed, "updated": files_updated, "skipped": files_skipped,
+                "written": sorted(references), "added": added}
+
+    def reconcile(self, files: List[Path], workers: int = 1) -> int:
+        """
+        Consistency pass: make Neo4j nodes, stored vectors and the manifest
+        agree. Nodes of vanished files are deleted, vectors and manifest
+        rows without a node dropped, and files missing a node, a manifest
+        row, a content blob or vectors under their node's id ingested
+        again. Returns the number of files re-ingested.
+        """
+        self.remove_deleted_files(files)
+        with self.driver.session() as session:
+            result = session.run("MATCH (f:SynapseFile) RETURN f.path AS path, elementId(f) AS id")
+            graph = {record["path"]: record["id"] for record in result}
+        vectors = self.vector_engine.stored_files()
+        manifest = self.manifest.load()
+        on_disk = {str(f.relative_to(self.synapse_root)): f for f in files}
+
+        self.vector_engine.remove_embeddings([path for path in vectors if path not in graph])
+        self.manifest.remove([path for path in manifest if path not in graph])
+
+        missing_blobs = set(self.blobs.missing(sha256 for _, sha256 in manifest.values()))
+        redo = [path for path in on_disk
+                if path not in graph or path not in manifest or vectors.get(path) != graph[path]
+                or manifest[path][1] in missing_blobs]
+        if not redo:
+            print("✓ Graph, vectors and manifest are consistent")
+            return 0
+
+        print(f"🔧 Re-ingesting {len(redo)} files missing a node, vectors or manifest entry")
+        # Vectors stored under another node id would outlive the rewrite
+        self.vector_engine.remove_embeddings([path for path in redo if path in vectors])
+        manifest = {path: entry for path, entry in manifest.items() if path in graph and path not in redo}
+        existing_hashes = {path: sha256 for path, (_, sha256) in manifest.items()}
+        self.ingest_files(files, [on_disk[path] for path in redo], manifest, existing_hashes, workers)
+        return len(redo)
+
+    def is_ingestible(self, file_path: Path) -> bool:
+        """Whether discover_files would pick up a file at this path"""
+        try:
+            parts = file_path.relative_to(self.synapse_root / ".synapse").parts
+        except ValueError:
+            return False
+        if len(parts) < 2 or parts[0] not in TARGET_DIRS or file_path.suffix not in FILE_EXTENSIONS:
+            return False
+        return not is_ignored(file_path, self.synapse_root / ".synapse" / parts[0])
 
-        # Create relationships
-        self.create_relationships()
+    def ingest_changes(self, paths: Iterable[Path], workers: int = 1) -> Dict:
+        """
+        Re-ingest the files at paths (from filesystem events): changed
+        files are written, vanished ones removed, and cached queries that
+        returned any of them invalidated. A directory stands for every file
+        below it, as moves and deletions of directories report only the
+        directory itself.
+        """
+        touched: Set[Path] = set()
+        for path in paths:
+            if path.is_dir():
+                touched.update(walk_files([path], FILE_EXTENSIONS))
+            elif not path.exists() and path.suffix not in FILE_EXTENSIONS:
+                touched.update(f for f in self.current_files if path in f.parents)
+            touched.add(path)
+        touched = {path for path in touched if self.is_ingestible(path)}
+        present = sorted(path for path in touched if path.is_file())
+        gone = touched.difference(present)
+
+        manifest = self.manifest.load()
+        existing_hashes = {path: sha256 for path, (_, sha256) in manifest.items()}
+        removed = [str(path.relative_to(self.synapse_root)) for path in gone]
+        removed = [path for path in removed if path in manifest]
+        if removed:
+            self.remove_deleted_files([], removed)
+        self.current_files.difference_update(gone)
+        self.current_files.update(present)
+
+        counts = self.ingest_files(sorted(self.current_files), present, manifest, existing_hashes, workers)
+        counts["removed"] = removed
+        if counts["written"] or removed:
+            self.blobs.prune()
+            self.update_ingestion_metadata()
+            # A new file can match any query; otherwise only queries that returned these files are stale
+            invalidated = invalidate_cached_queries(
+                self.redis_client, None if counts["added"] else counts["written"] + removed)
+            print(f"✓ Invalidated {invalidated} cached queries")
+        return counts
+
+    def watch(self, workers: int = 1) -> bool:
+        """
+        Ingest once, then keep the graph current: watch the target
+        directories and re-ingest each debounced micro-batch of changed
+        paths (file_watch.ChangeQueue) until interrupted. Batches that
+        change the graph save their stage timings like a run does.
+        """
+        try:
+            from watchdog.observers import Observer
+        except ImportError:
+            print("❌ watchdog not installed")
+            print("💊 Install with: pip install watchdog")
+            return False
 
-        # Update metadata
-        self.update_ingestion_metadata()
+        if not self.run_full_ingestion(workers=workers):
+            return False
 
-        print(f"✅ Ingestion complete:")
-        print(f"   📄 New files processed: {files_processed}")
-        print(f"   🔄 Files updated: {files_updated}")
-        print(f"   ⏭️  Files skipped (unchanged): {files_skipped}")
-        print(f"   📊 Total files in system: {len(self.processed_files) + files_skipped}")
+        queue = ChangeQueue()
+        observer = Observer()
+        for dir_name in TARGET_DIRS:
+            dir_path = self.synapse_root / ".synapse" / dir_name
+            if dir_path.exists():
+                observer.schedule(queue, str(dir_path), recursive=True)
+        observer.start()
+        print(f"👀 Watching {self.synapse_root / '.synapse'} for changes (Ctrl+C to stop)")
 
-        return True
+        try:
+            while True:
+                paths = queue.next_batch()
+                self.stats = IngestStats()
+                try:
+                    counts = self.ingest_changes(paths, workers)
+                except Exception as e:
+                    print(f"✗ Error ingesting {len(paths)} changed paths: {e}")
+                    continue
+                if counts["written"] or counts["removed"]:
+                    print(f"🔄 {len(counts['written'])} files ingested, {len(counts['removed'])} removed")
+                    self.save_stats(self.stats.report(watch=True, workers=workers, removed=len(counts["removed"]),
+                                                      files={key: counts[key]
+                                                             for key in ("processed", "updated", "skipped")}))
+        except KeyboardInterrupt:
+            print("\n👋 Stopped watching")
+            return True
+        finally:
+            observer.stop()
+            observer.join()
 
     def close(self):
         """Close connections"""
@@ -388,6 +1151,14 @@ def main():
     import sys
 
     force_refresh = "--force" in sys.argv or "-f" in sys.argv
+    watch = "--watch" in sys.argv
+    resume = "--resume" in sys.argv
+    show_stats = "--stats" in sys.argv
+    migrate = "--migrate-embeddings" in sys.argv
+    workers = int(os.getenv("SYNAPSE_INGEST_WORKERS", 1))
+    if "--workers" in sys.argv:
+        position = sys.argv.index("--workers") + 1
+        workers = int(sys.argv[position]) if position < len(sys.argv) else os.cpu_count() or 1
 
     if "--help" in sys.argv or "-h" in sys.argv:
         print("Synapse System Ingestion Engine")
@@ -395,15 +1166,27 @@ def main():
         print("Usage: python ingestion.py [OPTIONS]")
         print()
         print("Options:")
-        print("  --force, -f    Force full refresh (clear existing data)")
-        print("  --help, -h     Show this help message")
+        print("  --force, -f              Force full refresh (clear existing data)")
+        print("  --migrate-embeddings     Embed all files with EMBEDDING_MODEL, then switch searches to it")
+        print("  --workers N              Read, hash, summarize and embed files in N processes")
+        print("  --watch                  Keep ingesting changed files until interrupted (needs watchdog)")
+        print("  --resume                 Finish a run whose process exited early, then check graph, vectors and")
+        print("                           manifest agree (a run still in progress elsewhere is left alone)")
+        print("  --stats                  Print time, CPU and throughput per stage, compared with the last run")
+        print("  --help, -h               Show this help message")
         print()
         print("Default: Incremental ingestion (only process changed files)")
         return 0
 
     ingestion = SynapseIngestion()
     try:
-        success = ingestion.run_full_ingestion(force_refresh=force_refresh)
+        if migrate:
+            success = ingestion.migrate_embeddings()
+        elif watch:
+            success = ingestion.watch(workers=workers)
+        else:
+            success = ingestion.run_full_ingestion(force_refresh=force_refresh, workers=workers, resume=resume,
+                                                   show_stats=show_stats)
         return 0 if success else 1
     except KeyboardInterrupt:
         print("\n⚠️  Ingestion interrupted by user")
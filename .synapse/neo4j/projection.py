@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Dimensionality Reduction for Synapse System
+===========================================
+
+An optional linear projection from the model's embedding dimension down
+to the stored dimension. It is applied to stored and query vectors alike,
+so scan time, resident index memory and BLOB sizes all shrink with it.
+
+    pca      principal components of (a sample of) the stored vectors
+    random   seeded Gaussian random projection (Johnson-Lindenstrauss)
+
+Vectors are scaled to unit length before projecting, since searches rank
+by cosine similarity. PCA also subtracts the corpus mean, which removes
+the direction every embedding shares. The fitted projection is persisted
+beside the store (vector_store.proj.npz, per vector space) and
+VectorEngine.reduce_dimensions applies it to the rows already stored.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+METHODS = ("pca", "random")
+
+
+class Projection:
+    """x -> (unit(x) - mean) @ components.T"""
+
+    def __init__(self, method: str, components: np.ndarray, mean: np.ndarray,
+                 explained_variance: float = None):
+        self.method = method
+        self.components = np.asarray(components, dtype=np.float32)  # (dim, input_dim)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.explained_variance = explained_variance
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+
+    @property
+    def input_dim(self) -> int:
+        return self.components.shape[1]
+
+    @classmethod
+    def fit_pca(cls, matrix: np.ndarray, dim: int, sample_size: int = 32768, seed: int = 0) -> "Projection":
+        """Top dim principal components of (a sample of) the rows of matrix"""
+        unit = _unit_rows(matrix)
+        if len(unit) > sample_size:
+            unit = unit[np.random.default_rng(seed).choice(len(unit), size=sample_size, replace=False)]
+
+        mean = unit.mean(axis=0)
+        centred = (unit - mean).astype(np.float64)
+        # input_dim x input_dim covariance; cheaper than an SVD of the sample
+        covariance = centred.T @ centred / max(len(centred), 1)
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        order = np.argsort(eigenvalues)[::-1][:dim]
+        total = eigenvalues.clip(min=0).sum()
+        explained = float(eigenvalues[order].clip(min=0).sum() / total) if total > 0 else 1.0
+        return cls("pca", eigenvectors[:, order].T, mean, explained)
+
+    @classmethod
+    def random(cls, input_dim: int, dim: int, seed: int = 0) -> "Projection":
+        """Seeded Gaussian projection; preserves inner products in expectation"""
+        components = np.random.default_rng(seed).normal(size=(dim, input_dim)) / np.sqrt(dim)
+        return cls("random", components, np.zeros(input_dim))
+
+    @classmethod
+    def fit(cls, method: str, matrix: np.ndarray, dim: int, seed: int = 0) -> "Projection":
+        if method == "pca":
+            return cls.fit_pca(matrix, dim, seed=seed)
+        if method == "random":
+            return cls.random(np.shape(matrix)[1], dim, seed)
+        raise ValueError(f"Unknown projection method: {method}")
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        """Project (N, input_dim) rows or one input_dim vector to float32"""
+        vectors = np.asarray(vectors)
+        rows = vectors.reshape(-1, self.input_dim)
+        projected = (_unit_rows(rows) - self.mean) @ self.components.T
+        # Zero vectors (e.g. text with no terms) stay zero and match nothing
+        projected[~np.any(rows, axis=1)] = 0.0
+        return projected.reshape(-1) if vectors.ndim == 1 else projected
+
+    def state(self) -> Dict[str, np.ndarray]:
+        state = {"method": np.array(self.method), "components": self.components, "mean": self.mean}
+        if self.explained_variance is not None:
+            state["explained_variance"] = np.array(self.explained_variance)
+        return state
+
+    def save(self, path: Path):
+        """Write atomically, so readers never load a half-written projection"""
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **self.state())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "Projection":
+        with np.load(path) as data:
+            explained = float(data["explained_variance"]) if "explained_variance" in data else None
+            return cls(str(data["method"]), data["components"], data["mean"], explained)
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
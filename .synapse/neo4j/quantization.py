@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Vector Quantization Codecs for Synapse System
+=============================================
+
+Codecs turn unit-length float32 rows into compact byte codes and score a
+full-precision query against those codes directly (asymmetric distance),
+so resident indexes never have to decompress the whole store.
+
+    float32   4 bytes/dim     lossless for cosine search
+    float16   2 bytes/dim
+    int8      1 byte/dim + 4  per-vector max-abs scale
+    pq        M bytes         product quantization, 256 centroids per subspace
+
+Every codec stores a row as a contiguous uint8 code of `code_size` bytes,
+which is also the BLOB written to the vectors table.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+PRECISIONS = ("float64", "float32", "float16", "int8", "pq")
+
+# Rows scored per chunk when codes must be widened to float32 first
+_SCORE_CHUNK = 16384
+
+
+class Codec:
+    """Base class: encode/decode unit rows and score queries against codes"""
+
+    name = ""
+    lossy = True
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    @property
+    def code_size(self) -> int:
+        raise NotImplementedError
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        """float32 unit rows -> uint8 codes of shape (N, code_size)"""
+        raise NotImplementedError
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """uint8 codes -> approximate float32 unit rows"""
+        raise NotImplementedError
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Inner products of a float32 unit query with every coded row"""
+        return self.score_many(codes, query.reshape(1, -1))[:, 0]
+
+    def score_many(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """(N, Q) inner products of Q float32 unit queries with every coded row"""
+        scores = np.empty((len(codes), len(queries)), dtype=np.float32)
+        for start in range(0, len(codes), _SCORE_CHUNK):
+            chunk = codes[start:start + _SCORE_CHUNK]
+            scores[start:start + len(chunk)] = self.decode(chunk) @ queries.T
+        return scores
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """Arrays needed to rebuild this codec (see codec_from_state)"""
+        return {}
+
+
+class Float32Codec(Codec):
+    name = "float32"
+    lossy = False
+
+    @property
+    def code_size(self) -> int:
+        return 4 * self.dim
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(matrix, dtype=np.float32).view(np.uint8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(codes).view(np.float32)
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        return self.decode(codes) @ query
+
+    def score_many(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        return self.decode(codes) @ queries.T
+
+
+class Float16Codec(Codec):
+    name = "float16"
+
+    @property
+    def code_size(self) -> int:
+        return 2 * self.dim
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(matrix, dtype=np.float16).view(np.uint8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(codes).view(np.float16).astype(np.float32)
+
+
+class Int8Codec(Codec):
+    """Symmetric scalar quantization with one float32 scale per vector"""
+
+    name = "int8"
+
+    @property
+    def code_size(self) -> int:
+        return 4 + self.dim
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+
+        codes = np.empty((len(matrix), self.code_size), dtype=np.uint8)
+        codes[:, :4] = scales.astype(np.float32).reshape(-1, 1).view(np.uint8)
+        codes[:, 4:] = quantized.view(np.uint8)
+        return codes
+
+    def _split(self, codes: np.ndarray):
+        scales = np.ascontiguousarray(codes[:, :4]).view(np.float32).ravel()
+        return codes[:, 4:].view(np.int8), scales
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        quantized, scales = self._split(codes)
+        return quantized.astype(np.float32) * scales[:, None]
+
+    def score_many(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        scores = np.empty((len(codes), len(queries)), dtype=np.float32)
+        for start in range(0, len(codes), _SCORE_CHUNK):
+            quantized, scales = self._split(codes[start:start + _SCORE_CHUNK])
+            scores[start:start + len(scales)] = (quantized.astype(np.float32) @ queries.T) * scales[:, None]
+        return scores
+
+
+class PQCodec(Codec):
+    """
+    Product quantization: the vector is split into M subspaces and each
+    sub-vector is replaced by the id of its nearest of (up to) 256 trained
+    centroids. Queries are scored with per-subspace lookup tables.
+    """
+
+    name = "pq"
+
+    def __init__(self, dim: int, codebooks: np.ndarray):
+        super().__init__(dim)
+        self.codebooks = np.asarray(codebooks, dtype=np.float32)  # (M, ksub, dsub)
+        self.subspaces, self.ksub, self.dsub = self.codebooks.shape
+        if self.subspaces * self.dsub != dim:
+            raise ValueError(f"Codebooks cover {self.subspaces * self.dsub} dimensions, expected {dim}")
+
+    @property
+    def code_size(self) -> int:
+        return self.subspaces
+
+    @classmethod
+    def train(cls, matrix: np.ndarray, subspaces: int, iterations: int = 10,
+              sample_size: int = 32768, seed: int = 0) -> "PQCodec":
+        """Fit per-subspace k-means codebooks on (a sample of) unit rows"""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        dim = matrix.shape[1]
+        if dim % subspaces:
+            raise ValueError(f"{dim} dimensions do not split into {subspaces} subspaces")
+
+        rng = np.random.default_rng(seed)
+        if len(matrix) > sample_size:
+            matrix = matrix[rng.choice(len(matrix), size=sample_size, replace=False)]
+        ksub = min(256, len(matrix))
+        dsub = dim // subspaces
+
+        codebooks = np.empty((subspaces, ksub, dsub), dtype=np.float32)
+        for m in range(subspaces):
+            sub = matrix[:, m * dsub:(m + 1) * dsub]
+            centroids = sub[rng.choice(len(sub), size=ksub, replace=False)].copy()
+            for _ in range(iterations):
+                assignment = _nearest(sub, centroids)
+                counts = np.bincount(assignment, minlength=ksub)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, sub)
+                occupied = counts > 0
+                centroids[occupied] = sums[occupied] / counts[occupied, None]
+            codebooks[m] = centroids
+
+        return cls(dim, codebooks)
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        codes = np.empty((len(matrix), self.subspaces), dtype=np.uint8)
+        for m in range(self.subspaces):
+            sub = matrix[:, m * self.dsub:(m + 1) * self.dsub]
+            codes[:, m] = _nearest(sub, self.codebooks[m])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        parts = [self.codebooks[m][codes[:, m]] for m in range(self.subspaces)]
+        return np.concatenate(parts, axis=1)
+
+    def score_many(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        queries = np.asarray(queries, dtype=np.float32).reshape(len(queries), self.subspaces, 1, self.dsub)
+        tables = (self.codebooks * queries).sum(axis=3)  # (Q, M, ksub) lookup tables
+        subspace_ids = np.arange(self.subspaces)
+
+        scores = np.empty((len(codes), len(queries)), dtype=np.float32)
+        chunk_size = max(1, _SCORE_CHUNK // len(queries))
+        for start in range(0, len(codes), chunk_size):
+            chunk = codes[start:start + chunk_size]
+            scores[start:start + len(chunk)] = tables[:, subspace_ids, chunk].sum(axis=2).T
+        return scores
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"codebooks": self.codebooks}
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+    """Index of the nearest centroid (Euclidean) for each row"""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    nearest = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = vectors[start:start + chunk_size]
+        distances = centroid_norms - 2 * (chunk @ centroids.T)
+        nearest[start:start + len(chunk)] = np.argmin(distances, axis=1)
+    return nearest
+
+
+def get_codec(name: str, dim: int, codebooks: Optional[np.ndarray] = None) -> Codec:
+    """Codec for a precision name; pq needs trained codebooks"""
+    if name == "float32":
+        return Float32Codec(dim)
+    if name == "float16":
+        return Float16Codec(dim)
+    if name == "int8":
+        return Int8Codec(dim)
+    if name == "pq":
+        if codebooks is None:
+            raise ValueError("PQ codec requires trained codebooks")
+        return PQCodec(dim, codebooks)
+    raise ValueError(f"Unknown vector precision: {name}")
+
+
+def codec_from_state(name: str, dim: int, state: Dict[str, np.ndarray]) -> Codec:
+    """Rebuild a codec from its name and Codec.state() arrays"""
+    return get_codec(name, dim, state.get("codebooks"))
+
+
+def recall_at_k(expected_ids, found_ids) -> float:
+    """Fraction of expected ids that were found"""
+    expected = set(expected_ids)
+    if not expected:
+        return 1.0
+    return len(expected & set(found_ids)) / len(expected)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+File Reference Index for Synapse System
+=======================================
+
+Finds which files a file's content mentions, for REFERENCES edges. File
+b is referenced by file a when a's content contains b's path, b's name,
+or (for names longer than 5 characters) b's name without its last three
+characters, e.g. "setup" for "setup.md".
+
+All patterns go into one Aho-Corasick automaton, so a file is scanned
+once however many files exist: O(len(content) + matches) per file
+instead of one substring search per (file, file) pair. Small pattern
+sets (e.g. only the files added since the last run) are checked with
+plain substring tests, which run in C.
+"""
+
+from collections import deque
+from pathlib import PurePosixPath
+from typing import Dict, Iterable, List, Set
+
+# Below this many patterns, `pattern in content` beats the Python automaton
+SUBSTRING_SCAN_LIMIT = 32
+
+
+def reference_patterns(path: str) -> List[str]:
+    """Strings whose presence in a file's content means it references path"""
+    name = PurePosixPath(path).name
+    patterns = [path, name]
+    if len(name) > 5:
+        patterns.append(name[:-3])
+    return patterns
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher; find() returns the ids of the patterns present in a text"""
+
+    def __init__(self, patterns: List[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for ch in pattern:
+                next_state = self.goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][ch] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(pattern_id)
+
+        # Breadth-first failure links; each state also reports the
+        # patterns of its longest proper suffix state
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(ch, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def find(self, text: str) -> Set[int]:
+        goto, fail, output = self.goto, self.fail, self.output
+        found: Set[int] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class ReferenceIndex:
+    """Reference patterns of a set of files, matched against file contents in one pass"""
+
+    def __init__(self, paths: Iterable[str]):
+        targets: Dict[str, Set[str]] = {}
+        for path in paths:
+            for pattern in reference_patterns(path):
+                if pattern:
+                    targets.setdefault(pattern, set()).add(path)
+        self.patterns = list(targets)
+        self.targets = [targets[pattern] for pattern in self.patterns]
+        self._automaton = AhoCorasick(self.patterns) if len(self.patterns) > SUBSTRING_SCAN_LIMIT else None
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def references(self, path: str, content: str) -> Set[str]:
+        """Paths of the indexed files that content (of the file at path) refers to"""
+        if self._automaton is not None:
+            matched = self._automaton.find(content)
+        else:
+            matched = [i for i, pattern in enumerate(self.patterns) if pattern in content]
+
+        referenced: Set[str] = set()
+        for pattern_id in matched:
+            referenced.update(self.targets[pattern_id])
+        referenced.discard(path)
+        return referenced
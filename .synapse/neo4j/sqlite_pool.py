@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+SQLite Connection Pool for Synapse System
+=========================================
+
+One long-lived connection per thread (and per process) for vector_store.db,
+shared by VectorEngine and EmbeddingCache instead of a sqlite3.connect per
+call. Every connection runs in WAL mode with synchronous=NORMAL, so
+searches keep reading while ingestion writes, and commits no longer fsync
+the main database file.
+
+    SYNAPSE_SQLITE_MMAP_MB     memory-mapped I/O window (default 256)
+    SYNAPSE_SQLITE_CACHE_MB    page cache per connection (default 64)
+
+Statements are prepared once per connection through sqlite3's statement
+cache, keyed by SQL text.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+# Prepared statements kept per connection
+STATEMENT_CACHE_SIZE = 256
+
+_pools: Dict[Path, "SQLitePool"] = {}
+_pools_lock = threading.Lock()
+
+
+class SQLitePool:
+    """Per-thread WAL connections to one SQLite file"""
+
+    def __init__(self, path: Path, timeout: float = 30.0):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.mmap_size = int(os.getenv("SYNAPSE_SQLITE_MMAP_MB", 256)) * 1024 * 1024
+        self.cache_size_kb = int(os.getenv("SYNAPSE_SQLITE_CACHE_MB", 64)) * 1024
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._pid = os.getpid()
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened and configured on first use"""
+        if self._pid != os.getpid():
+            # Connections must not cross fork(); the child starts afresh
+            self._local = threading.local()
+            self._connections = []
+            self._pid = os.getpid()
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={self.mmap_size}")
+            conn.execute(f"PRAGMA cache_size=-{self.cache_size_kb}")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Cursor on this thread's connection; commits on success, rolls back on error"""
+        conn = self.connection()
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def checkpoint(self):
+        """Fold the write-ahead log back into the database file and truncate it"""
+        self.connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        """Close every connection opened by this pool"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+def get_pool(path: Path) -> SQLitePool:
+    """Process-wide pool for a database file"""
+    key = Path(path).expanduser().resolve()
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SQLitePool(key)
+        return pool
@@ -11,117 +11,568 @@ Zone-0 Axiom: Start simple, evolve intelligently.
 
 import os
 import json
-import sqlite3
-import hashlib
+import time
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, Iterable, List, Dict, Optional, Tuple
 import numpy as np
 from dotenv import load_dotenv
+from vector_index import RowFilter, VectorIndex, normalize_rows
+from vector_filters import MetadataColumns, normalize_filters
+from ann_index import IVFIndex, default_nlist
+from vector_segments import SegmentStore
+from embedding_cache import EmbeddingCache, text_hash
+from embedding_server import EmbeddingClient, EmbeddingServerError
+from feature_hashing import HashingEmbedder, tokenize
+from quantization import PRECISIONS, Codec, Float32Codec, PQCodec, get_codec, recall_at_k
+from projection import METHODS as PROJECTION_METHODS, Projection
+from sqlite_pool import get_pool
+from vector_spaces import (ACTIVE, BUILDING, RETIRED, VectorSpace, active_space, load_spaces,
+                           model_dimension, register_space, resolve_model, space_name)
 
 load_dotenv()
 
+# Rows read from the vectors table per block when loading a resident index
+LOAD_CHUNK_ROWS = 16384
+
+# Layout version of vector_store.db (vector_store_meta 'schema_version');
+# stores without the key are version 1
+SCHEMA_VERSION = 4
+
+# Rank offset for reciprocal rank fusion (Cormack et al.)
+RRF_K = 60
+
+# Stores holding chunk vectors fetch this many times top_k chunks, so
+# enough distinct files remain after keeping each file's best chunk
+CHUNK_OVERFETCH = 4
+
 class VectorEngine:
     """
     Handles vector embeddings for the Synapse System.
     Currently uses simple TF-IDF-like vectors, can be upgraded to transformer models.
     """
 
-    def __init__(self, synapse_root: Path = None):
+    def __init__(self, synapse_root: Path = None, embedding_model: str = None):
         self.synapse_root = synapse_root or Path.home() / ".synapse-system"
         self.sqlite_path = self.synapse_root / "neo4j" / "vector_store.db"
-        self.embedding_model = os.getenv("EMBEDDING_MODEL", "simple_tfidf")
-        self.embedding_dim = 1024  # BGE-M3 output dimension
-
-        # Simple vocabulary for TF-IDF (placeholder until real embeddings)
-        self.vocabulary = {}
-        self.idf_scores = {}
+        # Per-thread WAL connections, shared with the embedding cache
+        self.db = get_pool(self.sqlite_path)
+
+        # Model for new embeddings. Unless a model is passed in, the engine
+        # serves the store's active vector space (see vector_spaces.py), which
+        # stays on the previous model until a migration to this one completes.
+        self.configured_model = resolve_model(embedding_model or os.getenv("EMBEDDING_MODEL", "simple_tfidf"))
+        self._follow_active_space = embedding_model is None
+        self._migration_engine = None
+
+        # Document frequencies for the feature-hashing embedder are kept in
+        # vector_store.db and reloaded when idf_version changes
+        self.document_frequency: Dict[str, int] = {}
+        self.document_count = 0
+        self._idf_version = None
+
+        # Texts per model call in generate_embeddings
+        self.embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+
+        # Persistent (model, sha256(text)) -> vector cache; 0 disables it
+        cache_size = int(os.getenv("SYNAPSE_EMBEDDING_CACHE_SIZE", 20000))
+        self.embedding_cache = EmbeddingCache(self.sqlite_path, cache_size) if cache_size > 0 else None
+
+        # Vector storage: BLOB rows in the vectors table, or memory-mapped
+        # segment files with only metadata kept in SQLite
+        self.vector_storage = os.getenv("SYNAPSE_VECTOR_STORAGE", "sqlite")
+        self.segment_rows = int(os.getenv("SYNAPSE_SEGMENT_ROWS", 65536))
+
+        # Storage precision for new vectors in the vectors table. float64 is
+        # the original raw layout; the others store unit-length codes (see
+        # quantization.py) with the norm kept in vector_norm. Segment files
+        # always hold float32.
+        self.storage_precision = os.getenv("SYNAPSE_VECTOR_PRECISION", "float64")
+        if self.storage_precision not in PRECISIONS:
+            raise ValueError(f"Unknown vector precision: {self.storage_precision}")
+        # Lossy searches fetch top_k * rerank_factor candidates and rescore
+        # them at full precision; needs a float32 copy of each vector on disk
+        self.rerank_factor = int(os.getenv("SYNAPSE_VECTOR_RERANK", 0))
+        self._schema_ready = False
+
+        # Optional IVF index persisted beside the store for large corpora
+        self.ann_min_vectors = int(os.getenv("SYNAPSE_ANN_MIN_VECTORS", 50000))
+        self.ann_nlist = int(os.getenv("SYNAPSE_ANN_NLIST", 0))  # 0 = sqrt(N)
+        self.ann_nprobe = int(os.getenv("SYNAPSE_ANN_NPROBE", 8))
+
+        # Transformer model for BGE-M3, unless a shared embedding server
+        # (embedding_server.py) is already serving it
+        self.transformer_model = None
+        self.embedding_client = None
+        self.embedding_socket = Path(os.getenv("SYNAPSE_EMBEDDING_SOCKET",
+                                               self.sqlite_path.parent / "embedding.sock")).expanduser()
+
+        # Model, dimension, resident indexes and files of the served space
+        self.space: Optional[VectorSpace] = None
+        self.embedding_model = None
+        self._bind_space(self._resolve_space())
+
+    def _resolve_space(self) -> VectorSpace:
+        """The store's active space, or the configured model's space (registered on first use)"""
+        self._ensure_schema()
+        with self.db.transaction() as cursor:
+            active = active_space(cursor)
+            if self._follow_active_space and active is not None:
+                return active
+            return register_space(cursor, self.configured_model, model_dimension(self.configured_model),
+                                  BUILDING if active is not None else ACTIVE)
+
+    def _bind_space(self, space: VectorSpace):
+        """Point the model, dimension, resident indexes and per-space files at a vector space"""
+        model_changed = space.model != self.embedding_model
+        self.space = space
+        self.embedding_model = space.model
+        self.embedding_dim = space.dim
+
+        self.hashing_embedder = HashingEmbedder(self.embedding_dim)
+
+        # Optional fitted projection (projection.py); vectors are stored and
+        # searched at vector_dim, which is embedding_dim without one
+        self.projection_path = self.sqlite_path.with_suffix(f"{space.file_suffix}.proj.npz")
+        self.pq_codebook_path = self.sqlite_path.with_suffix(f"{space.file_suffix}.pq.npz")
+        self.ann_index_path = self.sqlite_path.with_suffix(f"{space.file_suffix}.ivf.npz")
+        self._projection = None
+        self._projection_token = None
+        self.vector_dim = None
+        self._sync_projection()
+
+        # Metadata columns for filtered searches, synced lazily from vector_metadata
+        self._metadata = MetadataColumns()
+        # chunk id -> (parent node id, start line, end line), see chunking.py
+        self._chunk_spans: Dict[str, Tuple[str, int, int]] = {}
+        self._chunk_spans_version = None
+
+        if model_changed:
+            self._load_model()
+
+    def _segment_store_for(self, space: VectorSpace) -> SegmentStore:
+        if space.name == self.space.name and self.vector_dim is not None:
+            dim = self.vector_dim
+        else:
+            projection = self._load_projection(self.sqlite_path.with_suffix(f"{space.file_suffix}.proj.npz"),
+                                               space.dim)
+            dim = projection.dim if projection is not None else space.dim
+        return SegmentStore(self.sqlite_path.parent / f"vector_segments{space.file_suffix}",
+                            dim, segment_rows=self.segment_rows)
+
+    @staticmethod
+    def _load_projection(path: Path, input_dim: int) -> Optional[Projection]:
+        """Persisted projection for a space, if there is one for its model dimension"""
+        if not path.exists():
+            return None
+        try:
+            projection = Projection.load(path)
+        except Exception as e:
+            print(f"Warning: Could not load projection: {e}")
+            return None
+        return projection if projection.input_dim == input_dim else None
 
-        # Initialize transformer model if using BGE-M3
+    def _sync_projection(self):
+        """
+        (Re)load the space's projection when its file changed, e.g. after
+        reduce_dimensions in another process. A new stored dimension resets
+        the resident indexes and codecs built for the old one.
+        """
+        try:
+            stat = self.projection_path.stat()
+            token = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            token = None
+        if token == self._projection_token and self.vector_dim is not None:
+            return
+
+        self._projection_token = token
+        self._projection = self._load_projection(self.projection_path, self.embedding_dim) if token else None
+        vector_dim = self._projection.dim if self._projection is not None else self.embedding_dim
+        if vector_dim == self.vector_dim:
+            return
+
+        self.vector_dim = vector_dim
+        self.segment_store = None
+        if self.vector_storage == "segments":
+            self.segment_store = self._segment_store_for(self.space)
+
+        self.pq_subspaces = int(os.getenv("SYNAPSE_PQ_SUBSPACES", self.vector_dim // 4))
+        self._pq_codec = None
+
+        # Resident similarity index, synced lazily from the vectors table
+        self._index = VectorIndex(self.vector_dim, self._index_codec())
+        self._store_state_cache = None
+        self._ann_index = None
+
+    def _project(self, vectors: np.ndarray) -> np.ndarray:
+        """Map model-dimension vectors into the stored space; vectors already there pass through"""
+        if self._projection is None or np.shape(vectors)[-1] != self._projection.input_dim:
+            return vectors
+        return self._projection.apply(vectors)
+
+    def _load_model(self):
+        """Connect to the embedding server for the space's transformer, or load it in-process"""
         self.transformer_model = None
+        self.embedding_client = None
         if self.embedding_model.startswith("BAAI/"):
-            self._initialize_transformer_model()
+            client = EmbeddingClient(self.embedding_socket)
+            if os.getenv("SYNAPSE_EMBEDDING_SERVER", "auto") != "0" and client.ping(self.embedding_model):
+                self.embedding_client = client
+            else:
+                self._initialize_transformer_model()
+
+    def _sync_space(self):
+        """Follow a cutover to another space made by a different engine or process"""
+        if not self._follow_active_space:
+            return
+        with self.db.transaction() as cursor:
+            active = active_space(cursor)
+        if active is not None and active.name != self.space.name:
+            print(f"🔄 Vector space switched to {active.name}")
+            self._bind_space(active)
 
     def initialize_vector_store(self):
         """Initialize the vector storage with proper schema"""
         os.makedirs(self.sqlite_path.parent, exist_ok=True)
 
-        conn = sqlite3.connect(self.sqlite_path)
-        cursor = conn.cursor()
-
-        # Enhanced vector metadata table
+        with self.db.transaction() as cursor:
+            # Enhanced vector metadata table, one row per node and vector space
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS vector_metadata (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    space TEXT,
+                    neo4j_node_id TEXT,
+                    file_path TEXT,
+                    content_hash TEXT,
+                    embedding_model TEXT,
+                    embedding_dim INTEGER,
+                    parent_node_id TEXT,
+                    chunk_start INTEGER,
+                    chunk_end INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (space, neo4j_node_id)
+                )
+            """)
+
+            # Vector storage table (for actual embeddings)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS vectors (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    space TEXT,
+                    neo4j_node_id TEXT,
+                    vector_data BLOB,
+                    vector_norm REAL
+                )
+            """)
+
+            # Model/dimension namespaces (see vector_spaces.py)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS vector_spaces (
+                    space TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    storage_key TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    activated_at TIMESTAMP
+                )
+            """)
+
+            # Precision columns, added to stores created before quantization.
+            # A NULL vector_dtype is a raw float64 row.
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(vectors)")}
+            if "vector_dtype" not in columns:
+                cursor.execute("ALTER TABLE vectors ADD COLUMN vector_dtype TEXT")
+            if "vector_full" not in columns:
+                cursor.execute("ALTER TABLE vectors ADD COLUMN vector_full BLOB")
+
+            # Store-wide counters (generation is bumped when rows are rewritten in place)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS vector_store_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            """)
+
+            # Document frequencies for the feature-hashing embedder, with the
+            # terms each file contributed so re-ingested files replace them
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS term_document_frequency (
+                    term TEXT PRIMARY KEY,
+                    df INTEGER NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS document_terms (
+                    file_path TEXT PRIMARY KEY,
+                    terms TEXT
+                )
+            """)
+
+            # Embedding cache (see embedding_cache.py); survives clear_embeddings
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    model TEXT,
+                    text_hash TEXT,
+                    vector BLOB,
+                    last_used REAL,
+                    PRIMARY KEY (model, text_hash)
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used ON embedding_cache(last_used)
+            """)
+
+            # Stat keys and hashes of ingested files (see file_manifest.py)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS file_manifest (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    inode INTEGER,
+                    sha256 TEXT
+                )
+            """)
+
+            # Compressed file contents by sha256 (see blob_store.py)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS content_blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    codec TEXT,
+                    data BLOB,
+                    size INTEGER
+                )
+            """)
+
+            # Ingestion runs and their per-file progress (see ingest_journal.py)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ingest_runs (
+                    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    pid INTEGER,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    status TEXT,
+                    batches INTEGER DEFAULT 0
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ingest_journal (
+                    run_id INTEGER,
+                    path TEXT,
+                    node_id TEXT,
+                    added INTEGER,
+                    stage INTEGER,
+                    PRIMARY KEY (run_id, path)
+                )
+            """)
+            # Owner process of a run, added to stores journaled before it
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(ingest_runs)")}
+            if "pid" not in columns:
+                cursor.execute("ALTER TABLE ingest_runs ADD COLUMN pid INTEGER")
+
+            self._migrate_schema(cursor)
+
+        self._schema_ready = True
+
+    def _migrate_schema(self, cursor):
+        """Bring an older vector_store.db layout up to SCHEMA_VERSION"""
+        cursor.execute("SELECT value FROM vector_store_meta WHERE key = 'schema_version'")
+        row = cursor.fetchone()
+        version = int(row[0]) if row else 1
+        if version >= SCHEMA_VERSION:
+            return
+
+        if version < 2:
+            # One vector row per node. Earlier stores appended a row on every
+            # re-ingest; the newest row is the one searches used, so keep it.
+            cursor.execute("""
+                DELETE FROM vectors WHERE id NOT IN (
+                    SELECT MAX(id) FROM vectors GROUP BY neo4j_node_id
+                )
+            """)
+            if cursor.rowcount > 0:
+                self._bump_generation(cursor)
+            cursor.execute("DROP INDEX IF EXISTS idx_node_id")
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_vectors_node_id ON vectors(neo4j_node_id)")
+
+        if version < 3:
+            self._migrate_to_spaces(cursor)
+
+        if version < 4:
+            # Chunk vectors (chunking.py): the SynapseFile node they belong
+            # to and their line span. NULL for whole-file vectors.
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(vector_metadata)")}
+            for column, column_type in (("parent_node_id", "TEXT"), ("chunk_start", "INTEGER"),
+                                        ("chunk_end", "INTEGER")):
+                if column not in columns:
+                    cursor.execute(f"ALTER TABLE vector_metadata ADD COLUMN {column} {column_type}")
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_metadata_parent ON vector_metadata(space, parent_node_id)
+            """)
+
+        cursor.execute("INSERT OR REPLACE INTO vector_store_meta (key, value) VALUES ('schema_version', ?)",
+                       (SCHEMA_VERSION,))
+
+    def _migrate_to_spaces(self, cursor):
+        """
+        Schema 3: key metadata and vectors by vector space. Rows get the
+        space of the model recorded in their metadata; the space holding
+        most files becomes active and keeps the existing segment and index
+        files, the others are retired.
+        """
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(vector_metadata)")}
+        if "space" not in columns:
+            # neo4j_node_id was UNIQUE on its own; SQLite can only drop that by rebuilding
+            cursor.execute("""
+                CREATE TABLE vector_metadata_v3 (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    space TEXT,
+                    neo4j_node_id TEXT,
+                    file_path TEXT,
+                    content_hash TEXT,
+                    embedding_model TEXT,
+                    embedding_dim INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (space, neo4j_node_id)
+                )
+            """)
+            cursor.execute("""
+                INSERT INTO vector_metadata_v3 (id, space, neo4j_node_id, file_path, content_hash,
+                                                embedding_model, embedding_dim, created_at, updated_at)
+                SELECT id, NULL, neo4j_node_id, file_path, content_hash,
+                       embedding_model, embedding_dim, created_at, updated_at
+                FROM vector_metadata
+            """)
+            cursor.execute("DROP TABLE vector_metadata")
+            cursor.execute("ALTER TABLE vector_metadata_v3 RENAME TO vector_metadata")
+
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(vectors)")}
+        if "space" not in columns:
+            cursor.execute("ALTER TABLE vectors ADD COLUMN space TEXT")
+
+        # Metadata written before dimensions were per model was always 1024-D
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS vector_metadata (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                neo4j_node_id TEXT UNIQUE,
-                file_path TEXT,
-                content_hash TEXT,
-                embedding_model TEXT,
-                embedding_dim INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+            UPDATE vector_metadata
+            SET embedding_model = COALESCE(embedding_model, ?), embedding_dim = COALESCE(embedding_dim, 1024)
+            WHERE space IS NULL
+        """, (self.configured_model,))
+        cursor.execute("""
+            UPDATE vector_metadata SET space = embedding_model || '@' || embedding_dim WHERE space IS NULL
         """)
+        cursor.execute("""
+            SELECT space, embedding_model, embedding_dim FROM vector_metadata
+            GROUP BY space ORDER BY COUNT(*) DESC, MAX(updated_at) DESC
+        """)
+        spaces = cursor.fetchall()
+        for i, (name, model, dim) in enumerate(spaces):
+            register_space(cursor, model, dim, ACTIVE if i == 0 else RETIRED)
 
-        # Vector storage table (for actual embeddings)
+        # Vectors without a metadata row go to the active space; compact_store removes them
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS vectors (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                neo4j_node_id TEXT,
-                vector_data BLOB,
-                vector_norm REAL,
-                FOREIGN KEY (neo4j_node_id) REFERENCES vector_metadata(neo4j_node_id)
-            )
+            UPDATE vectors SET space = (
+                SELECT m.space FROM vector_metadata m WHERE m.neo4j_node_id = vectors.neo4j_node_id
+            ) WHERE space IS NULL
         """)
+        default_space = spaces[0][0] if spaces else space_name(self.configured_model,
+                                                               model_dimension(self.configured_model))
+        cursor.execute("UPDATE vectors SET space = ? WHERE space IS NULL", (default_space,))
 
-        # Index for fast similarity search
+        cursor.execute("DROP INDEX IF EXISTS idx_vectors_node_id")
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_vectors_space_node ON vectors(space, neo4j_node_id)")
+
+    def _bump_generation(self, cursor):
+        """Mark rows as rewritten or deleted in place so resident indexes reload"""
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_node_id ON vectors(neo4j_node_id)
+            INSERT INTO vector_store_meta (key, value) VALUES ('generation', 1)
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
         """)
 
-        conn.commit()
-        conn.close()
+    def _ensure_schema(self):
+        """Run initialize_vector_store once for engines that only read the store"""
+        if not self._schema_ready:
+            self.initialize_vector_store()
 
     def simple_tfidf_embedding(self, text: str) -> np.ndarray:
         """
-        Generate simple TF-IDF-like embedding as placeholder.
-        This can be replaced with sentence-transformers later.
+        Generate a deterministic TF-IDF embedding by feature hashing.
+        Used when no transformer model is configured or available.
         """
-        # Tokenize and clean text
-        words = text.lower().split()
-        words = [w.strip('.,!?;:()[]{}') for w in words if len(w) > 2]
-
-        # Build simple vocabulary on the fly
-        for word in words:
-            if word not in self.vocabulary:
-                self.vocabulary[word] = len(self.vocabulary)
-
-        # Create TF vector
-        tf_vector = np.zeros(self.embedding_dim)
-        word_count = {}
-
-        for word in words:
-            word_count[word] = word_count.get(word, 0) + 1
-
-        # Map to fixed-size vector using hash-based indexing
-        for word, count in word_count.items():
-            # Use hash to map words to vector positions
-            word_hash = int(hashlib.md5(word.encode()).hexdigest(), 16)
-            positions = [word_hash % self.embedding_dim,
-                        (word_hash // self.embedding_dim) % self.embedding_dim]
-
-            for pos in positions:
-                tf_vector[pos] += count / len(words)  # Normalized TF
-
-        # Add some random noise to make vectors more distinctive
-        noise = np.random.normal(0, 0.01, self.embedding_dim)
-        tf_vector += noise
-
-        # Normalize vector
-        norm = np.linalg.norm(tf_vector)
-        if norm > 0:
-            tf_vector = tf_vector / norm
-
-        return tf_vector
+        return self.simple_tfidf_embeddings([text])[0]
+
+    def simple_tfidf_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Batch form of simple_tfidf_embedding (see feature_hashing.py)"""
+        self._load_document_frequency()
+        return self.hashing_embedder.embed(texts, self.document_frequency, self.document_count)
+
+    def _load_document_frequency(self):
+        """Reload the document-frequency table if it changed since the last read"""
+        self._ensure_schema()
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT value FROM vector_store_meta WHERE key = 'idf_version'")
+            row = cursor.fetchone()
+            version = int(row[0]) if row else 0
+
+            if version != self._idf_version:
+                cursor.execute("SELECT term, df FROM term_document_frequency")
+                self.document_frequency = dict(cursor.fetchall())
+                cursor.execute("SELECT COUNT(*) FROM document_terms")
+                self.document_count = cursor.fetchone()[0]
+                self._idf_version = version
+
+    def update_term_statistics(self, documents: List[Tuple[str, str]], merge: bool = False):
+        """
+        Fold (file_path, text) documents into the document-frequency table.
+        A path seen before has its previous terms replaced, or with merge
+        extended (for texts holding only some chunks of a file).
+        """
+        if not documents:
+            return
+
+        self._ensure_schema()
+        with self.db.transaction() as cursor:
+            deltas: Dict[str, int] = {}
+            for file_path, text in documents:
+                terms = set(tokenize(text))
+                cursor.execute("SELECT terms FROM document_terms WHERE file_path = ?", (file_path,))
+                row = cursor.fetchone()
+                previous = set(row[0].split()) if row and row[0] else set()
+                if merge:
+                    terms |= previous
+                for term in terms - previous:
+                    deltas[term] = deltas.get(term, 0) + 1
+                for term in previous - terms:
+                    deltas[term] = deltas.get(term, 0) - 1
+                cursor.execute("INSERT OR REPLACE INTO document_terms (file_path, terms) VALUES (?, ?)",
+                               (file_path, " ".join(sorted(terms))))
+
+            self._apply_term_deltas(cursor, deltas)
+
+    def _remove_term_statistics(self, cursor, file_paths: List[str]):
+        """Subtract the terms of removed files from the document frequencies"""
+        deltas: Dict[str, int] = {}
+        for file_path in file_paths:
+            cursor.execute("SELECT terms FROM document_terms WHERE file_path = ?", (file_path,))
+            row = cursor.fetchone()
+            if row is None:
+                continue
+            for term in (row[0] or "").split():
+                deltas[term] = deltas.get(term, 0) - 1
+            cursor.execute("DELETE FROM document_terms WHERE file_path = ?", (file_path,))
+        self._apply_term_deltas(cursor, deltas)
+
+    def _apply_term_deltas(self, cursor, deltas: Dict[str, int]):
+        changed = [(term, delta) for term, delta in deltas.items() if delta]
+        cursor.executemany("""
+            INSERT INTO term_document_frequency (term, df) VALUES (?, ?)
+            ON CONFLICT(term) DO UPDATE SET df = df + excluded.df
+        """, changed)
+        cursor.execute("DELETE FROM term_document_frequency WHERE df <= 0")
+        cursor.execute("""
+            INSERT INTO vector_store_meta (key, value) VALUES ('idf_version', 1)
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+        """)
 
     def _initialize_transformer_model(self):
         """Initialize the sentence-transformers model for BGE-M3"""
@@ -173,157 +624,1274 @@ class VectorEngine:
         """
         Generate embedding using BGE-M3 transformer model.
         """
-        if self.transformer_model is None:
-            print("Transformer model not loaded. Falling back to TF-IDF.")
-            return self.simple_tfidf_embedding(text)
+        return self.transformer_embeddings([text], 1)[0]
 
-        try:
-            # Generate embedding using BGE-M3
-            embedding = self.transformer_model.encode(text, convert_to_numpy=True)
+    def transformer_embeddings(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """
+        Generate embeddings using BGE-M3, falling back to TF-IDF if the
+        model is unavailable.
+        """
+        return self._embed_uncached(texts, batch_size)[0]
 
-            # Ensure it's the expected dimension
-            if embedding.shape[0] != self.embedding_dim:
-                print(f"Warning: Expected {self.embedding_dim}D, got {embedding.shape[0]}D")
+    def _encode_transformer(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """
+        Encode texts in batches of similar length, so padding within a
+        batch stays small. Rows are returned in input order.
+        """
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        embeddings = None
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            encoded = self.transformer_model.encode(
+                [texts[i] for i in batch], batch_size=len(batch), convert_to_numpy=True
+            )
+            if embeddings is None:
+                if encoded.shape[1] != self.embedding_dim:
+                    print(f"Warning: Expected {self.embedding_dim}D, got {encoded.shape[1]}D")
+                embeddings = np.empty((len(texts), encoded.shape[1]), dtype=np.float64)
+            embeddings[batch] = encoded
+        return embeddings
+
+    def _embed_uncached(self, texts: List[str], batch_size: int) -> Tuple[np.ndarray, str]:
+        """Compute embeddings; also returns the model that actually produced them"""
+        if self.embedding_model.startswith("BAAI/"):
+            if self.embedding_client is not None:
+                try:
+                    return self.embedding_client.embed(self.embedding_model, texts), self.embedding_model
+                except (OSError, ValueError, EmbeddingServerError) as e:
+                    print(f"⚠ Embedding server unavailable ({e}); loading model in-process")
+                    self.embedding_client = None
+                    self._initialize_transformer_model()
+
+            if self.transformer_model is None:
+                print("Transformer model not loaded. Falling back to TF-IDF.")
+            else:
+                try:
+                    return self._encode_transformer(texts, batch_size), self.embedding_model
+                except Exception as e:
+                    print(f"Error generating transformer embeddings: {e}")
+        return self.simple_tfidf_embeddings(texts), "simple_tfidf"
+
+    def _active_model(self) -> str:
+        """Model that will produce embeddings right now (the TF-IDF fallback if BGE-M3 failed to load)"""
+        if self.embedding_model.startswith("BAAI/") and (
+                self.transformer_model is not None or self.embedding_client is not None):
+            return self.embedding_model
+        return "simple_tfidf"
+
+    def generate_embeddings(self, texts: List[str], batch_size: int = None, strict: bool = False) -> np.ndarray:
+        """
+        Generate embeddings for many texts at once.
+        Returns an (N, embedding_dim) array in the order of texts. Texts
+        already in the embedding cache skip the model entirely.
 
-            return embedding.astype(np.float64)
-        except Exception as e:
-            print(f"Error generating transformer embedding: {e}")
-            return self.simple_tfidf_embedding(text)
+        strict raises RuntimeError instead of falling back to TF-IDF when
+        the space's transformer is unavailable, for callers that store or
+        compare the vectors within that space.
+        """
+        self._sync_space()
+        if not texts:
+            return np.empty((0, self.embedding_dim))
+        if strict and self._active_model() != self.embedding_model:
+            raise RuntimeError(f"{self.embedding_model} is not available")
+
+        batch_size = batch_size or self.embedding_batch_size
+        # Hashing is cheaper than a cache lookup, and its IDF weights drift
+        if self.embedding_cache is None or self._active_model() == "simple_tfidf":
+            return self._embed_strict(texts, batch_size, strict)
+
+        self._ensure_schema()
+        hashes = [text_hash(text) for text in texts]
+        cached = self.embedding_cache.get_many(self._active_model(), hashes)
+
+        # Each distinct missing text is embedded once
+        missing = {}
+        for i, h in enumerate(hashes):
+            if h not in cached:
+                missing.setdefault(h, i)
+        if missing:
+            computed, model = self._embed_uncached([texts[i] for i in missing.values()], batch_size)
+            if strict and model != self.embedding_model:
+                raise RuntimeError(f"{self.embedding_model} is not available")
+            self.embedding_cache.put_many(model, list(zip(missing, computed)))
+            cached.update(zip(missing, computed))
+
+        return np.array([cached[h] for h in hashes], dtype=np.float64)
+
+    def _embed_strict(self, texts: List[str], batch_size: int, strict: bool) -> np.ndarray:
+        embeddings, model = self._embed_uncached(texts, batch_size)
+        if strict and model != self.embedding_model:
+            raise RuntimeError(f"{self.embedding_model} is not available")
+        return embeddings
 
     def generate_embedding(self, text: str, file_path: str = "") -> np.ndarray:
         """
         Generate embedding for text content.
         Uses BGE-M3 transformer model or falls back to TF-IDF.
         """
-        if self.embedding_model == "simple_tfidf":
-            return self.simple_tfidf_embedding(text)
-        elif self.embedding_model.startswith("BAAI/"):
-            return self.transformer_embedding(text)
-        else:
-            # Fallback to simple method
-            return self.simple_tfidf_embedding(text)
+        return self.generate_embeddings([text])[0]
 
     def store_embedding(self, neo4j_node_id: str, file_path: str, content_hash: str, embedding: np.ndarray):
         """Store embedding in SQLite database"""
-        conn = sqlite3.connect(self.sqlite_path)
-        cursor = conn.cursor()
-
-        # Update or insert metadata
-        cursor.execute("""
-            INSERT OR REPLACE INTO vector_metadata
-            (neo4j_node_id, file_path, content_hash, embedding_model, embedding_dim, updated_at)
-            VALUES (?, ?, ?, ?, ?, datetime('now'))
-        """, (neo4j_node_id, file_path, content_hash, self.embedding_model, self.embedding_dim))
+        self.store_embeddings([(neo4j_node_id, file_path, content_hash, embedding)])
 
-        # Store vector
-        vector_blob = embedding.tobytes()
-        vector_norm = float(np.linalg.norm(embedding))
-
-        cursor.execute("""
-            INSERT OR REPLACE INTO vectors
-            (neo4j_node_id, vector_data, vector_norm)
-            VALUES (?, ?, ?)
-        """, (neo4j_node_id, vector_blob, vector_norm))
+    def store_embeddings(self, rows: List[Tuple[str, str, str, np.ndarray]],
+                         chunks: List[Optional[Tuple[str, int, int]]] = None, replace: bool = False):
+        """
+        Store (neo4j_node_id, file_path, content_hash, embedding) rows, e.g. a
+        whole ingestion batch, with one executemany per table in a single
+        transaction. Rows go to the engine's vector space; other spaces keep
+        their own vectors for the same nodes.
+
+        chunks gives, per row, the (parent node id, start line, end line) of
+        a chunk vector, or None for a whole-file vector. With replace, rows
+        supersede every vector stored earlier for their files (the row's
+        parent, or the node itself), so they must cover each file completely.
+        """
+        if not rows:
+            return
+
+        self._ensure_schema()
+        self._sync_projection()
+        chunks = chunks or [None] * len(rows)
+        node_ids = [row[0] for row in rows]
+        matrix = np.stack([np.asarray(row[3], dtype=np.float64).ravel() for row in rows])
+        matrix = np.asarray(self._project(matrix), dtype=np.float64)
+
+        stale: List[str] = []
+        with self.db.transaction() as cursor:
+            if replace:
+                stale = self._delete_superseded(cursor, node_ids, chunks)
+
+            # Update or insert metadata
+            cursor.executemany("""
+                INSERT OR REPLACE INTO vector_metadata
+                (space, neo4j_node_id, file_path, content_hash, embedding_model, embedding_dim,
+                 parent_node_id, chunk_start, chunk_end, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+            """, [(self.space.name, node_id, file_path, content_hash, self.embedding_model, self.embedding_dim)
+                  + (tuple(chunk) if chunk else (None, None, None))
+                  for (node_id, file_path, content_hash, _), chunk in zip(rows, chunks)])
+
+            if self.segment_store is None:
+                # Store vectors
+                vector_blobs, vector_dtype, full_blobs = self._encode_vectors(matrix)
+                norms = np.linalg.norm(matrix, axis=1)
+                cursor.executemany("""
+                    INSERT OR REPLACE INTO vectors
+                    (space, neo4j_node_id, vector_data, vector_norm, vector_dtype, vector_full)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, [(self.space.name, node_id, vector_blob, float(norm), vector_dtype, full_blob)
+                      for node_id, vector_blob, norm, full_blob in zip(node_ids, vector_blobs, norms, full_blobs)])
+
+        if self.segment_store is not None:
+            if stale:
+                self.segment_store.delete(stale)
+            self.segment_store.append(node_ids, matrix)
+
+    def _delete_superseded(self, cursor, node_ids: List[str],
+                           chunks: List[Optional[Tuple[str, int, int]]]) -> List[str]:
+        """Delete this space's vectors of the files being stored that the new rows do not overwrite"""
+        files = {chunk[0] if chunk else node_id for node_id, chunk in zip(node_ids, chunks)}
+        keep = set(node_ids)
+        stale = []
+        for file_node_id in files:
+            cursor.execute("""
+                SELECT neo4j_node_id FROM vector_metadata
+                WHERE space = ? AND (parent_node_id = ? OR neo4j_node_id = ?)
+            """, (self.space.name, file_node_id, file_node_id))
+            stale.extend(row[0] for row in cursor.fetchall() if row[0] not in keep)
+        if stale:
+            cursor.executemany("DELETE FROM vectors WHERE space = ? AND neo4j_node_id = ?",
+                               [(self.space.name, node_id) for node_id in stale])
+            cursor.executemany("DELETE FROM vector_metadata WHERE space = ? AND neo4j_node_id = ?",
+                               [(self.space.name, node_id) for node_id in stale])
+        return stale
+
+    def _load_pq_codec(self) -> Optional[PQCodec]:
+        """PQ codec from the persisted codebooks, or None before they are trained"""
+        if self._pq_codec is None and self.pq_codebook_path.exists():
+            with np.load(self.pq_codebook_path) as data:
+                codebooks = data["codebooks"]
+            # Codebooks for another dimension (before reduce_dimensions) are unusable
+            if codebooks.shape[0] * codebooks.shape[2] == self.vector_dim:
+                self._pq_codec = PQCodec(self.vector_dim, codebooks)
+        return self._pq_codec
+
+    def _storage_codec(self) -> Optional[Codec]:
+        """
+        Codec for newly stored vectors, None for raw float64 rows. Until PQ
+        codebooks have been trained (migrate_precision("pq")) pq stores int8.
+        """
+        if self.storage_precision == "float64":
+            return None
+        if self.storage_precision == "pq":
+            pq_codec = self._load_pq_codec()
+            return pq_codec if pq_codec is not None else get_codec("int8", self.vector_dim)
+        return get_codec(self.storage_precision, self.vector_dim)
+
+    def _index_codec(self) -> Codec:
+        """Codec for resident index blocks: the storage codec, float32 for raw rows"""
+        codec = self._storage_codec()
+        return codec if codec is not None else Float32Codec(self.vector_dim)
+
+    def _codec_for(self, vector_dtype: str) -> Codec:
+        return self._load_pq_codec() if vector_dtype == "pq" else get_codec(vector_dtype, self.vector_dim)
+
+    def _code_sizes(self) -> Dict[str, int]:
+        """BLOB length of a vector of the engine's dimension, per vector_dtype"""
+        sizes = {"float64": self.vector_dim * np.dtype(np.float64).itemsize}
+        for name in ("float32", "float16", "int8"):
+            sizes[name] = get_codec(name, self.vector_dim).code_size
+        pq_codec = self._load_pq_codec()
+        if pq_codec is not None:
+            sizes["pq"] = pq_codec.code_size
+        return sizes
+
+    def _encode_vectors(self, matrix: np.ndarray) -> Tuple[List[bytes], str, List[Optional[bytes]]]:
+        """(vector_data blobs, vector_dtype, vector_full blobs) column values for a batch of embeddings"""
+        codec = self._storage_codec()
+        if codec is None:
+            return [vector.tobytes() for vector in np.asarray(matrix, dtype=np.float64)], "float64", [None] * len(matrix)
+
+        unit, _ = normalize_rows(matrix)
+        full_blobs = [vector.tobytes() if codec.lossy and self.rerank_factor > 0 else None for vector in unit]
+        return [code.tobytes() for code in codec.encode(unit)], codec.name, full_blobs
+
+    def _decode_vectors(self, rows: List[Tuple[bytes, Optional[str], float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Decode (vector_data, vector_dtype, vector_norm) rows, keeping their order.
+        Returns (mask of rows that match the engine's dimension, float32 matrix
+        of those rows scaled back to their stored norms).
+        """
+        sizes = self._code_sizes()
+        dtypes = [vector_dtype or "float64" for _, vector_dtype, _ in rows]
+        matching = np.fromiter((sizes.get(dtype) == len(row[0]) for row, dtype in zip(rows, dtypes)),
+                               dtype=bool, count=len(rows))
+        matrix = np.empty((len(rows), self.vector_dim), dtype=np.float32)
+
+        for dtype in set(dtypes):
+            members = [i for i, d in enumerate(dtypes) if d == dtype and matching[i]]
+            if not members:
+                continue
+            codes = np.frombuffer(b"".join(rows[i][0] for i in members), dtype=np.uint8)
+            codes = codes.reshape(len(members), -1)
+            if dtype == "float64":
+                matrix[members] = codes.view(np.float64)
+            else:
+                norms = np.array([rows[i][2] or 0.0 for i in members], dtype=np.float32)
+                matrix[members] = self._codec_for(dtype).decode(codes) * norms[:, None]
 
-        conn.commit()
-        conn.close()
+        return matching, matrix[matching]
 
     def get_embedding(self, neo4j_node_id: str) -> Optional[np.ndarray]:
         """Retrieve embedding for a node"""
-        conn = sqlite3.connect(self.sqlite_path)
-        cursor = conn.cursor()
+        if self.segment_store is not None:
+            return self.segment_store.get(neo4j_node_id)
+
+        self._ensure_schema()
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                SELECT vector_data, vector_dtype, vector_norm FROM vectors
+                WHERE space = ? AND neo4j_node_id = ?
+            """, (self.space.name, neo4j_node_id))
+            result = cursor.fetchone()
+
+        if not result:
+            return None
+        if (result[1] or "float64") == "float64":
+            return np.frombuffer(result[0], dtype=np.float64)
 
-        cursor.execute("""
-            SELECT vector_data FROM vectors WHERE neo4j_node_id = ?
-        """, (neo4j_node_id,))
+        matching, matrix = self._decode_vectors([result])
+        return matrix[0].astype(np.float64) if matching[0] else None
 
-        result = cursor.fetchone()
-        conn.close()
+    def _sync_index(self, index=None):
+        """
+        Bring a resident index (VectorIndex or IVFIndex, default the exact
+        index) up to date with vector storage. Only rows newer than the last
+        loaded row id are read; a full reload happens when vectors were
+        deleted since the last sync.
+        """
+        if index is None:
+            index = self._index
 
-        if result:
-            return np.frombuffer(result[0], dtype=np.float64)
+        expected_size, last_row_id, generation = self._store_state()
+
+        if generation != index.generation or last_row_id < index.last_row_id:
+            if generation != index.generation and index is self._index:
+                # Rows were rewritten in place, possibly with new PQ codebooks
+                self._pq_codec = None
+                index.codec = self._index_codec()
+            index.reset()
+
+        if last_row_id > index.last_row_id:
+            self._load_index_rows(index)
+
+        # Deleted vectors leave the index holding more nodes than the store
+        if len(index) != expected_size:
+            index.reset()
+            self._load_index_rows(index)
+
+        index.generation = generation
+        return index
+
+    def _store_state(self) -> Tuple[int, int, int]:
+        """
+        Change token for vector storage: (distinct nodes with a vector of the
+        engine's dimension, newest row id, storage generation).
+        """
+        if self.segment_store is not None:
+            return self.segment_store.state()
+
+        self._ensure_schema()
+        sizes = self._code_sizes()
+        with self.db.transaction() as cursor:
+            # Cheap token first (COUNT(*) reads the node id index); the
+            # per-row dimension check only runs when it has changed
+            cursor.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM vectors WHERE space = ?",
+                           (self.space.name,))
+            rows, last_row_id = cursor.fetchone()
+            cursor.execute("SELECT value FROM vector_store_meta WHERE key = 'generation'")
+            generation = cursor.fetchone()
+            generation = int(generation[0]) if generation else 0
+
+            token = (rows, last_row_id, generation, tuple(sorted(sizes.items())))
+            if self._store_state_cache is not None and self._store_state_cache[0] == token:
+                return self._store_state_cache[1]
+
+            matches_dim = " OR ".join(
+                "(COALESCE(vector_dtype, 'float64') = ? AND length(vector_data) = ?)" for _ in sizes
+            )
+            cursor.execute(f"""
+                SELECT COUNT(DISTINCT CASE WHEN {matches_dim} THEN neo4j_node_id END) FROM vectors
+                WHERE space = ?
+            """, [value for item in sizes.items() for value in item] + [self.space.name])
+            expected_size = cursor.fetchone()[0]
+
+        state = (expected_size, last_row_id, generation)
+        self._store_state_cache = (token, state)
+        return state
+
+    def _read_vector_rows(self, after_row_id: int = 0, limit: int = None) -> Tuple[int, List[str], np.ndarray]:
+        """
+        Read vectors stored after after_row_id (at most limit rows from
+        SQLite). Returns (last row id, node ids, float32 matrix); rows written
+        with a different dimension are skipped.
+        """
+        if self.segment_store is not None:
+            return self.segment_store.read_rows(after_row_id)
+
+        self._ensure_schema()
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                SELECT id, neo4j_node_id, vector_data, vector_dtype, vector_norm FROM vectors
+                WHERE id > ? AND space = ? ORDER BY id LIMIT ?
+            """, (after_row_id, self.space.name, -1 if limit is None else limit))
+            rows = cursor.fetchall()
+
+        if not rows:
+            return after_row_id, [], np.empty((0, self.vector_dim), dtype=np.float32)
+
+        matching, matrix = self._decode_vectors([row[2:] for row in rows])
+        node_ids = [row[1] for row, keep in zip(rows, matching) if keep]
+        return rows[-1][0], node_ids, matrix
+
+    def _load_index_rows(self, index):
+        """Append rows after index.last_row_id to the index, a chunk at a time"""
+        while True:
+            last_row_id, node_ids, matrix = self._read_vector_rows(index.last_row_id, LOAD_CHUNK_ROWS)
+            if last_row_id == index.last_row_id:
+                break
+            index.add(node_ids, matrix)
+            index.last_row_id = last_row_id
+
+    def _load_ann_index(self) -> Optional[IVFIndex]:
+        """Load the persisted IVF index if present and built for this dimension"""
+        if not self.ann_index_path.exists():
+            return None
+        try:
+            index = IVFIndex.load(self.ann_index_path)
+        except Exception as e:
+            print(f"Warning: Could not load ANN index: {e}")
+            return None
+        return index if index.dim == self.vector_dim else None
+
+    def build_ann_index(self, nlist: int = None, iterations: int = 10) -> Optional[IVFIndex]:
+        """
+        Train an IVF index on the vectors table and persist it beside the store.
+        Returns None when there are no vectors to train on.
+        """
+        last_row_id, node_ids, matrix = self._read_vector_rows()
+        if not node_ids:
+            return None
+
+        nlist = nlist or self.ann_nlist or default_nlist(len(node_ids))
+        index = IVFIndex.train(matrix, nlist, iterations, codec=self._index_codec())
+        index.add(node_ids, matrix)
+        index.last_row_id = last_row_id
+        index.generation = self._store_state()[2]
+
+        index.save(self.ann_index_path)
+        self._ann_index = index
+        return index
+
+    def refresh_ann_index(self) -> Optional[IVFIndex]:
+        """
+        Keep the persisted IVF index current once the store reaches
+        ann_min_vectors. Centroids are retrained when the corpus has
+        doubled or halved since they were fitted; otherwise new rows are
+        assigned to the existing lists.
+        """
+        count = self.get_stored_embeddings_count()
+        if count < self.ann_min_vectors:
+            return None
+
+        index = self._ann_index if self._ann_index is not None else self._load_ann_index()
+        if index is None or not (index.trained_size / 2 <= count <= index.trained_size * 2):
+            return self.build_ann_index()
+
+        self._sync_index(index)
+        index.save(self.ann_index_path)
+        self._ann_index = index
+        return index
+
+    def _select_ann_index(self, backend: str) -> Optional[IVFIndex]:
+        """Resolve the backend argument of similarity_search to an IVF index or None"""
+        if backend == "exact":
+            return None
+        if backend not in ("ann", "auto"):
+            raise ValueError(f"Unknown search backend: {backend}")
+
+        if self._ann_index is None:
+            self._ann_index = self._load_ann_index()
+
+        if backend == "ann":
+            return self._ann_index if self._ann_index is not None else self.build_ann_index()
+
+        # auto: only worth probing once the corpus is large enough
+        if self._ann_index is not None and len(self._ann_index) >= self.ann_min_vectors:
+            return self._ann_index
         return None
 
-    def similarity_search(self, query_embedding: np.ndarray, top_k: int = 5, min_similarity: float = 0.1) -> List[Tuple[str, float]]:
+    def similarity_search(self, query_embedding: np.ndarray, top_k: int = 5, min_similarity: float = 0.1,
+                          backend: str = "auto", nprobe: int = None,
+                          filters: Dict = None, spans: bool = False) -> List[Tuple]:
         """
         Find similar embeddings using cosine similarity.
         Returns list of (neo4j_node_id, similarity_score) tuples.
+
+        Chunk vectors (chunking.py) are reported as their SynapseFile node,
+        scored by its best chunk. With spans, tuples gain a third item: the
+        best chunk's {"chunk_id", "start_line", "end_line"}, or None for a
+        whole-file vector.
+
+        backend: "exact" scans every stored vector, "ann" probes the IVF
+        index (building it if needed), and "auto" uses the IVF index once
+        one has been built for a store of at least ann_min_vectors vectors.
+        nprobe overrides SYNAPSE_ANN_NPROBE for IVF queries.
+
+        filters restricts the search to matching metadata (path_prefix,
+        file_type, embedding_model, updated_after; see vector_filters.py).
+        Non-matching rows are masked out before scoring. Filtered searches
+        are always exact, since IVF probes would miss most of a small subset.
         """
-        conn = sqlite3.connect(self.sqlite_path)
-        cursor = conn.cursor()
+        self._sync_space()
+        self._sync_projection()
+        query_embedding = self._project(query_embedding)
+        row_filter = self._row_filter(filters)
+        ann_index = self._select_ann_index(backend) if row_filter is None else None
+        chunk_spans = self._sync_chunk_spans()
+        fetch_k = top_k * CHUNK_OVERFETCH if chunk_spans else top_k
+
+        # Segments are scored in place through their memory maps
+        if ann_index is None and self.segment_store is not None:
+            results = self.segment_store.search(query_embedding, fetch_k, min_similarity, row_filter=row_filter)
+        else:
+            index = self._sync_index(ann_index)
+            search_args = ({"nprobe": nprobe or self.ann_nprobe} if ann_index is not None
+                           else {"row_filter": row_filter})
+
+            # Quantized scores are approximate: over-fetch, then rescore exactly
+            if self.rerank_factor > 0 and index.codec.lossy:
+                candidates = index.search(query_embedding, fetch_k * self.rerank_factor, -1.0, **search_args)
+                results = self._rerank(query_embedding, candidates, fetch_k, min_similarity)
+            else:
+                results = index.search(query_embedding, fetch_k, min_similarity, **search_args)
 
-        cursor.execute("SELECT neo4j_node_id, vector_data FROM vectors")
-        results = []
+        results = _best_chunks(results, chunk_spans, top_k)
+        return results if spans else [result[:2] for result in results]
 
-        query_norm = np.linalg.norm(query_embedding)
-        if query_norm == 0:
+    def similarity_search_many(self, query_embeddings: np.ndarray, top_k: int = 5, min_similarity: float = 0.1,
+                               fusion: str = "max", backend: str = "auto", nprobe: int = None,
+                               filters: Dict = None, spans: bool = False) -> List[Tuple]:
+        """
+        Search several query embeddings (e.g. expanded query variants) in
+        one pass over the store and fuse their per-variant top-k lists.
+        Returns (neo4j_node_id, fused score, winning variant index) tuples
+        for the union of the lists, best first.
+
+        fusion: "max" scores a node by its best cosine similarity over the
+        variants; "rrf" uses reciprocal rank fusion, sum(1 / (60 + rank)),
+        with the best-ranked variant as the winner. filters, chunk vectors
+        and spans (a fourth item, the winning variant's best chunk) work as
+        in similarity_search.
+        """
+        if fusion not in ("max", "rrf"):
+            raise ValueError(f"Unknown fusion method: {fusion}")
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        if len(queries) == 0:
             return []
 
-        for row in cursor.fetchall():
-            node_id, vector_blob = row
-            stored_vector = np.frombuffer(vector_blob, dtype=np.float64)
+        self._sync_space()
+        self._sync_projection()
+        queries = np.asarray(self._project(queries), dtype=np.float32)
+        row_filter = self._row_filter(filters)
+        ann_index = self._select_ann_index(backend) if row_filter is None else None
+        chunk_spans = self._sync_chunk_spans()
+        variant_k = top_k * CHUNK_OVERFETCH if chunk_spans else top_k
 
-            # Cosine similarity
-            dot_product = np.dot(query_embedding, stored_vector)
-            stored_norm = np.linalg.norm(stored_vector)
+        if ann_index is None and self.segment_store is not None:
+            per_variant = self.segment_store.search_many(queries, variant_k, min_similarity, row_filter=row_filter)
+        else:
+            index = self._sync_index(ann_index)
+            rerank = self.rerank_factor > 0 and index.codec.lossy
+            fetch_k, fetch_min = (variant_k * self.rerank_factor, -1.0) if rerank else (variant_k, min_similarity)
+
+            if ann_index is not None:
+                # IVF probes different lists per query, so each variant is its own probe
+                nprobe = nprobe or self.ann_nprobe
+                per_variant = [index.search(query, fetch_k, fetch_min, nprobe=nprobe) for query in queries]
+            else:
+                per_variant = index.search_many(queries, fetch_k, fetch_min, row_filter=row_filter)
+
+            if rerank:
+                vectors = self._full_precision_vectors(list({node_id for results in per_variant
+                                                             for node_id, _ in results}))
+                per_variant = [self._rerank(query, results, variant_k, min_similarity, vectors)
+                               for query, results in zip(queries, per_variant)]
+
+        per_variant = [_best_chunks(results, chunk_spans, top_k) for results in per_variant]
+        fused = _fuse_results([[result[:2] for result in results] for results in per_variant], fusion)
+        if not spans:
+            return fused
+        best_spans = [{node_id: span for node_id, _, span in results} for results in per_variant]
+        return [(node_id, score, variant, best_spans[variant][node_id]) for node_id, score, variant in fused]
+
+    def nearest_neighbors(self, node_ids: List[str], k: int,
+                          min_similarity: float) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        The k stored nodes most similar to each of node_ids (itself
+        excluded) with a similarity of at least min_similarity, best first.
+        A chunked file is compared through all of its chunk vectors and
+        two files score as their most similar pair of vectors. Nodes
+        without stored vectors are left out.
+        """
+        chunks: Dict[str, List[str]] = {}
+        for chunk_id, (parent, _, _) in self._sync_chunk_spans().items():
+            chunks.setdefault(parent, []).append(chunk_id)
+
+        neighbors = {}
+        for node_id in node_ids:
+            vectors = [vector for vector in map(self.get_embedding, chunks.get(node_id, [node_id]))
+                       if vector is not None]
+            if not vectors:
+                continue
+            results = self.similarity_search_many(np.stack(vectors), top_k=k + 1, min_similarity=min_similarity)
+            neighbors[node_id] = [(other, score) for other, score, _ in results if other != node_id][:k]
+        return neighbors
+
+    def _row_filter(self, filters: Optional[Dict]) -> Optional[RowFilter]:
+        """Block row mask for metadata filters, or None when nothing is filtered"""
+        key = normalize_filters(filters)
+        if key is None:
+            return None
+
+        self._sync_metadata()
+        bitmap = self._metadata.bitmap(key)
+        return lambda node_ids: self._metadata.block_mask(node_ids, bitmap)
+
+    def _sync_metadata(self):
+        """Reload the in-memory metadata columns when vector_metadata changed"""
+        self._ensure_schema()
+        with self.db.transaction() as cursor:
+            # Ids are AUTOINCREMENT and INSERT OR REPLACE issues a new one,
+            # so (rows, newest id) changes on every write or delete
+            cursor.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM vector_metadata WHERE space = ?",
+                           (self.space.name,))
+            version = cursor.fetchone()
+            if version == self._metadata.version:
+                return
+            cursor.execute("""
+                SELECT neo4j_node_id, file_path, embedding_model, updated_at FROM vector_metadata WHERE space = ?
+            """, (self.space.name,))
+            self._metadata.load(cursor.fetchall(), version)
+
+    def _sync_chunk_spans(self) -> Dict[str, Tuple[str, int, int]]:
+        """Reload the chunk id -> (parent, start line, end line) map when vector_metadata changed"""
+        self._ensure_schema()
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM vector_metadata WHERE space = ?",
+                           (self.space.name,))
+            version = cursor.fetchone()
+            if version != self._chunk_spans_version:
+                cursor.execute("""
+                    SELECT neo4j_node_id, parent_node_id, chunk_start, chunk_end FROM vector_metadata
+                    WHERE space = ? AND parent_node_id IS NOT NULL
+                """, (self.space.name,))
+                self._chunk_spans = {row[0]: row[1:] for row in cursor.fetchall()}
+                self._chunk_spans_version = version
+        return self._chunk_spans
+
+    def _full_precision_vectors(self, node_ids: List[str]) -> Dict[str, np.ndarray]:
+        """Full-precision vectors kept for node_ids (vector_full copies or raw float64 rows)"""
+        if not node_ids:
+            return {}
+        if self.segment_store is not None:
+            vectors = {node_id: self.segment_store.get(node_id) for node_id in node_ids}
+            return {node_id: vector for node_id, vector in vectors.items() if vector is not None}
+
+        with self.db.transaction() as cursor:
+            cursor.execute(f"""
+                SELECT neo4j_node_id, vector_full, vector_data, vector_dtype FROM vectors
+                WHERE space = ? AND neo4j_node_id IN ({",".join("?" * len(node_ids))}) ORDER BY id
+            """, [self.space.name] + node_ids)
+            rows = cursor.fetchall()
+
+        raw_size = self.vector_dim * np.dtype(np.float64).itemsize
+        vectors = {}
+        for node_id, full_blob, vector_data, vector_dtype in rows:
+            # Later rows win, like in the resident index
+            vectors.pop(node_id, None)
+            if full_blob is not None:
+                vectors[node_id] = np.frombuffer(full_blob, dtype=np.float32)
+            elif (vector_dtype or "float64") == "float64" and len(vector_data) == raw_size:
+                vectors[node_id] = np.frombuffer(vector_data, dtype=np.float64)
+        return vectors
+
+    def _rerank(self, query_embedding: np.ndarray, candidates: List[Tuple[str, float]],
+                top_k: int, min_similarity: float,
+                vectors: Dict[str, np.ndarray] = None) -> List[Tuple[str, float]]:
+        """Rescore quantized candidates against their full-precision vectors"""
+        if not candidates:
+            return []
 
-            if stored_norm > 0:
-                similarity = dot_product / (query_norm * stored_norm)
-                if similarity >= min_similarity:
-                    results.append((node_id, float(similarity)))
+        query, _ = normalize_rows(query_embedding)
+        if vectors is None:
+            vectors = self._full_precision_vectors([node_id for node_id, _ in candidates])
 
-        conn.close()
+        rescored = []
+        for node_id, score in candidates:
+            vector = vectors.get(node_id)
+            if vector is not None:
+                norm = np.linalg.norm(vector)
+                score = float(query[0] @ vector / norm) if norm > 0 else score
+            rescored.append((node_id, score))
 
-        # Sort by similarity (descending) and return top_k
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results[:top_k]
+        rescored.sort(key=lambda x: x[1], reverse=True)
+        return [(node_id, score) for node_id, score in rescored[:top_k] if score >= min_similarity]
 
     def get_stored_embeddings_count(self) -> int:
         """Get count of stored embeddings"""
-        conn = sqlite3.connect(self.sqlite_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM vectors")
-        count = cursor.fetchone()[0]
-        conn.close()
+        if self.segment_store is not None:
+            return len(self.segment_store)
+
+        with self.db.transaction() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM vectors WHERE space = ?", (self.space.name,))
+            count = cursor.fetchone()[0]
         return count
 
     def get_embedding_stats(self) -> Dict:
         """Get statistics about stored embeddings"""
-        conn = sqlite3.connect(self.sqlite_path)
-        cursor = conn.cursor()
+        self._ensure_schema()
+        stats = {"space": self.space.name}
+        with self.db.transaction() as cursor:
+            # Count by model
+            cursor.execute("""
+                SELECT embedding_model, COUNT(*)
+                FROM vector_metadata
+                WHERE space = ?
+                GROUP BY embedding_model
+            """, (self.space.name,))
+            stats["by_model"] = dict(cursor.fetchall())
+
+            # Every space with its file count and coverage of the active one
+            spaces = load_spaces(cursor)
+            cursor.execute("SELECT space, COUNT(*) FROM vector_metadata GROUP BY space")
+            files = dict(cursor.fetchall())
+            stats["spaces"] = {}
+            for name, space in spaces.items():
+                stats["spaces"][name] = {"model": space.model, "dim": space.dim, "status": space.status,
+                                         "files": files.get(name, 0)}
+                if space.status == BUILDING:
+                    covered, total = self._coverage(cursor, name)
+                    stats["spaces"][name]["coverage"] = f"{covered}/{total}"
+
+        if self.embedding_cache is not None:
+            stats["embedding_cache"] = self.embedding_cache.stats()
+
+        if self.segment_store is not None:
+            segment_stats = self.segment_store.stats()
+            stats["total_vectors"] = segment_stats["live_vectors"]
+            stats["avg_vector_norm"] = segment_stats["avg_vector_norm"]
+            stats["segments"] = segment_stats
+            return stats
+
+        with self.db.transaction() as cursor:
+            # Total count
+            cursor.execute("SELECT COUNT(*) FROM vectors WHERE space = ?", (self.space.name,))
+            stats["total_vectors"] = cursor.fetchone()[0]
+
+            # Average vector norm
+            cursor.execute("SELECT AVG(vector_norm) FROM vectors WHERE space = ?", (self.space.name,))
+            avg_norm = cursor.fetchone()[0]
+            stats["avg_vector_norm"] = float(avg_norm) if avg_norm else 0.0
+
+            # Storage precision and bytes per stored vector
+            stats["storage_precision"] = self.storage_precision
+            cursor.execute("""
+                SELECT COALESCE(vector_dtype, 'float64'), COUNT(*),
+                       AVG(length(vector_data)), AVG(COALESCE(length(vector_full), 0))
+                FROM vectors
+                WHERE space = ?
+                GROUP BY 1
+            """, (self.space.name,))
+            stats["by_precision"] = {
+                dtype: {"vectors": count, "avg_bytes": round(avg_bytes, 1), "avg_rerank_bytes": round(avg_full, 1)}
+                for dtype, count, avg_bytes, avg_full in cursor.fetchall()
+            }
+        return stats
 
-        stats = {}
+    def stored_files(self) -> Dict[str, str]:
+        """file path -> SynapseFile node id of every file with vectors in the active space"""
+        self._ensure_schema()
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                SELECT DISTINCT file_path, COALESCE(parent_node_id, neo4j_node_id) FROM vector_metadata
+                WHERE space = ?
+            """, (self.space.name,))
+            return dict(cursor.fetchall())
+
+    def remove_embeddings(self, file_paths: List[str]):
+        """Delete metadata and vectors stored for the given file paths, in every vector space"""
+        if not file_paths:
+            return
+
+        self._ensure_schema()
+        with self.db.transaction() as cursor:
+            removed: Dict[str, List[str]] = {}
+            for path in file_paths:
+                cursor.execute("SELECT space, neo4j_node_id FROM vector_metadata WHERE file_path = ?", (path,))
+                path_rows = cursor.fetchall()
+                # Vectors first: they are found through their metadata rows
+                cursor.executemany("DELETE FROM vectors WHERE space = ? AND neo4j_node_id = ?", path_rows)
+                cursor.execute("DELETE FROM vector_metadata WHERE file_path = ?", (path,))
+                for space, node_id in path_rows:
+                    removed.setdefault(space, []).append(node_id)
+
+            self._remove_term_statistics(cursor, file_paths)
+            spaces = load_spaces(cursor)
+
+        if self.vector_storage == "segments":
+            for name, node_ids in removed.items():
+                if name == self.space.name:
+                    self.segment_store.delete(node_ids)
+                elif name in spaces:
+                    self._segment_store_for(spaces[name]).delete(node_ids)
+
+    def migrate_to_segments(self) -> int:
+        """
+        Move BLOB vectors from the vectors table into segment files,
+        leaving only metadata in SQLite. Returns the number of vectors moved.
+        """
+        if self.segment_store is None:
+            raise RuntimeError("Segment storage is not enabled (set SYNAPSE_VECTOR_STORAGE=segments)")
 
-        # Count by model
-        cursor.execute("""
-            SELECT embedding_model, COUNT(*)
-            FROM vector_metadata
-            GROUP BY embedding_model
-        """)
-        stats["by_model"] = dict(cursor.fetchall())
+        self._ensure_schema()
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                SELECT neo4j_node_id, vector_data, vector_dtype, vector_norm FROM vectors WHERE space = ? ORDER BY id
+            """, (self.space.name,))
+            rows = cursor.fetchall()
 
-        # Total count
-        cursor.execute("SELECT COUNT(*) FROM vectors")
-        stats["total_vectors"] = cursor.fetchone()[0]
+            matching, matrix = self._decode_vectors([row[1:] for row in rows])
+            node_ids = [row[0] for row, keep in zip(rows, matching) if keep]
+            if node_ids:
+                self.segment_store.append(node_ids, matrix)
 
-        # Average vector norm
-        cursor.execute("SELECT AVG(vector_norm) FROM vectors")
-        avg_norm = cursor.fetchone()[0]
-        stats["avg_vector_norm"] = float(avg_norm) if avg_norm else 0.0
+            cursor.execute("DELETE FROM vectors WHERE space = ?", (self.space.name,))
+        return len(node_ids)
 
-        conn.close()
-        return stats
+    def migrate_precision(self, precision: str) -> Dict:
+        """
+        Re-encode every vector of the engine's space in place at the given precision and
+        make it the engine's storage precision. Vectors are decoded from
+        their current encoding (or their full-precision copy, if kept), PQ
+        codebooks are trained on them first, and the file is vacuumed so the
+        space is returned. Row ids are kept; the store generation is bumped
+        so indexes in other processes reload.
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown vector precision: {precision}")
+        if self.segment_store is not None:
+            raise RuntimeError("Segment storage always holds float32 vectors")
+
+        self._ensure_schema()
+        self.db.checkpoint()
+        bytes_before = self.sqlite_path.stat().st_size
+
+        row_ids, matrix = self._read_full_precision_rows()
+        self._rewrite_vectors(row_ids, matrix, precision)
+
+        bytes_after = self.sqlite_path.stat().st_size
+        return {
+            "precision": precision,
+            "vectors": len(row_ids),
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "reclaimed_bytes": bytes_before - bytes_after
+        }
+
+    def reduce_dimensions(self, method: str = "pca", dim: int = 256, seed: int = 0) -> Dict:
+        """
+        Fit a projection (projection.py) to dim dimensions on the stored
+        vectors of the engine's space, persist it beside the store and
+        rewrite every stored vector through it at the current storage
+        precision. From then on new vectors and queries are projected the
+        same way. The original vectors are not kept, so a store can only be
+        reduced once; re-ingest (or migrate to a new space) to undo it.
+        """
+        if method not in PROJECTION_METHODS:
+            raise ValueError(f"Unknown projection method: {method}")
+        if self.segment_store is not None:
+            raise RuntimeError("Reduce dimensions before moving vectors to segment storage")
+        if self._projection is not None:
+            raise ValueError(f"Vectors are already reduced to {self.vector_dim} dimensions")
+        if not 0 < dim < self.embedding_dim:
+            raise ValueError(f"Target dimension must be below {self.embedding_dim}")
+
+        self._ensure_schema()
+        self.db.checkpoint()
+        bytes_before = self.sqlite_path.stat().st_size
+
+        row_ids, matrix = self._read_full_precision_rows()
+        if len(row_ids) == 0 and method == "pca":
+            raise ValueError("Cannot fit PCA without stored vectors")
+        projection = Projection.fit(method, matrix, dim, seed)
+
+        # Codebooks trained at the old dimension no longer apply
+        if self.pq_codebook_path.exists():
+            self.pq_codebook_path.unlink()
+        projection.save(self.projection_path)
+        self._sync_projection()
+        self._rewrite_vectors(row_ids, projection.apply(matrix), self.storage_precision)
+
+        bytes_after = self.sqlite_path.stat().st_size
+        report = {
+            "method": method,
+            "dim": dim,
+            "vectors": len(row_ids),
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "reclaimed_bytes": bytes_before - bytes_after
+        }
+        if projection.explained_variance is not None:
+            report["explained_variance"] = round(projection.explained_variance, 4)
+        return report
+
+    def _read_full_precision_rows(self) -> Tuple[List[int], np.ndarray]:
+        """Row ids and float32 vectors of the engine's space, from full-precision copies where kept"""
+        with self.db.transaction() as cursor:
+            cursor.execute("""
+                SELECT id, vector_data, vector_dtype, vector_norm, vector_full FROM vectors WHERE space = ? ORDER BY id
+            """, (self.space.name,))
+            rows = cursor.fetchall()
+
+        matching, matrix = self._decode_vectors([row[1:4] for row in rows])
+        rows = [row for row, keep in zip(rows, matching) if keep]
+        for i, row in enumerate(rows):
+            if row[4] is not None:
+                matrix[i] = np.frombuffer(row[4], dtype=np.float32) * (row[3] or 0.0)
+        return [row[0] for row in rows], matrix
+
+    def _rewrite_vectors(self, row_ids: List[int], matrix: np.ndarray, precision: str):
+        """
+        Re-encode rows in place at precision (training PQ codebooks first),
+        bump the generation so other processes reload, and VACUUM.
+        """
+        unit, norms = normalize_rows(matrix)
+
+        if precision == "pq":
+            if len(unit) == 0:
+                raise ValueError("Cannot train PQ codebooks without stored vectors")
+            pq_codec = PQCodec.train(unit, self.pq_subspaces)
+            tmp_path = Path(f"{self.pq_codebook_path}.tmp")
+            with open(tmp_path, "wb") as f:
+                np.savez(f, codebooks=pq_codec.codebooks)
+            os.replace(tmp_path, self.pq_codebook_path)
+            self._pq_codec = pq_codec
+
+        self.storage_precision = precision
+        codec = self._storage_codec()
+        if codec is None:
+            blobs = [vector.astype(np.float64).tobytes() for vector in matrix]
+        else:
+            blobs = [code.tobytes() for code in codec.encode(unit)]
+        keep_full = codec is not None and codec.lossy and self.rerank_factor > 0
+
+        with self.db.transaction() as cursor:
+            cursor.executemany("""
+                UPDATE vectors SET vector_data = ?, vector_dtype = ?, vector_full = ?, vector_norm = ?
+                WHERE id = ?
+            """, [
+                (blob, codec.name if codec else "float64", unit[i].tobytes() if keep_full else None,
+                 float(norms[i]), row_id)
+                for i, (row_id, blob) in enumerate(zip(row_ids, blobs))
+            ])
+            self._bump_generation(cursor)
+        self.db.connection().execute("VACUUM")
+        # In WAL mode the vacuumed pages reach the file only at a checkpoint
+        self.db.checkpoint()
+
+        self._index = VectorIndex(self.vector_dim, self._index_codec())
+        self._store_state_cache = None
+        if self._ann_index is not None or self.ann_index_path.exists():
+            self.build_ann_index()
+
+    def precision_recall(self, query_embeddings: np.ndarray, top_k: int = 5) -> Dict[str, Dict]:
+        """
+        Recall@top_k of each quantized precision against exact float32
+        search over the stored vectors, with bytes per vector. Used by
+        benchmark_search.py --precision to check a precision before migrating.
+        """
+        _, node_ids, matrix = self._read_vector_rows()
+        if not node_ids:
+            return {}
+
+        codecs = [get_codec(name, self.vector_dim) for name in ("float32", "float16", "int8")]
+        if len(node_ids) >= 256:
+            codecs.append(PQCodec.train(normalize_rows(matrix)[0], self.pq_subspaces))
+
+        exact = VectorIndex(self.vector_dim)
+        exact.add(node_ids, matrix)
+        expected = [[node_id for node_id, _ in exact.search(q, top_k, -1.0)] for q in query_embeddings]
+
+        # Rerank recall: over-fetch from the codes, rescore at full precision
+        unit = dict(zip(node_ids, normalize_rows(matrix)[0]))
+        rerank_k = top_k * max(self.rerank_factor, 4)
+
+        report = {}
+        for codec in codecs:
+            index = VectorIndex(self.vector_dim, codec)
+            index.add(node_ids, matrix)
+            recalls, reranked = [], []
+            for ids, q in zip(expected, query_embeddings):
+                candidates = [node_id for node_id, _ in index.search(q, rerank_k, -1.0)]
+                recalls.append(recall_at_k(ids, candidates[:top_k]))
+                rescored = sorted(candidates, key=lambda node_id: -float(unit[node_id] @ q))
+                reranked.append(recall_at_k(ids, rescored[:top_k]))
+            report[codec.name] = {
+                "recall": round(float(np.mean(recalls)), 4),
+                "recall_reranked": round(float(np.mean(reranked)), 4),
+                "bytes_per_vector": codec.code_size,
+                "compression_vs_float64": round(self.vector_dim * 8 / codec.code_size, 1)
+            }
+        return report
+
+    def dimension_recall(self, query_embeddings: np.ndarray, dims=(512, 256, 128, 64),
+                         top_k: int = 5) -> Dict[str, Dict]:
+        """
+        Recall@top_k of each projection method and target dimension against
+        exact search over the stored vectors, with bytes per vector and scan
+        time per query. Used by benchmark_search.py --dimensions to pick a
+        dimension before reduce_dimensions.
+        """
+        if self._projection is not None:
+            raise ValueError(f"Vectors are already reduced to {self.vector_dim} dimensions")
+        _, node_ids, matrix = self._read_vector_rows()
+        if not node_ids:
+            return {}
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.vector_dim)
+
+        def run(index, projected_queries):
+            start = time.perf_counter()
+            found = [[node_id for node_id, _ in index.search(q, top_k, -1.0)] for q in projected_queries]
+            return found, (time.perf_counter() - start) * 1000 / max(len(projected_queries), 1)
+
+        exact = VectorIndex(self.vector_dim)
+        exact.add(node_ids, matrix)
+        expected, exact_ms = run(exact, queries)
+        report = {"exact": {self.vector_dim: {"recall": 1.0, "bytes_per_vector": self.vector_dim * 4,
+                                              "search_ms": round(exact_ms, 3)}}}
+
+        for method in PROJECTION_METHODS:
+            report[method] = {}
+            for dim in dims:
+                if dim >= self.vector_dim:
+                    continue
+                projection = Projection.fit(method, matrix, dim)
+                index = VectorIndex(dim)
+                index.add(node_ids, projection.apply(matrix))
+                found, search_ms = run(index, projection.apply(queries))
+                metrics = {
+                    "recall": round(float(np.mean([recall_at_k(e, f) for e, f in zip(expected, found)])), 4),
+                    "bytes_per_vector": dim * 4,
+                    "search_ms": round(search_ms, 3)
+                }
+                if projection.explained_variance is not None:
+                    metrics["explained_variance"] = round(projection.explained_variance, 4)
+                report[method][dim] = metrics
+        return report
+
+    def migration_engine(self) -> Optional["VectorEngine"]:
+        """
+        Engine writing the configured model's space while the store still
+        serves another one (a migration is pending), otherwise None.
+        """
+        if self.configured_model == self.embedding_model and \
+                model_dimension(self.configured_model) == self.embedding_dim:
+            return None
+        if self._migration_engine is None:
+            self._migration_engine = VectorEngine(self.synapse_root, self.configured_model)
+        return self._migration_engine
+
+    def coverage(self) -> Tuple[int, int]:
+        """(files of the active space this space holds at the same content hash, files in the active space)"""
+        self._ensure_schema()
+        with self.db.transaction() as cursor:
+            return self._coverage(cursor, self.space.name)
+
+    def _coverage(self, cursor, name: str) -> Tuple[int, int]:
+        active = active_space(cursor)
+        if active is None or active.name == name:
+            cursor.execute("SELECT COUNT(*) FROM vector_metadata WHERE space = ?", (name,))
+            count = cursor.fetchone()[0]
+            return count, count
+        cursor.execute("""
+            SELECT COUNT(t.id), COUNT(*) FROM vector_metadata a
+            LEFT JOIN vector_metadata t
+                ON t.space = ? AND t.neo4j_node_id = a.neo4j_node_id AND t.content_hash IS a.content_hash
+            WHERE a.space = ?
+        """, (name, active.name))
+        return tuple(cursor.fetchone())
+
+    def migrate_space(self, fetch_texts: Callable[[List[Tuple[str, str]]], Dict[str, str]],
+                      batch_size: int = None, progress: Callable[[int, int], None] = None) -> Dict:
+        """
+        Embed every file of the active space that this engine's space lacks
+        (or holds for older content), then make this space active if it
+        covers them all. fetch_texts maps (neo4j_node_id, file_path) pairs to
+        the text to embed; pairs it leaves out are skipped and keep the
+        migration from completing. The active space serves queries
+        throughout, and a rerun only embeds what is still missing.
+        """
+        self._ensure_schema()
+        batch_size = batch_size or self.embedding_batch_size
+        embedded = 0
+        last_id = 0
+
+        while True:
+            with self.db.transaction() as cursor:
+                active = active_space(cursor)
+                if active is None or active.name == self.space.name:
+                    break
+                # Keyset paging over the active space; files re-ingested
+                # meanwhile get new ids and are reached later in the pass
+                cursor.execute("""
+                    SELECT a.id, a.neo4j_node_id, a.file_path, a.content_hash,
+                           a.parent_node_id, a.chunk_start, a.chunk_end FROM vector_metadata a
+                    WHERE a.space = ? AND a.id > ? AND NOT EXISTS (
+                        SELECT 1 FROM vector_metadata t
+                        WHERE t.space = ? AND t.neo4j_node_id = a.neo4j_node_id AND t.content_hash IS a.content_hash
+                    )
+                    ORDER BY a.id LIMIT ?
+                """, (active.name, last_id, self.space.name, batch_size))
+                rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            texts = fetch_texts([(row[1], row[2]) for row in rows])
+            jobs = [(node_id, file_path, content_hash, texts[node_id], parent and (parent, start, end))
+                    for _, node_id, file_path, content_hash, parent, start, end in rows if node_id in texts]
+            if jobs:
+                if self.embedding_model == "simple_tfidf":
+                    # A page can hold part of a file's chunks; the rest follow on later pages
+                    self.update_term_statistics(file_documents((job[1], job[3]) for job in jobs),
+                                                merge=any(job[4] for job in jobs))
+                embeddings = self.generate_embeddings([job[3] for job in jobs], strict=True)
+                self.store_embeddings([job[:3] + (embedding,) for job, embedding in zip(jobs, embeddings)],
+                                      chunks=[job[4] for job in jobs])
+                embedded += len(jobs)
+            if progress is not None:
+                progress(*self.coverage())
+
+        covered, total = self.coverage()
+        return {
+            "space": self.space.name,
+            "embedded": embedded,
+            "covered": covered,
+            "total": total,
+            "activated": self.activate_space()
+        }
+
+    def activate_space(self) -> bool:
+        """
+        Make this engine's space the active one, provided it covers every
+        file of the current active space. The check and the switch run in
+        one write transaction, so no ingestion batch can slip in between.
+        Returns whether the space is active.
+        """
+        self._ensure_schema()
+        with self.db.transaction() as cursor:
+            # Writing first takes the database write lock
+            cursor.execute("UPDATE vector_spaces SET activated_at = datetime('now') WHERE space = ?",
+                           (self.space.name,))
+            active = active_space(cursor)
+            if active is not None and active.name != self.space.name:
+                covered, total = self._coverage(cursor, self.space.name)
+                if covered < total:
+                    cursor.connection.rollback()
+                    return False
+                cursor.execute("UPDATE vector_spaces SET status = ? WHERE space = ?", (RETIRED, active.name))
+            cursor.execute("UPDATE vector_spaces SET status = ? WHERE space = ?", (ACTIVE, self.space.name))
+        self.space.status = ACTIVE
+        return True
+
+    def compact_store(self) -> Dict:
+        """
+        Delete what no search should see: retired vector spaces, metadata
+        (whole-file or chunk rows) superseded by a newer node for the same
+        file, vectors without a
+        metadata row, and term statistics of files with no stored embedding.
+        Then VACUUM and ANALYZE the file (and compact segment files). Returns
+        the counts and reclaimed bytes.
+        """
+        self._ensure_schema()
+        self.db.checkpoint()
+        bytes_before = self.sqlite_path.stat().st_size
+
+        with self.db.transaction() as cursor:
+            retired = [space for space in load_spaces(cursor).values()
+                       if space.status == RETIRED and space.name != self.space.name]
+            for space in retired:
+                cursor.execute("DELETE FROM vectors WHERE space = ?", (space.name,))
+                cursor.execute("DELETE FROM vector_metadata WHERE space = ?", (space.name,))
+                cursor.execute("DELETE FROM vector_spaces WHERE space = ?", (space.name,))
+
+            # Rows of a file belong to its node, or to it as chunks (parent_node_id);
+            # only rows of an older node of the same path are stale
+            cursor.execute("""
+                DELETE FROM vector_metadata
+                WHERE file_path IS NOT NULL AND (space, COALESCE(parent_node_id, neo4j_node_id)) NOT IN (
+                    SELECT space, COALESCE(parent_node_id, neo4j_node_id) FROM vector_metadata WHERE id IN (
+                        SELECT MAX(id) FROM vector_metadata WHERE file_path IS NOT NULL GROUP BY space, file_path
+                    )
+                )
+            """)
+            stale_metadata = cursor.rowcount
+
+            cursor.execute("""
+                DELETE FROM vectors WHERE neo4j_node_id IS NULL OR NOT EXISTS (
+                    SELECT 1 FROM vector_metadata m
+                    WHERE m.space = vectors.space AND m.neo4j_node_id = vectors.neo4j_node_id
+                )
+            """)
+            orphan_vectors = cursor.rowcount
+
+            cursor.execute("""
+                SELECT file_path FROM document_terms WHERE file_path NOT IN (
+                    SELECT file_path FROM vector_metadata WHERE file_path IS NOT NULL
+                )
+            """)
+            stale_documents = [row[0] for row in cursor.fetchall()]
+            self._remove_term_statistics(cursor, stale_documents)
+
+            orphan_segment_ids = []
+            if self.segment_store is not None:
+                cursor.execute("SELECT neo4j_node_id FROM vector_metadata WHERE space = ?", (self.space.name,))
+                known = {row[0] for row in cursor.fetchall()}
+                self.segment_store.refresh()
+                orphan_segment_ids = [node_id for node_id in self.segment_store.positions if node_id not in known]
+
+            if orphan_vectors:
+                self._bump_generation(cursor)
+
+        for space in retired:
+            self._remove_space_files(space)
+
+        report = {
+            "retired_spaces": [space.name for space in retired],
+            "stale_metadata": stale_metadata,
+            "orphan_vectors": orphan_vectors + len(orphan_segment_ids),
+            "stale_term_documents": len(stale_documents)
+        }
+        if self.segment_store is not None:
+            self.segment_store.delete(orphan_segment_ids)
+            report["segments"] = self.segment_store.compact()
+
+        conn = self.db.connection()
+        conn.execute("VACUUM")
+        conn.execute("ANALYZE")
+        self.db.checkpoint()
+
+        bytes_after = self.sqlite_path.stat().st_size
+        report.update({
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "reclaimed_bytes": bytes_before - bytes_after
+        })
+        return report
+
+    def _remove_space_files(self, space: VectorSpace):
+        """Delete the segment files, IVF index, PQ codebooks and projection of a space"""
+        if self.vector_storage == "segments":
+            self._segment_store_for(space).clear()
+        for suffix in (".ivf.npz", ".pq.npz", ".proj.npz"):
+            path = self.sqlite_path.with_suffix(f"{space.file_suffix}{suffix}")
+            if path.exists():
+                path.unlink()
+
+    def compact_segments(self) -> Dict:
+        """Rewrite segment files without their deleted rows"""
+        if self.segment_store is None:
+            raise RuntimeError("Segment storage is not enabled (set SYNAPSE_VECTOR_STORAGE=segments)")
+        return self.segment_store.compact()
 
     def clear_embeddings(self):
-        """Clear all stored embeddings"""
-        conn = sqlite3.connect(self.sqlite_path)
-        cursor = conn.cursor()
-
-        cursor.execute("DELETE FROM vectors")
-        cursor.execute("DELETE FROM vector_metadata")
-
-        conn.commit()
-        conn.close()
+        """
+        Clear all stored embeddings in every vector space. With nothing left
+        to migrate, the configured model's space becomes the active one.
+        """
+        self._ensure_schema()
+        with self.db.transaction() as cursor:
+            spaces = load_spaces(cursor)
+            cursor.execute("DELETE FROM vectors")
+            cursor.execute("DELETE FROM vector_metadata")
+            cursor.execute("DELETE FROM vector_spaces")
+
+            # Term statistics describe the stored documents
+            cursor.execute("DELETE FROM document_terms")
+            cursor.execute("DELETE FROM term_document_frequency")
+            self._apply_term_deltas(cursor, {})
+
+        if self.segment_store is not None:
+            self.segment_store.clear()
+        for space in spaces.values():
+            if space.name != self.space.name:
+                self._remove_space_files(space)
+
+        self._index.reset()
+        self._ann_index = None
+        if self.ann_index_path.exists():
+            self.ann_index_path.unlink()
+
+        space = self._resolve_space()
+        if space.name != self.space.name or space.storage_key != self.space.storage_key:
+            self._bind_space(space)
+        self.space = space
+        self._migration_engine = None
 
 # Convenience functions
 def create_vector_engine() -> VectorEngine:
@@ -337,6 +1905,55 @@ def generate_query_embedding(query: str) -> np.ndarray:
     engine = VectorEngine()
     return engine.generate_embedding(query)
 
+def file_documents(texts: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Join (file_path, text) pairs of one file's chunks into one document per path, for term statistics"""
+    documents: Dict[str, List[str]] = {}
+    for file_path, text in texts:
+        documents.setdefault(file_path, []).append(text)
+    return [(file_path, "\n".join(parts)) for file_path, parts in documents.items()]
+
+
+def _best_chunks(results: List[Tuple[str, float]], chunk_spans: Dict[str, Tuple[str, int, int]],
+                 top_k: int) -> List[Tuple[str, float, Optional[Dict]]]:
+    """
+    Report chunk hits as their parent node, keeping each node's best chunk:
+    (node_id, score, span) for the top_k nodes of a best-first result list
+    """
+    best = []
+    seen = set()
+    for node_id, score in results:
+        parent, start, end = chunk_spans.get(node_id, (node_id, None, None))
+        if parent in seen:
+            continue
+        seen.add(parent)
+        span = {"chunk_id": node_id, "start_line": start, "end_line": end} if start is not None else None
+        best.append((parent, score, span))
+        if len(best) == top_k:
+            break
+    return best
+
+
+def _fuse_results(per_variant: List[List[Tuple[str, float]]], fusion: str = "max") -> List[Tuple[str, float, int]]:
+    """Merge per-variant (node_id, score) lists into (node_id, fused score, winning variant), best first"""
+    fused: Dict[str, List] = {}
+    for variant, results in enumerate(per_variant):
+        for rank, (node_id, score) in enumerate(results):
+            value = score if fusion == "max" else 1.0 / (RRF_K + rank + 1)
+            entry = fused.get(node_id)
+            if entry is None:
+                fused[node_id] = [value, variant, value]
+                continue
+            if fusion == "max":
+                entry[0] = max(entry[0], value)
+            else:
+                entry[0] += value
+            # Earlier variants win ties
+            if value > entry[2]:
+                entry[1], entry[2] = variant, value
+
+    ranked = sorted(fused.items(), key=lambda item: item[1][0], reverse=True)
+    return [(node_id, float(score), variant) for node_id, (score, variant, _) in ranked]
+
 if __name__ == "__main__":
     # Simple CLI for testing
     import sys
@@ -344,12 +1961,50 @@ if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python vector_engine.py <test_text>")
         print("       python vector_engine.py --stats")
+        print("       python vector_engine.py --build-ann [nlist]")
+        print("       python vector_engine.py --migrate-segments")
+        print("       python vector_engine.py --compact-segments")
+        print("       python vector_engine.py --compact")
+        print("       python vector_engine.py --migrate-precision <float64|float32|float16|int8|pq>")
+        print("       python vector_engine.py --reduce <pca|random> <dim>")
         sys.exit(1)
 
     if sys.argv[1] == "--stats":
         engine = create_vector_engine()
         stats = engine.get_embedding_stats()
         print(json.dumps(stats, indent=2))
+    elif sys.argv[1] == "--build-ann":
+        engine = create_vector_engine()
+        nlist = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        index = engine.build_ann_index(nlist)
+        if index is None:
+            print("No vectors stored; nothing to index")
+        else:
+            print(f"Built IVF index: {len(index)} vectors in {index.nlist} lists -> {engine.ann_index_path}")
+    elif sys.argv[1] == "--migrate-segments":
+        engine = create_vector_engine()
+        moved = engine.migrate_to_segments()
+        print(f"Moved {moved} vectors into {engine.segment_store.directory}")
+    elif sys.argv[1] == "--compact-segments":
+        engine = create_vector_engine()
+        result = engine.compact_segments()
+        print(json.dumps(result, indent=2))
+    elif sys.argv[1] == "--compact":
+        engine = create_vector_engine()
+        result = engine.compact_store()
+        print(json.dumps(result, indent=2))
+        print(f"✓ Reclaimed {result['reclaimed_bytes']} bytes")
+    elif sys.argv[1] == "--migrate-precision":
+        engine = create_vector_engine()
+        result = engine.migrate_precision(sys.argv[2] if len(sys.argv) > 2 else "float32")
+        print(json.dumps(result, indent=2))
+        print(f"Set SYNAPSE_VECTOR_PRECISION={result['precision']} so new vectors use the same encoding")
+    elif sys.argv[1] == "--reduce":
+        engine = create_vector_engine()
+        method = sys.argv[2] if len(sys.argv) > 2 else "pca"
+        result = engine.reduce_dimensions(method, int(sys.argv[3]) if len(sys.argv) > 3 else 256)
+        print(json.dumps(result, indent=2))
+        print(f"✓ Stored vectors reduced to {result['dim']} dimensions ({engine.projection_path})")
     else:
         text = " ".join(sys.argv[1:])
         engine = create_vector_engine()
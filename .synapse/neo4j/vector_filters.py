@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Metadata Filters for Synapse System
+===================================
+
+Compact in-memory copies of the vector_metadata columns, so a filtered
+similarity search can drop non-matching rows before any vector is scored.
+
+Every node id gets a stable integer slot. Columns are arrays indexed by
+slot (file type and embedding model as small integer codes, updated_at as
+epoch seconds, paths in sorted order for prefix range lookups), and a
+filter evaluates to one boolean bitmap over slots. Index blocks are
+translated to slot arrays once and cached, so masking a block is a single
+bitmap gather.
+
+Supported filters (values may be a string or a list of strings):
+
+    path_prefix       file paths starting with any of the prefixes
+    file_type         extension without the dot ("md", "rs"), as on SynapseFile.type
+    embedding_model   model that produced the vector
+    updated_after     datetime, epoch seconds or ISO string (UTC)
+"""
+
+import weakref
+from datetime import datetime, timezone
+from pathlib import PurePosixPath
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+FILTER_KEYS = ("path_prefix", "file_type", "embedding_model", "updated_after")
+
+
+def file_type(file_path: str) -> str:
+    """Extension without the dot, or 'unknown' (matches ingestion's SynapseFile.type)"""
+    suffix = PurePosixPath(file_path or "").suffix
+    return suffix[1:].lower() if suffix else "unknown"
+
+
+def _timestamp(value) -> float:
+    """Epoch seconds for a datetime, number or ISO string; naive times are UTC"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def normalize_filters(filters: Optional[Dict]) -> Optional[Tuple]:
+    """
+    Validate a filter dict and return a hashable canonical form, or None
+    when nothing is filtered. Unknown keys raise ValueError.
+    """
+    if not filters:
+        return None
+
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown vector filter: {', '.join(sorted(unknown))}")
+
+    normalized = []
+    for key in FILTER_KEYS:
+        value = filters.get(key)
+        if value is None:
+            continue
+        if key == "updated_after":
+            normalized.append((key, _timestamp(value)))
+            continue
+        values = [value] if isinstance(value, str) else list(value)
+        if key == "file_type":
+            values = [v.lstrip(".").lower() for v in values]
+        normalized.append((key, tuple(sorted(set(values)))))
+    return tuple(normalized) or None
+
+
+class MetadataColumns:
+    """Slot-indexed metadata columns with filter bitmaps"""
+
+    def __init__(self):
+        self.slots: Dict[str, int] = {}
+        self.version = None
+        self._bitmaps: Dict[Tuple, np.ndarray] = {}
+        self._block_slots: Dict[int, Tuple[weakref.ref, np.ndarray]] = {}
+        self._set_columns(np.empty(0, dtype=np.int64), [], [], [], 0)
+
+    def __len__(self) -> int:
+        return int(self.present.sum())
+
+    def load(self, rows: Iterable[Tuple[str, str, str, Optional[str]]], version=None):
+        """Replace the columns with (node_id, file_path, embedding_model, updated_at) rows"""
+        rows = list(rows)
+        for node_id, _, _, _ in rows:
+            if node_id not in self.slots:
+                self.slots[node_id] = len(self.slots)
+
+        size = len(self.slots)
+        row_slots = np.fromiter((self.slots[row[0]] for row in rows), dtype=np.int64, count=len(rows))
+        self._set_columns(row_slots, [row[1] or "" for row in rows], [row[2] or "" for row in rows],
+                          [row[3] for row in rows], size)
+        self.version = version
+
+    def _set_columns(self, row_slots: np.ndarray, paths: List[str], models: List[str], updated: List, size: int):
+        self.present = np.zeros(size, dtype=bool)
+        self.present[row_slots] = True
+
+        self.paths = np.full(size, "", dtype=object)
+        self.paths[row_slots] = paths
+        # Slots in path order, for prefix range lookups
+        self._path_order = row_slots[np.argsort(self.paths[row_slots], kind="stable")]
+        self._sorted_paths = self.paths[self._path_order]
+
+        self.type_codes, self.types = self._encode([file_type(path) for path in paths], row_slots, size)
+        self.model_codes, self.models = self._encode(models, row_slots, size)
+
+        # updated_at is SQLite datetime('now') text, i.e. UTC
+        self.updated = np.full(size, -np.inf)
+        if len(updated):
+            stamps = np.array([value or "NaT" for value in updated], dtype="datetime64[s]")
+            seconds = stamps.astype(np.int64).astype(np.float64)
+            seconds[np.isnat(stamps)] = -np.inf
+            self.updated[row_slots] = seconds
+
+        self._bitmaps = {}
+
+    @staticmethod
+    def _encode(values: List[str], row_slots, size) -> Tuple[np.ndarray, Dict[str, int]]:
+        vocabulary: Dict[str, int] = {}
+        codes = np.full(size, -1, dtype=np.int32)
+        codes[row_slots] = [vocabulary.setdefault(value, len(vocabulary)) for value in values]
+        return codes, vocabulary
+
+    def bitmap(self, filters: Tuple) -> np.ndarray:
+        """Boolean mask over slots for a normalize_filters() result"""
+        cached = self._bitmaps.get(filters)
+        if cached is not None:
+            return cached
+
+        mask = self.present.copy()
+        for key, value in filters:
+            if key == "path_prefix":
+                prefix_mask = np.zeros_like(mask)
+                for prefix in value:
+                    start = np.searchsorted(self._sorted_paths, prefix, side="left")
+                    end = np.searchsorted(self._sorted_paths, prefix + "\U0010ffff", side="left")
+                    prefix_mask[self._path_order[start:end]] = True
+                mask &= prefix_mask
+            elif key == "file_type":
+                mask &= np.isin(self.type_codes, [self.types[v] for v in value if v in self.types])
+            elif key == "embedding_model":
+                mask &= np.isin(self.model_codes, [self.models[v] for v in value if v in self.models])
+            elif key == "updated_after":
+                mask &= self.updated > value
+
+        self._bitmaps[filters] = mask
+        return mask
+
+    def block_mask(self, ids: np.ndarray, bitmap: np.ndarray) -> np.ndarray:
+        """Rows of a block of node ids that pass a filter bitmap"""
+        # Slot -1 (no metadata row) reads the appended False
+        return np.append(bitmap, False)[self._slots_for(ids)]
+
+    def _slots_for(self, ids: np.ndarray) -> np.ndarray:
+        """Slot per node id; cached for the lifetime of the (immutable) ids array"""
+        cached = self._block_slots.get(id(ids))
+        if cached is not None and cached[0]() is ids and len(cached[1]) == len(ids):
+            return cached[1]
+
+        slots = np.fromiter((self.slots.get(node_id, -1) for node_id in ids), dtype=np.int64, count=len(ids))
+        key = id(ids)
+        self._block_slots[key] = (weakref.ref(ids, lambda _, key=key: self._block_slots.pop(key, None)), slots)
+        return slots
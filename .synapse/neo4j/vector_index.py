@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Resident Vector Index for Synapse System
+========================================
+
+Keeps stored embeddings in memory as a few contiguous blocks of
+unit-length rows, so a similarity query is one matrix-vector product per
+block plus an argpartition top-k instead of a Python loop over every row.
+Blocks hold float32 rows by default, or compact codes from a quantization
+codec which are scored against the float32 query directly. Several
+queries (e.g. expanded query variants) are scored in the same pass with
+one matrix-matrix product.
+
+The index is fed by VectorEngine, which tracks the last row id it loaded
+from vector storage and appends only newer rows on the next query.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from quantization import Codec, Float32Codec
+
+# row_filter(node_ids) -> bool mask of rows a filtered search may score
+RowFilter = Callable[[np.ndarray], np.ndarray]
+
+
+def normalize_rows(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (float32 unit rows, original norms). Zero rows stay zero."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1)
+    safe_norms = np.where(norms > 0, norms, 1.0).astype(np.float32)
+    return matrix / safe_norms[:, None], norms
+
+
+class VectorIndex:
+    """
+    In-memory cosine similarity index over stored embeddings.
+
+    Each call to add() appends one block. A node id that is added again
+    supersedes its earlier row, which is masked out of scoring until the
+    blocks are compacted back into a single matrix.
+    """
+
+    max_blocks = 8
+
+    def __init__(self, dim: int, codec: Optional[Codec] = None):
+        self.dim = dim
+        self.codec = codec or Float32Codec(dim)
+        self.reset()
+
+    def reset(self):
+        """Drop all resident vectors"""
+        self.blocks: List[np.ndarray] = []
+        self.block_ids: List[np.ndarray] = []
+        self.block_live: List[np.ndarray] = []
+        self.positions: Dict[str, Tuple[int, int]] = {}
+
+        # Sync bookkeeping for the backing store
+        self.last_row_id = 0
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def add(self, node_ids: List[str], vectors: np.ndarray):
+        """Append vectors for node_ids, superseding any earlier rows"""
+        if len(node_ids) == 0:
+            return
+
+        matrix, norms = normalize_rows(vectors)
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}D vectors, got {matrix.shape[1]}D")
+
+        block = len(self.blocks)
+        self.blocks.append(self.codec.encode(matrix))
+        self.block_ids.append(np.asarray(node_ids, dtype=object))
+        # Zero vectors can never reach a positive cosine score
+        self.block_live.append(norms > 0)
+
+        for row, node_id in enumerate(node_ids):
+            previous = self.positions.get(node_id)
+            if previous is not None:
+                self.block_live[previous[0]][previous[1]] = False
+            self.positions[node_id] = (block, row)
+
+        if len(self.blocks) > self.max_blocks:
+            self.compact()
+
+    def compact(self):
+        """Merge all blocks into one, dropping superseded rows"""
+        if len(self.blocks) <= 1:
+            return
+
+        keep = [np.fromiter((self.positions.get(node_id) == (b, row)
+                             for row, node_id in enumerate(ids)), dtype=bool, count=len(ids))
+                for b, ids in enumerate(self.block_ids)]
+
+        matrix = np.concatenate([m[k] for m, k in zip(self.blocks, keep)])
+        ids = np.concatenate([i[k] for i, k in zip(self.block_ids, keep)])
+        live = np.concatenate([l[k] for l, k in zip(self.block_live, keep)])
+
+        self.blocks = [matrix]
+        self.block_ids = [ids]
+        self.block_live = [live]
+        self.positions = {node_id: (0, row) for row, node_id in enumerate(ids)}
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 5, min_similarity: float = 0.1,
+               row_filter: Optional[RowFilter] = None) -> List[Tuple[str, float]]:
+        """
+        Return up to top_k (node_id, cosine similarity) pairs, best first.
+        row_filter(node_ids) -> bool mask restricts scoring to matching rows.
+        """
+        blocks = zip(self.blocks, self.block_ids, self.block_live)
+        return search_blocks(blocks, query_embedding, self.dim, top_k, min_similarity,
+                             score=self.codec.score, row_filter=row_filter)
+
+    def search_many(self, query_embeddings: np.ndarray, top_k: int = 5, min_similarity: float = 0.1,
+                    row_filter: Optional[RowFilter] = None) -> List[List[Tuple[str, float]]]:
+        """One top-k list per query row, from a single pass over the blocks"""
+        blocks = zip(self.blocks, self.block_ids, self.block_live)
+        return search_blocks_many(blocks, query_embeddings, self.dim, top_k, min_similarity,
+                                  score_many=self.codec.score_many, row_filter=row_filter)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the resident vector blocks"""
+        return sum(block.nbytes for block in self.blocks)
+
+
+def search_blocks(blocks: Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]], query_embedding: np.ndarray,
+                  dim: int, top_k: int = 5, min_similarity: float = 0.1,
+                  score: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None,
+                  row_filter: Optional[RowFilter] = None) -> List[Tuple[str, float]]:
+    """
+    Top-k cosine search over (unit-row matrix, node ids, live mask) blocks.
+    Each block is scored with one matrix-vector product (or the codec's
+    `score` for quantized blocks); per-block top-k candidates are merged
+    at the end.
+    """
+    query = np.asarray(query_embedding, dtype=np.float32).ravel()
+    score_many = (lambda matrix, queries: score(matrix, queries[0])[:, None]) if score else None
+    return search_blocks_many(blocks, query.reshape(1, -1), dim, top_k, min_similarity, score_many,
+                              row_filter)[0]
+
+
+def search_blocks_many(blocks: Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]], query_embeddings: np.ndarray,
+                       dim: int, top_k: int = 5, min_similarity: float = 0.1,
+                       score_many: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None,
+                       row_filter: Optional[RowFilter] = None) -> List[List[Tuple[str, float]]]:
+    """
+    search_blocks for Q queries at once: each block is read and scored a
+    single time with one (N, dim) x (dim, Q) product, and one top-k list
+    is returned per query. Zero queries get an empty list.
+
+    With a row_filter, rows outside the filter are dropped before scoring
+    and only the matching rows of each block are gathered and scored.
+    """
+    queries = np.asarray(query_embeddings, dtype=np.float32)
+    if queries.ndim == 1:
+        queries = queries.reshape(1, -1)
+    if queries.shape[1] != dim:
+        raise ValueError(f"Query has {queries.shape[1]} dimensions, index has {dim}")
+
+    queries, query_norms = normalize_rows(queries)
+    active = np.flatnonzero(query_norms > 0)
+    results: List[List[Tuple[str, float]]] = [[] for _ in range(len(queries))]
+    if len(active) == 0 or top_k <= 0:
+        return results
+    queries = queries[active]
+
+    candidate_scores = [[] for _ in active]
+    candidate_ids = [[] for _ in active]
+    for matrix, ids, live in blocks:
+        if row_filter is not None and len(ids):
+            rows = np.flatnonzero(live & row_filter(ids))
+            matrix, ids, live = matrix[rows], ids[rows], np.ones(len(rows), dtype=bool)
+        if len(ids) == 0:
+            continue
+        scores = score_many(matrix, queries) if score_many else matrix @ queries.T
+        scores[~live] = -np.inf
+
+        if len(scores) > top_k:
+            top = np.argpartition(scores, -top_k, axis=0)[-top_k:]
+            for q in range(len(active)):
+                candidate_scores[q].append(scores[top[:, q], q])
+                candidate_ids[q].append(ids[top[:, q]])
+        else:
+            for q in range(len(active)):
+                candidate_scores[q].append(scores[:, q])
+                candidate_ids[q].append(ids)
+
+    for q, query_no in enumerate(active):
+        if not candidate_scores[q]:
+            continue
+        scores = np.concatenate(candidate_scores[q])
+        ids = np.concatenate(candidate_ids[q])
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        results[query_no] = [(ids[i], float(scores[i])) for i in order if scores[i] >= min_similarity]
+
+    return results
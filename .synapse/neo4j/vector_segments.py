@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Memory-Mapped Vector Segments for Synapse System
+================================================
+
+Append-only segment files holding fixed-width float32 unit vectors, read
+through numpy.memmap so every search process shares the OS page cache
+instead of copying vectors out of SQLite.
+
+Layout of a segment directory:
+
+    manifest.json            dim, generation and ordered segment names
+    seg-GGGG-NNNNNN.f32      raw float32 rows, dim values each
+    seg-GGGG-NNNNNN.ids      one "node_id<TAB>norm" line per row (commit record)
+    seg-GGGG-NNNNNN.del      uint32 row numbers of deleted rows (tombstones)
+
+Writers append vector bytes before the matching .ids line, so a row only
+becomes visible once its id line is complete. Replacing a node tombstones
+its old row and appends a new one. compact() rewrites live rows into a new
+generation of segments and drops the old files.
+"""
+
+import os
+import json
+import fcntl
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vector_index import RowFilter, normalize_rows, search_blocks, search_blocks_many
+
+
+class _Segment:
+    """Reader-side view of one segment file set"""
+
+    def __init__(self, directory: Path, name: str, dim: int):
+        self.name = name
+        self.dim = dim
+        self.vector_path = directory / f"{name}.f32"
+        self.ids_path = directory / f"{name}.ids"
+        self.tombstone_path = directory / f"{name}.del"
+
+        self.ids: List[str] = []
+        self.norms: List[float] = []
+        self.live = np.empty(0, dtype=bool)
+        self.matrix: Optional[np.ndarray] = None
+        self.ids_offset = 0
+        self.tombstone_offset = 0
+        self._ids_array = np.empty(0, dtype=object)
+
+    @property
+    def rows(self) -> int:
+        return len(self.ids)
+
+    @property
+    def ids_array(self) -> np.ndarray:
+        if len(self._ids_array) != self.rows:
+            self._ids_array = np.asarray(self.ids, dtype=object)
+        return self._ids_array
+
+    def read_new_ids(self) -> List[Tuple[str, float]]:
+        """Parse complete id lines appended since the last read"""
+        if not self.ids_path.exists() or self.ids_path.stat().st_size <= self.ids_offset:
+            return []
+
+        with open(self.ids_path, "rb") as f:
+            f.seek(self.ids_offset)
+            data = f.read()
+
+        complete = data[:data.rfind(b"\n") + 1]
+        self.ids_offset += len(complete)
+
+        entries = []
+        for line in complete.decode("utf-8").splitlines():
+            node_id, norm = line.rsplit("\t", 1)
+            entries.append((node_id, float(norm)))
+        return entries
+
+    def read_new_tombstones(self) -> np.ndarray:
+        """Row numbers deleted since the last read"""
+        if not self.tombstone_path.exists():
+            return np.empty(0, dtype=np.uint32)
+
+        size = self.tombstone_path.stat().st_size
+        size -= size % 4
+        if size <= self.tombstone_offset:
+            return np.empty(0, dtype=np.uint32)
+
+        with open(self.tombstone_path, "rb") as f:
+            f.seek(self.tombstone_offset)
+            data = f.read(size - self.tombstone_offset)
+
+        self.tombstone_offset = size
+        return np.frombuffer(data, dtype=np.uint32)
+
+    def remap(self):
+        """Map the committed rows of the vector file read-only"""
+        self.matrix = np.memmap(self.vector_path, dtype=np.float32, mode="r",
+                                shape=(self.rows, self.dim)) if self.rows else None
+
+
+class SegmentStore:
+    """
+    Segment-file vector storage with tombstone deletes.
+
+    One instance serves as both reader and writer; every public method
+    first refreshes its view from disk, so changes made by other processes
+    (e.g. a running ingestion) are picked up incrementally.
+    """
+
+    def __init__(self, directory: Path, dim: int, segment_rows: int = 65536):
+        self.directory = Path(directory)
+        self.dim = dim
+        self.segment_rows = segment_rows
+        self.manifest_path = self.directory / "manifest.json"
+        self.lock_path = self.directory / ".lock"
+        self._reset_view()
+
+    def _reset_view(self):
+        self.generation = 0
+        self.segments: List[_Segment] = []
+        self.positions: Dict[str, Tuple[int, int]] = {}
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def _read_manifest(self) -> Optional[Dict]:
+        if not self.manifest_path.exists():
+            return None
+        with open(self.manifest_path, "r") as f:
+            return json.load(f)
+
+    def refresh(self):
+        """Pick up segments, rows and tombstones written since the last refresh"""
+        manifest = self._read_manifest()
+        if manifest is None:
+            self._reset_view()
+            return
+
+        if manifest["dim"] != self.dim:
+            raise ValueError(f"Segment store holds {manifest['dim']}D vectors, expected {self.dim}D")
+
+        if manifest["generation"] != self.generation:
+            self._reset_view()
+            self.generation = manifest["generation"]
+
+        for seg_no, name in enumerate(manifest["segments"]):
+            if seg_no == len(self.segments):
+                self.segments.append(_Segment(self.directory, name, self.dim))
+            segment = self.segments[seg_no]
+
+            entries = segment.read_new_ids()
+            if entries:
+                first_row = segment.rows
+                for offset, (node_id, norm) in enumerate(entries):
+                    segment.ids.append(node_id)
+                    segment.norms.append(norm)
+                    self.positions[node_id] = (seg_no, first_row + offset)
+                new_live = np.array([norm > 0 for _, norm in entries], dtype=bool)
+                segment.live = np.concatenate((segment.live, new_live))
+                segment.remap()
+
+            for row in segment.read_new_tombstones():
+                row = int(row)
+                segment.live[row] = False
+                node_id = segment.ids[row]
+                if self.positions.get(node_id) == (seg_no, row):
+                    del self.positions[node_id]
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self.positions)
+
+    def get(self, node_id: str) -> Optional[np.ndarray]:
+        """Stored vector for node_id at its original scale, or None"""
+        self.refresh()
+        position = self.positions.get(node_id)
+        if position is None:
+            return None
+        segment = self.segments[position[0]]
+        row = position[1]
+        return np.asarray(segment.matrix[row], dtype=np.float64) * segment.norms[row]
+
+    def search(self, query_embedding: np.ndarray, top_k: int = 5, min_similarity: float = 0.1,
+               row_filter: Optional[RowFilter] = None) -> List[Tuple[str, float]]:
+        """Exact cosine search straight off the memory-mapped segments"""
+        self.refresh()
+        blocks = ((s.matrix, s.ids_array, s.live) for s in self.segments if s.rows)
+        return search_blocks(blocks, query_embedding, self.dim, top_k, min_similarity, row_filter=row_filter)
+
+    def search_many(self, query_embeddings: np.ndarray, top_k: int = 5, min_similarity: float = 0.1,
+                    row_filter: Optional[RowFilter] = None) -> List[List[Tuple[str, float]]]:
+        """One top-k list per query row, from a single pass over the segments"""
+        self.refresh()
+        blocks = ((s.matrix, s.ids_array, s.live) for s in self.segments if s.rows)
+        return search_blocks_many(blocks, query_embeddings, self.dim, top_k, min_similarity,
+                                  row_filter=row_filter)
+
+    def state(self) -> Tuple[int, int, int]:
+        """(live vectors, rows ever appended in this generation, generation)"""
+        self.refresh()
+        return len(self.positions), sum(s.rows for s in self.segments), self.generation
+
+    def read_rows(self, after_seq: int = 0) -> Tuple[int, List[str], np.ndarray]:
+        """
+        Copy live rows whose sequence number (1-based position across all
+        segments of this generation) is greater than after_seq.
+        Returns (last sequence number, node ids, float32 unit matrix).
+        """
+        self.refresh()
+        node_ids: List[str] = []
+        parts: List[np.ndarray] = []
+        base = 0
+
+        for seg_no, segment in enumerate(self.segments):
+            start = max(0, after_seq - base)
+            if start < segment.rows:
+                rows = np.arange(start, segment.rows)
+                rows = rows[[self.positions.get(segment.ids[r]) == (seg_no, r) for r in rows]]
+                node_ids.extend(segment.ids[r] for r in rows)
+                parts.append(np.asarray(segment.matrix[rows]))
+            base += segment.rows
+
+        matrix = np.concatenate(parts) if parts else np.empty((0, self.dim), dtype=np.float32)
+        return max(base, after_seq), node_ids, matrix
+
+    def stats(self) -> Dict:
+        """Live/dead row counts and on-disk size"""
+        self.refresh()
+        total_rows = sum(s.rows for s in self.segments)
+        live_norms = [self.segments[s].norms[r] for s, r in self.positions.values()]
+        return {
+            "segments": len(self.segments),
+            "live_vectors": len(self.positions),
+            "dead_vectors": total_rows - len(self.positions),
+            "disk_bytes": self._disk_bytes(),
+            "avg_vector_norm": float(np.mean(live_norms)) if live_norms else 0.0
+        }
+
+    def _disk_bytes(self) -> int:
+        if not self.directory.exists():
+            return 0
+        return sum(p.stat().st_size for p in self.directory.iterdir() if p.is_file())
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialise writers across processes"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_manifest(self, generation: int, segment_names: List[str]):
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": self.dim, "generation": generation, "segments": segment_names}, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _tombstone(self, node_ids: List[str]):
+        by_segment: Dict[int, List[int]] = {}
+        for node_id in node_ids:
+            position = self.positions.get(node_id)
+            if position is not None:
+                by_segment.setdefault(position[0], []).append(position[1])
+
+        for seg_no, rows in by_segment.items():
+            with open(self.segments[seg_no].tombstone_path, "ab") as f:
+                f.write(np.asarray(rows, dtype=np.uint32).tobytes())
+
+    def _segment_name(self, generation: int, number: int) -> str:
+        return f"seg-{generation:04d}-{number:06d}"
+
+    def _write_segment(self, name: str, existing_rows: int, node_ids: List[str],
+                       matrix: np.ndarray, norms: np.ndarray):
+        """Append rows to a segment: vector bytes first, then the committing id lines"""
+        vector_path = self.directory / f"{name}.f32"
+        ids_path = self.directory / f"{name}.ids"
+
+        # Drop bytes left by an append that crashed before its ids were committed
+        with open(vector_path, "ab") as f:
+            f.truncate(existing_rows * self.dim * 4)
+            f.write(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+
+        lines = "".join(f"{node_id}\t{float(norm)!r}\n" for node_id, norm in zip(node_ids, norms))
+        with open(ids_path, "ab") as f:
+            f.write(lines.encode("utf-8"))
+
+    def append(self, node_ids: List[str], vectors: np.ndarray):
+        """Store vectors for node_ids, replacing any existing rows for them"""
+        if len(node_ids) == 0:
+            return
+
+        # Last occurrence wins within a batch
+        latest = {node_id: i for i, node_id in enumerate(node_ids)}
+        keep = sorted(latest.values())
+        node_ids = [node_ids[i] for i in keep]
+        matrix, norms = normalize_rows(np.asarray(vectors)[keep])
+
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}D vectors, got {matrix.shape[1]}D")
+
+        with self._write_lock():
+            manifest = self._read_manifest() or {"generation": 1, "segments": []}
+            generation = manifest["generation"]
+            segment_names = list(manifest["segments"])
+
+            self._tombstone(node_ids)
+
+            active_rows = self.segments[-1].rows if self.segments else self.segment_rows
+            written = 0
+            while written < len(node_ids):
+                if active_rows >= self.segment_rows:
+                    segment_names.append(self._segment_name(generation, len(segment_names) + 1))
+                    self._write_manifest(generation, segment_names)
+                    active_rows = 0
+
+                count = min(self.segment_rows - active_rows, len(node_ids) - written)
+                chunk = slice(written, written + count)
+                self._write_segment(segment_names[-1], active_rows, node_ids[chunk], matrix[chunk], norms[chunk])
+
+                active_rows += count
+                written += count
+
+            self.refresh()
+
+    def delete(self, node_ids: List[str]):
+        """Tombstone the rows stored for node_ids"""
+        if not node_ids:
+            return
+        with self._write_lock():
+            self._tombstone(node_ids)
+            self.refresh()
+
+    def compact(self) -> Dict:
+        """
+        Rewrite live rows into a fresh generation of segments and remove
+        the old files. Returns bytes on disk before and after.
+        """
+        with self._write_lock():
+            bytes_before = self._disk_bytes()
+            manifest = self._read_manifest()
+            total_rows = sum(s.rows for s in self.segments)
+            if manifest is None or total_rows == len(self.positions):
+                return {"bytes_before": bytes_before, "bytes_after": bytes_before, "reclaimed_bytes": 0}
+
+            _, node_ids, matrix = self.read_rows()
+            norms = np.array([self.segments[s].norms[r] for s, r in
+                              (self.positions[node_id] for node_id in node_ids)])
+
+            # New files first; readers switch over when the manifest is replaced
+            generation = manifest["generation"] + 1
+            segment_names = []
+            for start in range(0, len(node_ids), self.segment_rows):
+                chunk = slice(start, start + self.segment_rows)
+                name = self._segment_name(generation, len(segment_names) + 1)
+                self._write_segment(name, 0, node_ids[chunk], matrix[chunk], norms[chunk])
+                segment_names.append(name)
+            self._write_manifest(generation, segment_names)
+
+            for segment in self.segments:
+                for path in (segment.vector_path, segment.ids_path, segment.tombstone_path):
+                    if path.exists():
+                        path.unlink()
+
+            self._reset_view()
+            self.refresh()
+            bytes_after = self._disk_bytes()
+            return {
+                "bytes_before": bytes_before,
+                "bytes_after": bytes_after,
+                "reclaimed_bytes": bytes_before - bytes_after
+            }
+
+    def clear(self):
+        """Delete every segment file"""
+        with self._write_lock():
+            for path in self.directory.iterdir():
+                if path.is_file() and path != self.lock_path:
+                    path.unlink()
+            self._reset_view()
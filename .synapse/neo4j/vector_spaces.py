@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Vector Spaces for Synapse System
+================================
+
+A vector space holds the embeddings one model produces at one dimension,
+named "<model>@<dim>" (e.g. "simple_tfidf@1024", "BAAI/bge-m3@1024").
+Every vector_metadata and vectors row belongs to a space, and vectors
+from different spaces are never compared.
+
+Exactly one space is active: searches embed the query with its model and
+only read its rows. Changing EMBEDDING_MODEL registers the new model's
+space as building. Ingestion then writes both spaces, and
+`python ingestion.py --migrate-embeddings` embeds the files the new space
+is still missing. Once it covers every file of the active space at the
+same content hash, the active pointer moves to it in one transaction.
+Until then the old space keeps serving queries.
+
+    EMBEDDING_DIM          output dimension of an EMBEDDING_MODEL not listed in MODEL_DIMENSIONS;
+                           without it such a model falls back to simple_tfidf (resolve_model)
+    SYNAPSE_HASHING_DIM    dimension of the simple_tfidf hashing embedder (default 1024)
+
+Segment files, IVF indexes and PQ codebooks are kept per space. The first
+space of a store uses the original file names; later ones add a suffix
+derived from the space name.
+"""
+
+import os
+import re
+from typing import Dict, Optional
+
+ACTIVE = "active"
+BUILDING = "building"
+RETIRED = "retired"
+
+# Output dimensions of known transformer models
+MODEL_DIMENSIONS = {
+    "BAAI/bge-m3": 1024,
+    "BAAI/bge-large-en-v1.5": 1024,
+    "BAAI/bge-base-en-v1.5": 768,
+    "BAAI/bge-small-en-v1.5": 384,
+}
+
+
+def model_dimension(model: str) -> int:
+    """Embedding dimension a model produces"""
+    if model == "simple_tfidf":
+        return int(os.getenv("SYNAPSE_HASHING_DIM", 1024))
+    if model in MODEL_DIMENSIONS:
+        return MODEL_DIMENSIONS[model]
+    if os.getenv("EMBEDDING_DIM"):
+        return int(os.getenv("EMBEDDING_DIM"))
+    raise ValueError(f"Unknown output dimension for {model}; set EMBEDDING_DIM")
+
+
+# Unknown models already warned about in this process
+_unresolved_models = set()
+
+
+def resolve_model(model: str) -> str:
+    """
+    model when its output dimension is known, otherwise simple_tfidf, the
+    embedder such a model has always fallen back to, with a warning
+    """
+    if model == "simple_tfidf" or model in MODEL_DIMENSIONS or os.getenv("EMBEDDING_DIM"):
+        return model
+    if model not in _unresolved_models:
+        _unresolved_models.add(model)
+        print(f"⚠ Unknown output dimension for EMBEDDING_MODEL {model}; using simple_tfidf "
+              f"(set EMBEDDING_DIM to use it)")
+    return "simple_tfidf"
+
+
+def space_name(model: str, dim: int) -> str:
+    return f"{model}@{dim}"
+
+
+class VectorSpace:
+    """One row of the vector_spaces table"""
+
+    __slots__ = ("name", "model", "dim", "status", "storage_key")
+
+    def __init__(self, name: str, model: str, dim: int, status: str, storage_key: str):
+        self.name = name
+        self.model = model
+        self.dim = int(dim)
+        self.status = status
+        self.storage_key = storage_key
+
+    @property
+    def file_suffix(self) -> str:
+        """Inserted before .ivf.npz / .pq.npz and appended to vector_segments"""
+        return f".{self.storage_key}" if self.storage_key else ""
+
+    def __repr__(self) -> str:
+        return f"VectorSpace({self.name!r}, {self.status})"
+
+
+def load_spaces(cursor) -> Dict[str, VectorSpace]:
+    cursor.execute("SELECT space, model, dim, status, storage_key FROM vector_spaces ORDER BY created_at, space")
+    return {row[0]: VectorSpace(*row) for row in cursor.fetchall()}
+
+
+def active_space(cursor) -> Optional[VectorSpace]:
+    cursor.execute("SELECT space, model, dim, status, storage_key FROM vector_spaces WHERE status = ?", (ACTIVE,))
+    row = cursor.fetchone()
+    return VectorSpace(*row) if row else None
+
+
+def register_space(cursor, model: str, dim: int, status: str) -> VectorSpace:
+    """
+    Space for (model, dim), created with status if it is new. A retired
+    space registered as building is being migrated to again.
+    """
+    name = space_name(model, dim)
+    cursor.execute("SELECT COUNT(*) FROM vector_spaces")
+    first = cursor.fetchone()[0] == 0
+    storage_key = "" if first else re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+    cursor.execute("""
+        INSERT OR IGNORE INTO vector_spaces (space, model, dim, status, storage_key, activated_at)
+        VALUES (?, ?, ?, ?, ?, CASE WHEN ? = 'active' THEN datetime('now') END)
+    """, (name, model, dim, status, storage_key, status))
+    if status == BUILDING:
+        cursor.execute("UPDATE vector_spaces SET status = ? WHERE space = ? AND status = ?", (BUILDING, name, RETIRED))
+
+    cursor.execute("SELECT space, model, dim, status, storage_key FROM vector_spaces WHERE space = ?", (name,))
+    return VectorSpace(*cursor.fetchone())
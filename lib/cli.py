@@ -437,9 +437,34 @@ class SynapseCLI:
         script_args = []
         if args.force:
             script_args.append("--force")
+        if args.workers:
+            script_args.extend(["--workers", str(args.workers)])
+        if args.watch:
+            script_args.append("--watch")
+        if args.resume:
+            script_args.append("--resume")
+        if args.stats:
+            script_args.append("--stats")
 
         return self._run_neo4j_script("ingestion.py", script_args)
 
+    def cmd_embed_server(self, args) -> int:
+        """Run the shared embedding model server in the foreground"""
+        print("🧠 Starting embedding server (Ctrl+C to stop)")
+        return self._run_neo4j_script("embedding_server.py")
+
+    def cmd_vectors(self, args) -> int:
+        """Maintain the vector store"""
+        if args.vectors_action == "compact":
+            print("🧹 Compacting vector store")
+            return self._run_neo4j_script("vector_engine.py", ["--compact"])
+        if args.vectors_action == "migrate":
+            print("🔄 Migrating embeddings to EMBEDDING_MODEL")
+            return self._run_neo4j_script("ingestion.py", ["--migrate-embeddings"])
+
+        print(f"❌ Unknown vectors action: {args.vectors_action}")
+        return 1
+
     def cmd_health(self, args) -> int:
         """Check system health"""
         if self.current_project:
@@ -768,8 +793,23 @@ def main():
     ingest_parser = subparsers.add_parser("ingest", help="Ingest knowledge")
     ingest_parser.add_argument("--force", action="store_true",
                              help="Force full re-ingestion")
+    ingest_parser.add_argument("--workers", type=int, metavar="N",
+                             help="Prepare files in N worker processes")
+    ingest_parser.add_argument("--watch", action="store_true",
+                             help="Keep ingesting changed files until interrupted")
+    ingest_parser.add_argument("--resume", action="store_true",
+                             help="Finish an interrupted ingestion run")
+    ingest_parser.add_argument("--stats", action="store_true",
+                             help="Print per-stage timings and throughput")
 
     subparsers.add_parser("health", help="System health check")
+    subparsers.add_parser("embed-server", help="Serve the embedding model to all agents over a local socket")
+
+    vectors_parser = subparsers.add_parser("vectors", help="Maintain the vector store")
+    vectors_parser.add_argument("vectors_action", choices=["compact", "migrate"],
+                                help="compact: drop orphaned vectors and retired spaces, VACUUM/ANALYZE, "
+                                     "report reclaimed bytes; migrate: embed all files with EMBEDDING_MODEL "
+                                     "and switch searches to it once complete")
 
     # Content access
     standards_parser = subparsers.add_parser("standards", help="Get coding standards")
@@ -0,0 +1,251 @@
+"""
+In-memory stand-in for the Neo4j driver used by ingestion and context tests
+
+FakeGraph answers the Cypher statements ingestion.py and
+context_manager.py send (matched by a distinctive fragment of each),
+keeps SynapseFile nodes and their CONTAINS / REFERENCES / SIMILAR_TO
+edges, and records every statement with its parameters in .queries.
+Statements it does not know return no rows.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+class FakeResult:
+    """Rows of one statement, iterable like a neo4j Result"""
+
+    def __init__(self, rows: List[Dict] = None):
+        self.rows = rows or []
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def single(self) -> Optional[Dict]:
+        return self.rows[0] if self.rows else None
+
+
+class FakeSession:
+    """Session and transaction in one: execute_write runs the work on itself"""
+
+    def __init__(self, graph: "FakeGraph"):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query: str, **params) -> FakeResult:
+        return self.graph.run(query, params)
+
+    def execute_write(self, work, *args, **kwargs):
+        self.graph.transactions += 1
+        return work(self, *args, **kwargs)
+
+    execute_read = execute_write
+
+    def close(self):
+        pass
+
+
+class FakeGraph:
+    """SynapseFile nodes by element id, and typed edges between them"""
+
+    def __init__(self):
+        self.nodes: Dict[str, Dict] = {}
+        self.edges: Dict[Tuple[str, str, str], Dict] = {}
+        self.queries: List[Tuple[str, Dict]] = []
+        self.transactions = 0
+        self._next_id = 0
+
+    # Driver interface
+    def session(self, **kwargs) -> FakeSession:
+        return FakeSession(self)
+
+    def close(self):
+        pass
+
+    # Inspection helpers
+    def statements(self, fragment: str) -> List[Dict]:
+        """Parameters of every recorded statement containing fragment"""
+        return [params for query, params in self.queries if fragment in query]
+
+    def id_of(self, path: str) -> Optional[str]:
+        return next((node_id for node_id, node in self.nodes.items() if node["path"] == path), None)
+
+    def path_edges(self, rel_type: str) -> set:
+        """(source path, target path) of every edge of rel_type"""
+        return {(self.nodes[a]["path"], self.nodes[b]["path"]) for kind, a, b in self.edges if kind == rel_type}
+
+    def add_node(self, **props) -> str:
+        self._next_id += 1
+        node_id = f"4:fake:{self._next_id}"
+        self.nodes[node_id] = dict(props)
+        return node_id
+
+    # Statements
+    def run(self, query: str, params: Dict) -> FakeResult:
+        query = re.sub(r"\s+", " ", query).strip()
+        self.queries.append((query, params))
+        for fragment, handler in self._handlers():
+            if fragment in query:
+                return FakeResult(handler(params))
+        return FakeResult()
+
+    def _handlers(self):
+        # Most specific fragments first
+        return [
+            ("MERGE (f:SynapseFile {path: row.path})", self._merge_files),
+            ("MATCH (f:SynapseFile {path: path}) DETACH DELETE f", self._delete_paths),
+            ("MATCH (n:SynapseFile) DETACH DELETE n", self._delete_all),
+            ("RETURN f.path as path, f.hash as hash", self._paths_and_hashes),
+            ("MATCH (f:SynapseFile) RETURN f.path as path", self._paths),
+            ("RETURN f.path AS path, elementId(f) AS id", self._paths_and_ids),
+            ("RETURN elementId(f) AS id, f.path AS path, f.hash AS hash, f.summary AS summary", self._lookup_texts),
+            ("WHERE elementId(f) IN $ids RETURN elementId(f) AS id, f", self._lookup_nodes),
+            ("WHERE f.content IS NOT NULL RETURN elementId(f) AS id", self._nodes_with_content),
+            ("SET f.hash = row.hash REMOVE f.content", self._remove_content),
+            ("MERGE (parent)-[:CONTAINS]->(child)", self._contains),
+            ("MATCH (:SynapseFile {path: path})-[r:REFERENCES]->() DELETE r", self._delete_references),
+            ("MERGE (a)-[:REFERENCES]->(b)", self._references),
+            ("WHERE r.score IS NULL WITH r LIMIT 1", self._legacy_similar),
+            ("WHERE r.score IS NULL DELETE r", self._delete_legacy_similar),
+            ("MATCH (f:SynapseFile) RETURN elementId(f) AS id", self._ids),
+            ("MATCH (f:SynapseFile)-[r:SIMILAR_TO]-() WHERE elementId(f) = id DELETE r", self._delete_similar),
+            ("FOREACH (r IN ranked[$k..] | DELETE r)", self._trim_similar),
+            ("OPTIONAL MATCH (a)-[existing:SIMILAR_TO]->()", self._reverse_similar),
+            ("MERGE (a)-[r:SIMILAR_TO]->(b)", self._similar),
+        ]
+
+    def _by_path(self) -> Dict[str, str]:
+        return {node["path"]: node_id for node_id, node in self.nodes.items()}
+
+    def _drop_edges(self, node_ids: set, rel_type: str = None, outgoing_only: bool = False):
+        for key in list(self.edges):
+            kind, a, b = key
+            if rel_type is not None and kind != rel_type:
+                continue
+            if a in node_ids or (not outgoing_only and b in node_ids):
+                del self.edges[key]
+
+    def _merge_files(self, params):
+        by_path = self._by_path()
+        rows = []
+        for row in params["rows"]:
+            node_id = by_path.get(row["path"]) or self.add_node(path=row["path"])
+            by_path[row["path"]] = node_id
+            node = self.nodes[node_id]
+            node.update({key: value for key, value in row.items() if key != "i"})
+            node.pop("content", None)
+            rows.append({"i": row["i"], "node_id": node_id})
+        # Neo4j does not promise rows in UNWIND order
+        return rows[::-1]
+
+    def _delete_paths(self, params):
+        by_path = self._by_path()
+        doomed = {by_path[path] for path in params["paths"] if path in by_path}
+        self._drop_edges(doomed)
+        for node_id in doomed:
+            del self.nodes[node_id]
+        return [{"deleted": len(doomed)}]
+
+    def _delete_all(self, params):
+        self.nodes.clear()
+        self.edges.clear()
+        return []
+
+    def _paths_and_hashes(self, params):
+        return [{"path": node["path"], "hash": node.get("hash")} for node in self.nodes.values()]
+
+    def _paths(self, params):
+        return [{"path": node["path"]} for node in self.nodes.values()]
+
+    def _paths_and_ids(self, params):
+        return [{"path": node["path"], "id": node_id} for node_id, node in self.nodes.items()]
+
+    def _ids(self, params):
+        return [{"id": node_id} for node_id in self.nodes]
+
+    def _lookup_texts(self, params):
+        return [{"id": node_id, "path": self.nodes[node_id]["path"], "hash": self.nodes[node_id].get("hash"),
+                 "summary": self.nodes[node_id].get("summary")}
+                for node_id in params["ids"] if node_id in self.nodes]
+
+    def _lookup_nodes(self, params):
+        return [{"id": node_id, "f": dict(self.nodes[node_id])} for node_id in params["ids"] if node_id in self.nodes]
+
+    def _nodes_with_content(self, params):
+        rows = [{"id": node_id, "hash": node.get("hash"), "content": node["content"]}
+                for node_id, node in self.nodes.items() if node.get("content") is not None]
+        return rows[:params["limit"]]
+
+    def _remove_content(self, params):
+        for row in params["rows"]:
+            node = self.nodes.get(row["id"])
+            if node is not None:
+                node["hash"] = row["hash"]
+                node.pop("content", None)
+        return []
+
+    def _contains(self, params):
+        by_path = self._by_path()
+        for path in params["paths"]:
+            if "/" in path and path.rsplit("/", 1)[0] in by_path and path in by_path:
+                self.edges[("CONTAINS", by_path[path.rsplit("/", 1)[0]], by_path[path])] = {}
+        return []
+
+    def _delete_references(self, params):
+        by_path = self._by_path()
+        self._drop_edges({by_path[path] for path in params["paths"] if path in by_path}, "REFERENCES",
+                         outgoing_only=True)
+        return []
+
+    def _references(self, params):
+        by_path = self._by_path()
+        for edge in params["edges"]:
+            if edge["source"] in by_path and edge["target"] in by_path:
+                self.edges[("REFERENCES", by_path[edge["source"]], by_path[edge["target"]])] = {}
+        return []
+
+    def _legacy_similar(self, params):
+        legacy = sum(1 for (kind, _, _), props in self.edges.items()
+                     if kind == "SIMILAR_TO" and props.get("score") is None)
+        return [{"legacy": min(legacy, 1)}]
+
+    def _delete_legacy_similar(self, params):
+        for key, props in list(self.edges.items()):
+            if key[0] == "SIMILAR_TO" and props.get("score") is None:
+                del self.edges[key]
+        return []
+
+    def _delete_similar(self, params):
+        self._drop_edges(set(params["ids"]), "SIMILAR_TO")
+        return []
+
+    def _similar(self, params):
+        for edge in params["edges"]:
+            if edge["source"] in self.nodes and edge["target"] in self.nodes:
+                self.edges[("SIMILAR_TO", edge["source"], edge["target"])] = {"score": edge["score"]}
+        return []
+
+    def _outgoing_similar(self, node_id: str) -> List[float]:
+        return [props["score"] for (kind, a, _), props in self.edges.items() if kind == "SIMILAR_TO" and a == node_id]
+
+    def _reverse_similar(self, params):
+        for edge in params["edges"]:
+            if edge["source"] not in self.nodes or edge["target"] not in self.nodes:
+                continue
+            scores = self._outgoing_similar(edge["source"])
+            if len(scores) < params["k"] or edge["score"] > min(scores):
+                self.edges[("SIMILAR_TO", edge["source"], edge["target"])] = {"score": edge["score"]}
+        return []
+
+    def _trim_similar(self, params):
+        for node_id in params["ids"]:
+            ranked = sorted(((props["score"], key) for key, props in self.edges.items()
+                             if key[0] == "SIMILAR_TO" and key[1] == node_id), reverse=True)
+            for _, key in ranked[params["k"]:]:
+                del self.edges[key]
+        return []
@@ -0,0 +1,47 @@
+"""
+Tests for the content-addressed blob store of file contents
+"""
+
+import zlib
+import pytest
+from pathlib import Path
+import sys
+
+# Add neo4j scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / ".synapse" / "neo4j"))
+
+from blob_store import BlobStore, compress, decompress
+from file_manifest import FileManifest
+from vector_engine import VectorEngine
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """Vector engine whose store holds the blobs and manifest tables"""
+    monkeypatch.setenv("EMBEDDING_MODEL", "simple_tfidf")
+    engine = VectorEngine(tmp_path)
+    engine.initialize_vector_store()
+    return engine
+
+
+class TestBlobStore:
+    """Test suite for the content-addressed store of file contents"""
+
+    def test_round_trip_and_prune(self, engine):
+        """Identical contents share a blob; blobs outside the manifest are pruned"""
+        blobs = BlobStore(engine.sqlite_path)
+        text = "# Guide\n" + "héllo wörld\n" * 200
+        blobs.put("sha-a", text)
+        blobs.put("sha-a", "ignored: already stored")
+        blobs.put("sha-b", "other")
+        blobs.put_many([("sha-c", "zlib", zlib.compress(b"legacy"), 6)])
+
+        assert blobs.get("sha-a") == text
+        assert blobs.get_many(["sha-a", "sha-c", "sha-x"]) == {"sha-a": text, "sha-c": "legacy"}
+        assert blobs.get(None) is None and blobs.missing(["sha-b", "sha-x"]) == ["sha-x"]
+        assert decompress(*compress(text)) == text
+        assert blobs.stats()["stored_bytes"] < blobs.stats()["content_bytes"]
+
+        FileManifest(engine.sqlite_path).update([("a.md", (1, 2, 3), "sha-a"), ("copy.md", (4, 5, 6), "sha-a")])
+        assert blobs.prune() == 2
+        assert blobs.get_many(["sha-a", "sha-b", "sha-c"]) == {"sha-a": text}
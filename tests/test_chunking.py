@@ -0,0 +1,38 @@
+"""
+Tests for structural chunking of large files
+"""
+
+import io
+from pathlib import Path
+import sys
+
+# Add neo4j scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / ".synapse" / "neo4j"))
+
+from chunking import iter_chunks
+
+
+class TestChunking:
+    """Test suite for splitting files into chunks at structural boundaries"""
+
+    def test_markdown_splits_at_headings(self):
+        """Sections become chunks, fenced code is not a heading and long sections overlap"""
+        text = ("# Guide\nintro\n## Setup\n```\n# not a heading\n```\n"
+                + "".join(f"step {i} of the setup\n" for i in range(40)) + "## Usage\nrun it\n")
+        chunks = list(iter_chunks(io.StringIO(text), "md", max_chars=300, overlap_chars=50))
+
+        assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+        assert all(len(chunk.text) <= 300 for chunk in chunks)
+        assert chunks[-1].text.endswith("## Usage\nrun it\n")
+        assert chunks[-1].end_line == text.count("\n")
+        # Pieces of the long Setup section overlap and keep its heading
+        assert chunks[1].end_line >= chunks[2].start_line
+        assert chunks[2].heading == "## Setup"
+        assert "# not a heading" in chunks[0].text + chunks[1].text
+
+    def test_python_splits_at_definitions(self):
+        """Small sections are packed; decorators stay with the definition they decorate"""
+        text = "import os\n\n@cache\ndef load():\n    return 1\n\nclass Store:\n    pass\n"
+        chunks = list(iter_chunks(io.StringIO(text), "py", max_chars=40, overlap_chars=0))
+
+        assert [(chunk.start_line, chunk.end_line) for chunk in chunks] == [(1, 2), (3, 6), (7, 8)]
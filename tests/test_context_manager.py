@@ -0,0 +1,115 @@
+"""
+Tests for the context manager's vector search and result synthesis
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+# Add neo4j scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / ".synapse" / "neo4j"))
+
+from context_manager import SynapseContextManager
+from fake_neo4j import FakeGraph
+from ingestion import SynapseIngestion
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """Context manager over a throwaway ~/.synapse-system"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("EMBEDDING_MODEL", "simple_tfidf")
+    manager = SynapseContextManager()
+    manager.vector_engine.initialize_vector_store()
+    return manager
+
+
+def matched_node(path: str, score: float, span=None, content_hash: str = "sha-guide") -> dict:
+    node = {"name": Path(path).name, "path": path, "summary": "Documentation file | ~40 words",
+            "hash": content_hash, "smart_score": score, "match_type": "vector"}
+    if span:
+        node["span"] = span
+    return node
+
+
+class TestSpanExcerpts:
+    """Test suite for chunk line ranges and excerpts in synthesized context"""
+
+    def test_only_primary_matches_read_the_blob(self, manager, monkeypatch):
+        """Secondary matches get their line range from the span alone"""
+        manager.blobs.put("sha-guide", "".join(f"line {i}\n" for i in range(1, 21)))
+        span = {"chunk_id": "n1#1", "start_line": 3, "end_line": 5}
+        fetched = []
+        get = manager.blobs.get
+        monkeypatch.setattr(manager.blobs, "get", lambda sha256: fetched.append(sha256) or get(sha256))
+
+        context = manager._synthesize_context([matched_node(".synapse/standards/a.md", 1.5, span),
+                                               matched_node(".synapse/standards/b.md", 0.7, span)], "guide")
+
+        assert context["primary_matches"][0]["lines"] == "3-5"
+        assert context["primary_matches"][0]["excerpt"] == "line 3\nline 4\nline 5"
+        assert context["secondary_matches"][0]["lines"] == "3-5"
+        assert fetched == ["sha-guide"]
+
+
+class TestScopedSearch:
+    """Test suite for metadata-filtered vector search over ingested files"""
+
+    FILES = {
+        "instructions/naming.md": "# Naming\nHow to name Python modules and functions\n",
+        "standards/naming.md": "# Naming standard\nPython names use snake_case\n",
+        "standards/errors.md": "# Errors\nRaise specific exceptions in Python code\n",
+        "workflows/naming.sh": "#!/bin/bash\necho check python naming\n",
+    }
+
+    @pytest.fixture
+    def graph(self, manager):
+        """Graph and vector store filled by an ingestion run over FILES"""
+        for rel_path, text in self.FILES.items():
+            path = manager.synapse_root / ".synapse" / rel_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text)
+        graph = FakeGraph()
+        ingestion = SynapseIngestion()
+
+        def connect():
+            ingestion.driver = graph
+            return True
+
+        ingestion.connect = connect
+        assert ingestion.run_full_ingestion()
+        manager.driver = graph
+        return graph
+
+    def search(self, manager, context, monkeypatch):
+        """Vector matches of _enhanced_hybrid_search, and the filters each vector search used"""
+        searches = []
+        search_many = manager.vector_engine.similarity_search_many
+
+        def recording(*args, filters=None, **kwargs):
+            results = search_many(*args, filters=filters, **kwargs)
+            searches.append((filters, len(results)))
+            return results
+
+        monkeypatch.setattr(manager.vector_engine, "similarity_search_many", recording)
+        query = "python naming"
+        nodes = manager._enhanced_hybrid_search(query, [query], ["python", "naming"], "general", 5,
+                                                manager._vector_filters(context))
+        return [node["path"] for node in nodes if node["match_type"] == "vector"], searches
+
+    def test_prefix_filter_matches_ingested_paths(self, manager, graph, monkeypatch):
+        """A filter on an ingested directory is served without widening"""
+        paths, searches = self.search(manager, {"filters": {"path_prefix": ".synapse/standards/"}}, monkeypatch)
+
+        assert set(paths) == {".synapse/standards/naming.md", ".synapse/standards/errors.md"}
+        assert searches == [({"path_prefix": ".synapse/standards/"}, 2)]
+
+    def test_language_and_file_type_do_not_narrow_results(self, manager, graph, monkeypatch):
+        """project_language and current_file_type keep documentation of every type in reach"""
+        context = {"project_language": "python", "current_file_type": "py"}
+        assert manager._vector_filters(context) == {}
+
+        paths, searches = self.search(manager, context, monkeypatch)
+
+        assert set(paths) == {".synapse/" + rel_path for rel_path in self.FILES}
+        assert searches == [(None, 4)]
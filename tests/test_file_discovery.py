@@ -0,0 +1,42 @@
+"""
+Tests for the single-walk file discovery with ignore rules
+"""
+
+from pathlib import Path
+import sys
+
+# Add neo4j scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / ".synapse" / "neo4j"))
+
+from file_discovery import is_ignored, walk_files
+
+
+class TestFileDiscovery:
+    """Test suite for the single-walk file discovery with ignore rules"""
+
+    def make_tree(self, root):
+        files = ["a.md", "b.py", "c.txt", "notes.log", "build/out.md", "docs/keep.md", "docs/draft.md",
+                 "docs/deep/x.md", "node_modules/pkg/readme.md", ".git/HEAD.md", "src/gen/api.py", "src/main.py"]
+        for name in files:
+            (root / name).parent.mkdir(parents=True, exist_ok=True)
+            (root / name).write_text(name)
+        (root / ".gitignore").write_text("# comment\n*.log\nbuild/\n/src/gen\ndocs/*.md\n!docs/keep.md\n")
+        (root / "docs" / "deep" / ".gitignore").write_text("*.md\n")
+
+    def test_walk_prunes_ignored_paths(self, tmp_path):
+        """Ignored directories, .gitignore patterns and other extensions are left out"""
+        self.make_tree(tmp_path)
+        found = {str(path.relative_to(tmp_path)) for path in walk_files([tmp_path, tmp_path / "missing"],
+                                                                         [".md", ".py"])}
+
+        assert found == {"a.md", "b.py", "docs/keep.md", "src/main.py"}
+        assert {str(path.relative_to(tmp_path)) for path in walk_files([tmp_path], gitignore=False)} >= {
+            "notes.log", "build/out.md", "docs/draft.md", "docs/deep/x.md", "src/gen/api.py"}
+
+    def test_is_ignored_agrees_with_walk(self, tmp_path):
+        """Single paths (e.g. from filesystem events) are judged like the walk judges them"""
+        self.make_tree(tmp_path)
+        walked = set(walk_files([tmp_path]))
+        for path in tmp_path.rglob("*"):
+            if path.is_file() and path.name != ".gitignore":
+                assert is_ignored(path, tmp_path) == (path not in walked), path
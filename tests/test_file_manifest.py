@@ -0,0 +1,38 @@
+"""
+Tests for the stat/hash manifest used by incremental ingestion
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+# Add neo4j scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / ".synapse" / "neo4j"))
+
+from file_manifest import FileManifest, stat_key
+from vector_engine import VectorEngine
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """Vector engine whose store holds the manifest table"""
+    monkeypatch.setenv("EMBEDDING_MODEL", "simple_tfidf")
+    engine = VectorEngine(tmp_path)
+    engine.initialize_vector_store()
+    return engine
+
+
+class TestFileManifest:
+    """Test suite for the stat/hash manifest used by incremental ingestion"""
+
+    def test_round_trip(self, engine, tmp_path):
+        """Rows keep the stat key of the file as it was read"""
+        path = tmp_path / "doc.md"
+        path.write_text("hello")
+        manifest = FileManifest(engine.sqlite_path)
+        manifest.update([("doc.md", stat_key(path), "sha-1"), ("old.md", (1, 2, 3), "sha-2")])
+        manifest.remove(["old.md"])
+
+        assert manifest.load() == {"doc.md": (stat_key(path), "sha-1")}
+        path.write_text("hello, world")
+        assert manifest.load()["doc.md"][0] != stat_key(path)
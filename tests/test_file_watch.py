@@ -0,0 +1,64 @@
+"""
+Tests for the debounced change queue behind ingestion --watch
+"""
+
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+
+# Add neo4j scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / ".synapse" / "neo4j"))
+
+from file_watch import ChangeQueue
+
+
+def event(event_type: str, src_path: str, dest_path: str = "", is_directory: bool = False):
+    """Stand-in for a watchdog FileSystemEvent"""
+    return SimpleNamespace(event_type=event_type, src_path=src_path, dest_path=dest_path,
+                           is_directory=is_directory)
+
+
+class TestChangeQueue:
+    """Test suite for the debounced change queue behind ingestion --watch"""
+
+    def test_bursts_coalesce_into_one_batch(self):
+        """Repeated events for the same paths come out once, after the burst"""
+        queue = ChangeQueue(debounce_ms=50, max_delay_ms=5000)
+
+        def burst():
+            for i in range(6):
+                queue.dispatch(event("modified", f"/docs/{i % 2}.md"))
+                time.sleep(0.01)
+            queue.dispatch(event("moved", "/docs/old.md", "/docs/new.md"))
+
+        thread = threading.Thread(target=burst)
+        thread.start()
+        batch = queue.next_batch(timeout=5)
+        thread.join()
+
+        assert batch == {Path("/docs/0.md"), Path("/docs/1.md"), Path("/docs/old.md"), Path("/docs/new.md")}
+        assert queue.next_batch(timeout=0.05) == set()
+
+    def test_max_delay_bounds_a_steady_stream(self):
+        """Events that never pause are still released after max_delay"""
+        queue = ChangeQueue(debounce_ms=1000, max_delay_ms=50)
+        queue.add("/docs/a.md")
+        started = time.monotonic()
+        assert queue.next_batch() == {Path("/docs/a.md")}
+        assert time.monotonic() - started < 0.5
+
+    def test_only_content_changes_are_queued(self):
+        """Reads and directory modifications do not start a batch; directory moves and deletions do"""
+        queue = ChangeQueue(debounce_ms=0, max_delay_ms=0)
+        for ignored in (event("opened", "/docs/a.md"), event("closed", "/docs/a.md"),
+                        event("closed_no_write", "/docs/a.md"), event("modified", "/docs", is_directory=True)):
+            queue.dispatch(ignored)
+        assert queue.next_batch(timeout=0.05) == set()
+
+        queue.dispatch(event("created", "/docs/b.md"))
+        queue.dispatch(event("deleted", "/docs/old", is_directory=True))
+        queue.dispatch(event("moved", "/docs/x", "/docs/y", is_directory=True))
+        assert queue.next_batch(timeout=1) == {Path("/docs/b.md"), Path("/docs/old"), Path("/docs/x"),
+                                               Path("/docs/y")}
@@ -0,0 +1,71 @@
+"""
+Tests for the ingestion journal behind ingestion --resume
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+# Add neo4j scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / ".synapse" / "neo4j"))
+
+from ingest_journal import EMBEDDED, WRITTEN, IngestJournal
+from vector_engine import VectorEngine
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    """Journal in a throwaway vector store"""
+    monkeypatch.setenv("EMBEDDING_MODEL", "simple_tfidf")
+    engine = VectorEngine(tmp_path)
+    engine.initialize_vector_store()
+    return IngestJournal(engine.sqlite_path)
+
+
+class TestIngestJournal:
+    """Test suite for the checkpoint journal behind ingestion --resume"""
+
+    def test_interrupted_runs_keep_their_progress(self, journal):
+        """Unfinished runs report their files and stages until finished"""
+        first = journal.begin()
+        journal.record(first, [("a.md", "n1", True), ("b.md", "n2", False)])
+        journal.mark_embedded(first, ["a.md"])
+        second = journal.begin()
+        journal.record(second, [("b.md", "n3", False)])
+        journal.mark_embedded(second, ["b.md"])
+
+        assert [(run["run_id"], run["batches"], run["files"]) for run in journal.interrupted()] == [
+            (first, 1, 2), (second, 1, 1)]
+        assert journal.entries([second, first]) == {"a.md": ("n1", True, EMBEDDED),
+                                                    "b.md": ("n3", False, EMBEDDED)}
+        assert journal.entries([first])["b.md"] == ("n2", False, WRITTEN)
+
+        journal.finish([second, first])
+        assert journal.interrupted() == []
+        assert journal.entries([first, second]) == {}
+
+    def test_recording_again_resets_the_stage(self, journal):
+        """record() starts a file over at WRITTEN, so it must come before mark_embedded"""
+        run_id = journal.begin()
+        journal.mark_embedded(run_id, ["a.md"])
+        journal.record(run_id, [("a.md", "n1", True)])
+        assert journal.entries([run_id])["a.md"][2] == WRITTEN
+
+        journal.mark_embedded(run_id, ["a.md"])
+        assert journal.entries([run_id])["a.md"][2] == EMBEDDED
+
+    def test_runs_of_a_live_process_are_not_interrupted(self, journal):
+        """Only a run whose owner has exited is offered to --resume"""
+        import subprocess
+
+        owner = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        try:
+            run_id = journal.begin()
+            with journal.db.transaction() as cursor:
+                cursor.execute("UPDATE ingest_runs SET pid = ? WHERE run_id = ?", (owner.pid, run_id))
+            assert journal.interrupted() == []
+        finally:
+            owner.kill()
+            owner.wait()
+
+        assert [run["run_id"] for run in journal.interrupted()] == [run_id]
@@ -0,0 +1,75 @@
+"""
+Tests for the per-stage ingestion timing report
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+# Add neo4j scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / ".synapse" / "neo4j"))
+
+from ingest_stats import IngestStats, format_report, load_history, save_report
+
+
+class TestIngestStats:
+    """Test suite for the per-stage ingestion timing report"""
+
+    def test_stages_accumulate_and_history_is_trimmed(self, tmp_path):
+        """Stages sum over calls; the saved history keeps the last runs"""
+        stats = IngestStats()
+        for _ in range(2):
+            with stats.stage("neo4j_write", items=3, nbytes=1000) as stage:
+                stage.items += 1
+        assert list(stats.timed_iter("prepare", ["ab", "cde"], size=len)) == ["ab", "cde"]
+        for seconds in (0.001, 0.002, 0.003, None):
+            stats.file_done(seconds)
+
+        report = stats.report(workers=2)
+        assert report["workers"] == 2
+        assert report["stages"]["neo4j_write"]["items"] == 8
+        assert report["stages"]["neo4j_write"]["calls"] == 2
+        assert report["stages"]["prepare"]["items"] == 2 and report["stages"]["prepare"]["bytes"] == 5
+        assert report["file_latency_ms"]["count"] == 3
+        assert report["file_latency_ms"]["p50"] == pytest.approx(2.0)
+        assert report["file_latency_ms"]["max"] == pytest.approx(3.0)
+
+        path = tmp_path / "ingestion_stats.json"
+        assert save_report(path, {"wall_s": 1.0, "stages": {}}, history=2) is None
+        assert save_report(path, {"wall_s": 2.0, "stages": {}}, history=2)["wall_s"] == 1.0
+        assert save_report(path, report, history=2)["wall_s"] == 2.0
+        assert [run["wall_s"] for run in load_history(path)] == [2.0, report["wall_s"]]
+
+        lines = format_report(dict(report, wall_s=1.0), {"wall_s": 2.0, "stages": {}})
+        assert "-50%" in lines[0]
+        assert any(line.split()[0] == "neo4j_write" for line in lines[2:])
+
+    def test_nested_stages_are_shares_of_their_parent(self):
+        """Stages inside another are keyed under it and each level sums to at most 100%"""
+        stats = IngestStats()
+        with stats.stage("discover"):
+            pass
+        with stats.stage("reconcile"):
+            with stats.stage("prepare", items=2):
+                pass
+            assert list(stats.timed_iter("embed", [1, 2])) == [1, 2]
+        with stats.stage("prepare", items=1):
+            pass
+
+        report = stats.report()
+        assert set(report["stages"]) == {"discover", "reconcile", "reconcile/prepare", "reconcile/embed", "prepare"}
+        assert report["stages"]["prepare"]["items"] == 1
+        assert report["stages"]["reconcile/prepare"]["items"] == 2
+
+        report["wall_s"] = 10.0
+        for key, wall in {"discover": 1.0, "reconcile": 6.0, "reconcile/prepare": 3.0, "reconcile/embed": 1.5,
+                          "prepare": 2.0}.items():
+            report["stages"][key]["wall_s"] = wall
+        lines = format_report(report)[2:]
+        names = [line.split()[0] for line in lines]
+        assert names == ["reconcile", "prepare", "embed", "prepare", "discover"]
+        assert lines[0].endswith("  60%") and lines[1].endswith("  50% of reconcile")
+        assert lines[2].endswith("  25% of reconcile") and lines[3].endswith("  20%")
+        top_level = [line for line in lines if not line.startswith("     ")]
+        assert sum(int(line.split()[-1].rstrip("%")) for line in top_level) <= 100
+
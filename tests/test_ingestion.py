@@ -0,0 +1,403 @@
+"""
+Tests for the ingestion engine, run against an in-memory graph (fake_neo4j.py)
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+# Add neo4j scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / ".synapse" / "neo4j"))
+
+from fake_neo4j import FakeGraph
+from ingestion import SynapseIngestion
+
+
+def write(root: Path, rel_path: str, text: str) -> Path:
+    """Write a file under root/.synapse"""
+    path = root / ".synapse" / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def long_markdown(title: str, sections: int) -> str:
+    """Markdown well over one chunk (SYNAPSE_CHUNK_CHARS) when sections is large"""
+    return f"# {title}\n" + "".join(
+        f"## Part {i}\n" + "".join(f"{title} detail {i}.{j} about part {i}\n" for j in range(12))
+        for i in range(sections))
+
+
+@pytest.fixture
+def synapse_root(tmp_path, monkeypatch):
+    """~/.synapse-system in a throwaway home, with a few files to ingest"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("EMBEDDING_MODEL", "simple_tfidf")
+    root = tmp_path / ".synapse-system"
+    write(root, "instructions/setup.md", "# Setup\nInstall the tools, then read standards/naming.md\n")
+    write(root, "instructions/deploy.md", "# Deploy\nShip it with deploy.sh after testing\n")
+    write(root, "standards/naming.md", "# Naming\nUse snake_case for Python names\n")
+    write(root, "standards/testing.md", "# Testing\nWrite tests with pytest fixtures\n")
+    write(root, "workflows/deploy.sh", "#!/bin/bash\necho deploying\n")
+    return root
+
+
+@pytest.fixture
+def graph():
+    return FakeGraph()
+
+
+@pytest.fixture
+def ingestion(synapse_root, graph, monkeypatch):
+    """SynapseIngestion writing to graph, without Redis"""
+    ingestion = SynapseIngestion()
+    ingestion.write_batch_size = 2
+
+    def connect():
+        ingestion.driver = graph
+        return True
+
+    monkeypatch.setattr(ingestion, "connect", connect)
+    return ingestion
+
+
+def rel(ingestion, path: Path) -> str:
+    return str(path.relative_to(ingestion.synapse_root))
+
+
+class TestWriterPipeline:
+    """Test suite for the prepare / write pipeline and its UNWIND batches"""
+
+    def test_merges_are_batched_and_ids_keep_record_order(self, ingestion, graph):
+        """write_batch_size files per statement; ids map back to records although rows come back reversed"""
+        ingestion.initialize_sqlite()
+        ingestion.driver = graph
+        files = sorted(ingestion.discover_files())
+        records = [ingestion.prepare_file(path) for path in files]
+
+        node_ids = ingestion.write_files(records)
+
+        assert [len(params["rows"]) for params in graph.statements("MERGE (f:SynapseFile")] == [2, 2, 1]
+        assert graph.transactions == 3
+        assert [graph.nodes[node_id]["path"] for node_id in node_ids] == [record["path"] for record in records]
+        assert all("content" not in node for node in graph.nodes.values())
+        # Embeddings wait for the caller's flush
+        assert len(ingestion.pending_embeddings) == len(records)
+
+    def test_vectors_are_stored_under_their_files_nodes(self, ingestion, graph):
+        """Every file gets one node and its vectors carry that node's id"""
+        assert ingestion.run_full_ingestion()
+
+        stored = ingestion.vector_engine.stored_files()
+        assert set(stored) == {node["path"] for node in graph.nodes.values()}
+        assert all(graph.id_of(path) == node_id for path, node_id in stored.items())
+        assert len(graph.nodes) == 5
+
+    def test_worker_pool_matches_single_process(self, ingestion, synapse_root):
+        """Workers prepare the same records, and report a file they cannot read instead of raising"""
+        (synapse_root / ".synapse" / "standards" / "binary.txt").write_bytes(b"\xff\xfe\x00bad")
+        files = sorted(ingestion.discover_files())
+
+        def prepared(workers):
+            results = {}
+            for path, record in ingestion.prepared_files(files, {}, workers=workers):
+                results[rel(ingestion, path)] = type(record).__name__ if isinstance(record, Exception) else \
+                    (record["hash"], record["summary"], record["size"])
+            return results
+
+        single = prepared(1)
+        assert prepared(2) == single
+        assert single[".synapse/standards/binary.txt"] == "UnicodeDecodeError"
+
+    def test_workers_write_every_file_once(self, ingestion, graph):
+        """Completion-order results from the pool still land on the right nodes"""
+        assert ingestion.run_full_ingestion(workers=2)
+
+        stored = ingestion.vector_engine.stored_files()
+        assert len(graph.nodes) == 5
+        assert all(graph.id_of(path) == node_id for path, node_id in stored.items())
+        assert sum(len(params["rows"]) for params in graph.statements("MERGE (f:SynapseFile")) == 5
+
+    def test_unchanged_files_are_not_written_again(self, ingestion, graph, synapse_root):
+        """A second run only merges the file that changed"""
+        assert ingestion.run_full_ingestion()
+        write(synapse_root, "standards/naming.md", "# Naming\nUse CamelCase for classes\n")
+        graph.queries.clear()
+
+        assert ingestion.run_full_ingestion()
+
+        merged = [row["path"] for params in graph.statements("MERGE (f:SynapseFile") for row in params["rows"]]
+        assert merged == [".synapse/standards/naming.md"]
+
+    def test_deleted_files_are_removed_in_batches(self, ingestion, graph, synapse_root):
+        """Deleted paths go in write_batch_size DETACH DELETE statements, with their vectors"""
+        assert ingestion.run_full_ingestion()
+        for rel_path in ("instructions/deploy.md", "standards/testing.md", "workflows/deploy.sh"):
+            (synapse_root / ".synapse" / rel_path).unlink()
+
+        assert ingestion.run_full_ingestion()
+
+        deletes = graph.statements("DETACH DELETE f")
+        assert [len(params["paths"]) for params in deletes] == [2, 1]
+        assert {node["path"] for node in graph.nodes.values()} == {
+            ".synapse/instructions/setup.md", ".synapse/standards/naming.md"}
+        assert set(ingestion.vector_engine.stored_files()) == {
+            ".synapse/instructions/setup.md", ".synapse/standards/naming.md"}
+
+    def test_shrunk_file_drops_stale_chunk_vectors(self, ingestion, graph, synapse_root):
+        """A file that no longer needs chunks keeps a single whole-file vector"""
+        write(synapse_root, "standards/guide.md", long_markdown("Guide", 30))
+        assert ingestion.run_full_ingestion()
+        chunked = ingestion.vector_engine.get_stored_embeddings_count()
+        assert chunked > 6
+
+        write(synapse_root, "standards/guide.md", "# Guide\nNow a short note\n")
+        assert ingestion.run_full_ingestion()
+
+        assert ingestion.vector_engine.get_stored_embeddings_count() == 6
+        node_id = graph.id_of(".synapse/standards/guide.md")
+        assert ingestion.vector_engine.get_embedding(node_id) is not None
+
+
+class TestResume:
+    """Test suite for the ingestion journal, --resume and the reconcile pass"""
+
+    def interrupt(self, ingestion, method):
+        """Make ingestion.method raise KeyboardInterrupt, as Ctrl+C would"""
+        def interrupted(*args, **kwargs):
+            raise KeyboardInterrupt
+        setattr(ingestion, method, interrupted)
+
+    def test_flushed_batches_are_journaled_as_embedded(self, ingestion):
+        """Embeddings flushed between write batches leave their files at EMBEDDED, not WRITTEN"""
+        from ingest_journal import EMBEDDED
+
+        ingestion.vector_engine.embedding_batch_size = 1
+        self.interrupt(ingestion, "create_relationships")
+        with pytest.raises(KeyboardInterrupt):
+            ingestion.run_full_ingestion()
+
+        runs = ingestion.journal.interrupted()
+        assert [run["batches"] for run in runs] == [3]
+        entries = ingestion.journal.entries([runs[0]["run_id"]])
+        assert len(entries) == 5
+        assert {stage for _, _, stage in entries.values()} == {EMBEDDED}
+
+    def test_resume_links_embedded_files_without_rewriting_them(self, ingestion, graph):
+        """Files the interrupted run embedded only get their relationships"""
+        self.interrupt(ingestion, "create_relationships")
+        with pytest.raises(KeyboardInterrupt):
+            ingestion.run_full_ingestion()
+        del ingestion.create_relationships
+        graph.queries.clear()
+
+        assert ingestion.run_full_ingestion(resume=True)
+
+        assert graph.statements("MERGE (f:SynapseFile") == []
+        assert (".synapse/instructions/setup.md", ".synapse/standards/naming.md") in graph.path_edges("REFERENCES")
+        assert ingestion.journal.interrupted() == []
+        stored = ingestion.vector_engine.stored_files()
+        assert all(graph.id_of(path) == node_id for path, node_id in stored.items()) and len(stored) == 5
+
+    def test_resume_rewrites_files_left_without_vectors(self, ingestion, graph):
+        """Files journaled at WRITTEN are read, written and embedded again"""
+        self.interrupt(ingestion, "flush_embeddings")
+        with pytest.raises(KeyboardInterrupt):
+            ingestion.run_full_ingestion()
+        del ingestion.flush_embeddings
+        assert ingestion.vector_engine.stored_files() == {}
+        graph.queries.clear()
+
+        assert ingestion.run_full_ingestion(resume=True)
+
+        merged = {row["path"] for params in graph.statements("MERGE (f:SynapseFile") for row in params["rows"]}
+        assert len(merged) == 5
+        assert set(ingestion.vector_engine.stored_files()) == merged
+
+    def test_reconcile_repairs_missing_nodes_and_vectors(self, ingestion, graph):
+        """resume with nothing to resume still re-ingests files the graph or vector store lost"""
+        assert ingestion.run_full_ingestion()
+        lost_node = ".synapse/standards/testing.md"
+        lost_vectors = ".synapse/instructions/deploy.md"
+        del graph.nodes[graph.id_of(lost_node)]
+        ingestion.vector_engine.remove_embeddings([lost_vectors])
+        graph.queries.clear()
+
+        assert ingestion.run_full_ingestion(resume=True)
+
+        merged = {row["path"] for params in graph.statements("MERGE (f:SynapseFile") for row in params["rows"]}
+        assert merged == {lost_node, lost_vectors}
+        stored = ingestion.vector_engine.stored_files()
+        assert len(stored) == 5 and all(graph.id_of(path) == node_id for path, node_id in stored.items())
+        # The re-ingest is timed as part of reconcile
+        assert ingestion.stats.stages["reconcile/neo4j_write"].items == 2
+
+
+class TestNodeContent:
+    """Test suite for moving content off SynapseFile nodes into the blob store"""
+
+    def test_legacy_content_is_moved_in_batches(self, ingestion, graph):
+        """Every node loses its content, including one stored without a hash"""
+        import hashlib
+
+        ingestion.initialize_sqlite()
+        ingestion.driver = graph
+        graph.add_node(path=".synapse/a.md", hash="sha-a", content="alpha")
+        graph.add_node(path=".synapse/b.md", hash="sha-b", content="beta")
+        unhashed = graph.add_node(path=".synapse/c.md", hash=None, content="gamma")
+
+        assert ingestion.migrate_node_content() == 3
+
+        assert all("content" not in node for node in graph.nodes.values())
+        gamma = hashlib.sha256(b"gamma").hexdigest()
+        assert graph.nodes[unhashed]["hash"] == gamma
+        assert ingestion.blobs.get_many(["sha-a", "sha-b", gamma]) == {
+            "sha-a": "alpha", "sha-b": "beta", gamma: "gamma"}
+        assert len(graph.statements("RETURN elementId(f) AS id, f.hash AS hash, f.content")) == 3
+        assert ingestion.migrate_node_content() == 0
+
+
+class TestWatch:
+    """Test suite for --watch micro-batches"""
+
+    def test_changes_are_ingested_and_removed(self, ingestion, graph, synapse_root):
+        """Changed and new files are written, vanished ones removed, other paths ignored"""
+        assert ingestion.run_full_ingestion()
+        changed = write(synapse_root, "standards/naming.md", "# Naming\nUse CamelCase for classes\n")
+        added = write(synapse_root, "workflows/release.md", "# Release\nTag, then run deploy.sh\n")
+        gone = synapse_root / ".synapse" / "standards" / "testing.md"
+        gone.unlink()
+        outside = write(synapse_root, "agents/helper.md", "# Helper\n")
+
+        counts = ingestion.ingest_changes([changed, added, gone, outside])
+
+        assert counts["written"] == [".synapse/standards/naming.md", ".synapse/workflows/release.md"]
+        assert counts["removed"] == [".synapse/standards/testing.md"]
+        assert {node["path"] for node in graph.nodes.values()} == {
+            ".synapse/instructions/setup.md", ".synapse/instructions/deploy.md", ".synapse/standards/naming.md",
+            ".synapse/workflows/deploy.sh", ".synapse/workflows/release.md"}
+        assert (".synapse/workflows/release.md", ".synapse/workflows/deploy.sh") in graph.path_edges("REFERENCES")
+
+    def test_batches_that_change_the_graph_save_their_stats(self, ingestion, synapse_root, monkeypatch):
+        """Each such batch is saved as its own report; batches without changes are not"""
+        import ingestion as ingestion_module
+        from file_watch import ChangeQueue
+        from ingest_stats import load_history
+
+        changed = synapse_root / ".synapse" / "standards" / "naming.md"
+        batches = [{changed}, {synapse_root / ".synapse" / "standards" / "testing.md"}]
+
+        class ScriptedQueue(ChangeQueue):
+            def next_batch(self, timeout=None):
+                if not batches:
+                    raise KeyboardInterrupt
+                batch = batches.pop(0)
+                if changed in batch:
+                    changed.write_text("# Naming\nUse CamelCase for classes\n")
+                return batch
+
+        monkeypatch.setattr(ingestion_module, "ChangeQueue", ScriptedQueue)
+        assert ingestion.watch()
+
+        runs = load_history(ingestion.stats_path)
+        assert [run.get("watch", False) for run in runs] == [False, True]
+        assert runs[1]["stages"]["neo4j_write"]["items"] == 1
+        assert "discover" not in runs[1]["stages"]
+
+
+class TestReferences:
+    """Test suite for REFERENCES edges built while files are written"""
+
+    def test_edges_follow_content_changes_and_new_files(self, ingestion, graph, synapse_root):
+        """Written files replace their edges; unchanged files gain edges to files added later"""
+        assert ingestion.run_full_ingestion()
+        setup, naming = ".synapse/instructions/setup.md", ".synapse/standards/naming.md"
+        assert (setup, naming) in graph.path_edges("REFERENCES")
+        assert (".synapse/instructions/deploy.md", ".synapse/workflows/deploy.sh") in graph.path_edges("REFERENCES")
+
+        write(synapse_root, "instructions/setup.md", "# Setup\nInstall the tools, then read checklist.md\n")
+        write(synapse_root, "standards/checklist.md", "# Checklist\nBefore merging\n")
+        graph.queries.clear()
+        assert ingestion.run_full_ingestion()
+
+        edges = graph.path_edges("REFERENCES")
+        assert (setup, naming) not in edges
+        assert (setup, ".synapse/standards/checklist.md") in edges
+        # deploy.md was not rewritten, so its edge survived
+        assert (".synapse/instructions/deploy.md", ".synapse/workflows/deploy.sh") in edges
+        # Only the two written files had their outgoing edges replaced
+        deleted = [path for params in graph.statements("-[r:REFERENCES]->() DELETE r") for path in params["paths"]]
+        assert sorted(deleted) == [setup, ".synapse/standards/checklist.md"]
+
+    def test_unchanged_files_are_scanned_for_added_files(self, ingestion, graph, synapse_root, monkeypatch):
+        """A file mentioning a path that only appears later is linked to it without being rewritten or reread"""
+        write(synapse_root, "standards/naming.md", "# Naming\nSee glossary.md for terms\n")
+        assert ingestion.run_full_ingestion()
+        graph.queries.clear()
+
+        read = []
+        read_text = Path.read_text
+        monkeypatch.setattr(Path, "read_text", lambda path, *args, **kwargs: read.append(path.name) or
+                            read_text(path, *args, **kwargs))
+        write(synapse_root, "standards/glossary.md", "# Glossary\nTerms\n")
+        assert ingestion.run_full_ingestion()
+
+        merged = [row["path"] for params in graph.statements("MERGE (f:SynapseFile") for row in params["rows"]]
+        assert merged == [".synapse/standards/glossary.md"]
+        assert (".synapse/standards/naming.md", ".synapse/standards/glossary.md") in graph.path_edges("REFERENCES")
+        assert "naming.md" not in read
+
+
+class TestSimilarityGraph:
+    """Test suite for the SIMILAR_TO kNN graph built from stored embeddings"""
+
+    def out_edges(self, graph):
+        edges = {}
+        for (kind, source, target), props in graph.edges.items():
+            if kind == "SIMILAR_TO":
+                edges.setdefault(source, {})[target] = props["score"]
+        return edges
+
+    def test_edges_are_the_nearest_neighbours(self, ingestion, graph):
+        """Each file points at most k edges at its nearest files, scored by similarity"""
+        ingestion.similarity_k = 2
+        ingestion.similarity_threshold = 0.0
+        assert ingestion.run_full_ingestion()
+
+        # Every file was written, so reverse edges can only repeat true neighbours
+        neighbors = ingestion.vector_engine.nearest_neighbors(list(graph.nodes), 2, 0.0)
+        assert self.out_edges(graph) == {node_id: {other: pytest.approx(score) for other, score in ranked}
+                                         for node_id, ranked in neighbors.items() if ranked}
+
+    def test_changed_file_is_relinked(self, ingestion, graph, synapse_root):
+        """Only the written file's edges are rebuilt, from its new vector"""
+        ingestion.similarity_k = 2
+        ingestion.similarity_threshold = 0.0
+        assert ingestion.run_full_ingestion()
+        write(synapse_root, "standards/naming.md", "# Naming\nWrite tests with pytest fixtures and naming rules\n")
+        graph.queries.clear()
+
+        assert ingestion.run_full_ingestion()
+
+        naming = graph.id_of(".synapse/standards/naming.md")
+        assert [params["ids"] for params in graph.statements("-[r:SIMILAR_TO]-() WHERE elementId(f) = id DELETE r")] \
+               == [[naming]]
+        expected = ingestion.vector_engine.nearest_neighbors([naming], 2, 0.0)[naming]
+        assert self.out_edges(graph)[naming] == {other: pytest.approx(score) for other, score in expected}
+        assert graph.id_of(".synapse/standards/testing.md") in self.out_edges(graph)[naming]
+
+    def test_unscored_legacy_edges_are_replaced(self, ingestion, graph, synapse_root):
+        """Same-type cliques of older versions make the next run relink every file"""
+        assert ingestion.run_full_ingestion()
+        ids = list(graph.nodes)
+        for source in ids:
+            for target in ids:
+                if source != target:
+                    graph.edges[("SIMILAR_TO", source, target)] = {}
+        write(synapse_root, "standards/naming.md", "# Naming\nUse CamelCase for classes\n")
+
+        assert ingestion.run_full_ingestion()
+
+        edges = [props for (kind, _, _), props in graph.edges.items() if kind == "SIMILAR_TO"]
+        assert edges and all(props.get("score") is not None for props in edges)
+        assert all(len(targets) <= ingestion.similarity_k for targets in self.out_edges(graph).values())
@@ -0,0 +1,32 @@
+"""
+Tests for the pattern index that finds REFERENCES targets
+"""
+
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add neo4j scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / ".synapse" / "neo4j"))
+
+from reference_index import ReferenceIndex, SUBSTRING_SCAN_LIMIT, reference_patterns
+
+
+class TestReferenceIndex:
+    """Test suite for the pattern index that finds REFERENCES targets"""
+
+    def test_matches_substring_scan(self):
+        """The automaton agrees with one substring test per (file, pattern)"""
+        rng = np.random.default_rng(0)
+        words = ["setup", "guide", "api", "rules", "deploy", "test", "readme", "ab"]
+        paths = sorted({f"{rng.choice(['docs', 'std'])}/{rng.choice(words)}{i % 7}.{rng.choice(['md', 'py'])}"
+                        for i in range(60)})
+        assert len(paths) * 2 > SUBSTRING_SCAN_LIMIT
+        index = ReferenceIndex(paths)
+
+        for source in paths[:20]:
+            content = " ".join(rng.choice(paths + words, size=6)) + " " + source
+            expected = {target for target in paths if target != source
+                        and any(pattern in content for pattern in reference_patterns(target))}
+            assert index.references(source, content) == expected
+            assert ReferenceIndex(paths[:5]).references(source, content) == expected & set(paths[:5])
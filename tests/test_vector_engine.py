@@ -0,0 +1,1117 @@
+"""
+Tests for the vector embedding engine and its resident similarity index
+"""
+
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add neo4j scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / ".synapse" / "neo4j"))
+
+from vector_engine import VectorEngine
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """Vector engine backed by a throwaway store"""
+    monkeypatch.setenv("EMBEDDING_MODEL", "simple_tfidf")
+    engine = VectorEngine(tmp_path)
+    engine.initialize_vector_store()
+    return engine
+
+
+def random_vectors(count, dim, seed=0):
+    """Seeded random float64 vectors"""
+    return np.random.default_rng(seed).normal(size=(count, dim))
+
+
+def brute_force(vectors, query, top_k):
+    """Reference cosine ranking over a {node_id: vector} dict"""
+    scores = []
+    for node_id, vector in vectors.items():
+        similarity = np.dot(query, vector) / (np.linalg.norm(query) * np.linalg.norm(vector))
+        scores.append((node_id, similarity))
+    scores.sort(key=lambda x: x[1], reverse=True)
+    return scores[:top_k]
+
+
+class TestResidentIndex:
+    """Test suite for the in-memory similarity index"""
+
+    def test_matches_brute_force_ranking(self, engine):
+        """Index results match a plain cosine scan"""
+        vectors = {f"node-{i}": v for i, v in enumerate(random_vectors(50, engine.embedding_dim))}
+        for node_id, vector in vectors.items():
+            engine.store_embedding(node_id, f"{node_id}.md", "hash", vector)
+
+        query = vectors["node-7"] + 0.1 * random_vectors(1, engine.embedding_dim, seed=1)[0]
+        results = engine.similarity_search(query, top_k=5, min_similarity=-1.0)
+        expected = brute_force(vectors, query, 5)
+
+        assert [node_id for node_id, _ in results] == [node_id for node_id, _ in expected]
+        assert results[0][0] == "node-7"
+        for (_, score), (_, expected_score) in zip(results, expected):
+            assert score == pytest.approx(expected_score, abs=1e-5)
+
+    def test_picks_up_new_embeddings_incrementally(self, engine):
+        """Embeddings stored after a search are visible to the next search"""
+        vectors = random_vectors(3, engine.embedding_dim)
+        engine.store_embedding("a", "a.md", "hash", vectors[0])
+        assert engine.similarity_search(vectors[1], min_similarity=0.99) == []
+
+        engine.store_embedding("b", "b.md", "hash", vectors[1])
+        results = engine.similarity_search(vectors[1], min_similarity=0.99)
+
+        assert [node_id for node_id, _ in results] == ["b"]
+        assert len(engine._index) == 2
+
+    def test_restored_node_supersedes_previous_vector(self, engine):
+        """Re-storing a node replaces its old vector in the index"""
+        vectors = random_vectors(2, engine.embedding_dim)
+        engine.store_embedding("a", "a.md", "hash", vectors[0])
+        engine.similarity_search(vectors[0])
+
+        engine.store_embedding("a", "a.md", "hash2", vectors[1])
+
+        assert engine.similarity_search(vectors[0], min_similarity=0.99) == []
+        assert engine.similarity_search(vectors[1], min_similarity=0.99)[0][0] == "a"
+
+    def test_clear_embeddings_empties_index(self, engine):
+        """Clearing the store also clears the resident index"""
+        vector = random_vectors(1, engine.embedding_dim)[0]
+        engine.store_embedding("a", "a.md", "hash", vector)
+        assert engine.similarity_search(vector)
+
+        engine.clear_embeddings()
+
+        assert engine.similarity_search(vector) == []
+        assert len(engine._index) == 0
+
+    def test_zero_query_returns_nothing(self, engine):
+        """A zero query vector has no cosine neighbours"""
+        engine.store_embedding("a", "a.md", "hash", random_vectors(1, engine.embedding_dim)[0])
+        assert engine.similarity_search(np.zeros(engine.embedding_dim)) == []
+
+
+def clustered_vectors(count, dim, clusters=8, seed=0):
+    """Seeded vectors drawn around a few random centres"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    return centres[rng.integers(clusters, size=count)] + 0.3 * rng.normal(size=(count, dim))
+
+
+class TestANNIndex:
+    """Test suite for the persisted IVF backend"""
+
+    @pytest.fixture
+    def populated(self, engine):
+        """Engine holding 200 clustered vectors"""
+        vectors = clustered_vectors(200, engine.embedding_dim)
+        for i, vector in enumerate(vectors):
+            engine.store_embedding(f"node-{i}", f"file-{i}.md", "hash", vector)
+        return engine, vectors
+
+    def test_full_probe_matches_exact_search(self, populated):
+        """Probing every list returns the exact ranking"""
+        engine, vectors = populated
+        index = engine.build_ann_index(nlist=8)
+
+        exact = engine.similarity_search(vectors[3], top_k=10, backend="exact")
+        approximate = engine.similarity_search(vectors[3], top_k=10, backend="ann", nprobe=index.nlist)
+
+        assert [node_id for node_id, _ in approximate] == [node_id for node_id, _ in exact]
+
+    def test_index_is_persisted_beside_store(self, populated):
+        """A fresh engine loads the saved index instead of retraining"""
+        engine, vectors = populated
+        engine.build_ann_index(nlist=8)
+        assert engine.ann_index_path.parent == engine.sqlite_path.parent
+        assert engine.ann_index_path.exists()
+
+        reloaded = VectorEngine(engine.synapse_root)
+        results = reloaded.similarity_search(vectors[5], top_k=1, backend="ann", nprobe=2)
+
+        assert results[0][0] == "node-5"
+        assert reloaded._ann_index.nlist == 8
+
+    def test_new_vectors_are_assigned_without_rebuild(self, populated):
+        """Vectors stored after the build are searchable through the IVF lists"""
+        engine, vectors = populated
+        index = engine.build_ann_index(nlist=8)
+        centroids = index.centroids.copy()
+
+        engine.store_embedding("late", "late.md", "hash", vectors[0] * 2)
+        results = engine.similarity_search(vectors[0], top_k=2, backend="ann", nprobe=1)
+
+        assert {node_id for node_id, _ in results} == {"node-0", "late"}
+        np.testing.assert_array_equal(engine._ann_index.centroids, centroids)
+
+    def test_auto_backend_uses_threshold(self, populated):
+        """auto only switches to the IVF index above ann_min_vectors"""
+        engine, vectors = populated
+        engine.build_ann_index(nlist=8)
+
+        engine.ann_min_vectors = 1000
+        assert engine._select_ann_index("auto") is None
+
+        engine.ann_min_vectors = 100
+        assert engine._select_ann_index("auto") is engine._ann_index
+
+    def test_clear_embeddings_removes_index_file(self, populated):
+        """Clearing the store drops the persisted index"""
+        engine, _ = populated
+        engine.build_ann_index(nlist=8)
+
+        engine.clear_embeddings()
+
+        assert not engine.ann_index_path.exists()
+
+
+class TestSegmentStorage:
+    """Test suite for memory-mapped segment storage"""
+
+    @pytest.fixture
+    def segment_engine(self, tmp_path, monkeypatch):
+        """Engine storing vectors in small segment files"""
+        monkeypatch.setenv("EMBEDDING_MODEL", "simple_tfidf")
+        monkeypatch.setenv("SYNAPSE_VECTOR_STORAGE", "segments")
+        monkeypatch.setenv("SYNAPSE_SEGMENT_ROWS", "16")
+        engine = VectorEngine(tmp_path)
+        engine.initialize_vector_store()
+        return engine
+
+    def test_vectors_stay_out_of_sqlite(self, segment_engine):
+        """Only metadata is written to the vectors database"""
+        vectors = random_vectors(40, segment_engine.embedding_dim)
+        for i, vector in enumerate(vectors):
+            segment_engine.store_embedding(f"node-{i}", f"file-{i}.md", "hash", vector)
+
+        stats = segment_engine.get_embedding_stats()
+        assert stats["total_vectors"] == 40
+        assert stats["segments"]["segments"] == 3
+        assert stats["by_model"] == {"simple_tfidf": 40}
+
+        import sqlite3
+        conn = sqlite3.connect(segment_engine.sqlite_path)
+        assert conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0] == 0
+        conn.close()
+
+        np.testing.assert_allclose(segment_engine.get_embedding("node-3"), vectors[3], rtol=1e-5)
+        assert isinstance(segment_engine.segment_store.segments[0].matrix, np.memmap)
+
+    def test_search_matches_sqlite_storage(self, segment_engine, tmp_path, monkeypatch):
+        """Segment search ranks like the SQLite-backed index"""
+        monkeypatch.setenv("SYNAPSE_VECTOR_STORAGE", "sqlite")
+        engine = VectorEngine(tmp_path / "sqlite")
+        engine.initialize_vector_store()
+        assert engine.segment_store is None
+
+        vectors = random_vectors(40, engine.embedding_dim)
+        for i, vector in enumerate(vectors):
+            segment_engine.store_embedding(f"node-{i}", f"file-{i}.md", "hash", vector)
+            engine.store_embedding(f"node-{i}", f"file-{i}.md", "hash", vector)
+
+        query = random_vectors(1, engine.embedding_dim, seed=9)[0]
+        expected = engine.similarity_search(query, top_k=5, min_similarity=-1.0)
+        results = segment_engine.similarity_search(query, top_k=5, min_similarity=-1.0)
+
+        assert [node_id for node_id, _ in results] == [node_id for node_id, _ in expected]
+
+    def test_replace_delete_and_compact(self, segment_engine):
+        """Tombstoned rows disappear from search and from disk after compaction"""
+        vectors = random_vectors(20, segment_engine.embedding_dim)
+        for i, vector in enumerate(vectors):
+            segment_engine.store_embedding(f"node-{i}", f"file-{i}.md", "hash", vector)
+
+        segment_engine.store_embedding("node-0", "file-0.md", "hash2", vectors[1])
+        segment_engine.remove_embeddings(["file-2.md"])
+
+        assert segment_engine.get_embedding("node-2") is None
+        results = segment_engine.similarity_search(vectors[0], top_k=3, min_similarity=0.99)
+        assert results == []
+        assert segment_engine.get_stored_embeddings_count() == 19
+
+        result = segment_engine.compact_segments()
+
+        assert result["reclaimed_bytes"] > 0
+        assert segment_engine.segment_store.stats()["dead_vectors"] == 0
+        top = segment_engine.similarity_search(vectors[1], top_k=2, min_similarity=0.99)
+        assert {node_id for node_id, _ in top} == {"node-0", "node-1"}
+
+    def test_second_process_sees_appends(self, segment_engine):
+        """A separate engine on the same directory picks up new rows incrementally"""
+        reader = VectorEngine(segment_engine.synapse_root)
+        vector = random_vectors(1, segment_engine.embedding_dim)[0]
+        assert reader.similarity_search(vector) == []
+
+        segment_engine.store_embedding("a", "a.md", "hash", vector)
+
+        assert reader.similarity_search(vector)[0][0] == "a"
+
+    def test_migrate_from_sqlite(self, segment_engine, monkeypatch):
+        """Existing BLOB rows move into segments"""
+        monkeypatch.setenv("SYNAPSE_VECTOR_STORAGE", "sqlite")
+        legacy = VectorEngine(segment_engine.synapse_root)
+        vectors = random_vectors(5, legacy.embedding_dim)
+        for i, vector in enumerate(vectors):
+            legacy.store_embedding(f"node-{i}", f"file-{i}.md", "hash", vector)
+
+        assert segment_engine.migrate_to_segments() == 5
+        assert legacy.get_stored_embeddings_count() == 0
+        assert segment_engine.get_stored_embeddings_count() == 5
+        np.testing.assert_allclose(segment_engine.get_embedding("node-4"), vectors[4], rtol=1e-5)
+
+
+class TestQuantizedStorage:
+    """Test suite for reduced-precision vector storage"""
+
+    @pytest.fixture
+    def quantized_engine(self, tmp_path, monkeypatch):
+        """Factory for engines storing vectors at a given precision"""
+        monkeypatch.setenv("EMBEDDING_MODEL", "simple_tfidf")
+
+        def make(precision, rerank=0):
+            monkeypatch.setenv("SYNAPSE_VECTOR_PRECISION", precision)
+            monkeypatch.setenv("SYNAPSE_VECTOR_RERANK", str(rerank))
+            engine = VectorEngine(tmp_path)
+            engine.initialize_vector_store()
+            return engine
+        return make
+
+    def test_int8_rows_are_smaller_and_rank_like_exact(self, quantized_engine):
+        """int8 codes take about an eighth of a float64 row and keep the ranking"""
+        engine = quantized_engine("int8")
+        vectors = {f"node-{i}": v for i, v in enumerate(clustered_vectors(100, engine.embedding_dim))}
+        for node_id, vector in vectors.items():
+            engine.store_embedding(node_id, f"{node_id}.md", "hash", vector)
+
+        stats = engine.get_embedding_stats()
+        assert stats["by_precision"]["int8"]["avg_bytes"] == engine.embedding_dim + 4
+
+        query = vectors["node-7"] + 0.1 * random_vectors(1, engine.embedding_dim, seed=1)[0]
+        results = engine.similarity_search(query, top_k=5, min_similarity=-1.0)
+        expected = brute_force(vectors, query, 5)
+
+        assert results[0][0] == "node-7"
+        assert {node_id for node_id, _ in results} == {node_id for node_id, _ in expected}
+        np.testing.assert_allclose(engine.get_embedding("node-3"), vectors["node-3"], rtol=0.05, atol=0.05)
+
+    def test_rerank_restores_exact_scores(self, quantized_engine):
+        """Candidates are rescored against their full-precision copies"""
+        engine = quantized_engine("float16", rerank=4)
+        vectors = {f"node-{i}": v for i, v in enumerate(random_vectors(30, engine.embedding_dim))}
+        for node_id, vector in vectors.items():
+            engine.store_embedding(node_id, f"{node_id}.md", "hash", vector)
+
+        query = random_vectors(1, engine.embedding_dim, seed=5)[0]
+        results = engine.similarity_search(query, top_k=3, min_similarity=-1.0)
+
+        for (node_id, score), (expected_id, expected_score) in zip(results, brute_force(vectors, query, 3)):
+            assert node_id == expected_id
+            assert score == pytest.approx(expected_score, abs=1e-6)
+
+    def test_migrate_in_place(self, quantized_engine):
+        """Existing float64 rows are re-encoded without changing their ids"""
+        legacy = quantized_engine("float64")
+        vectors = random_vectors(40, legacy.embedding_dim)
+        for i, vector in enumerate(vectors):
+            legacy.store_embedding(f"node-{i}", f"file-{i}.md", "hash", vector)
+        assert legacy.similarity_search(vectors[4], top_k=1)[0][0] == "node-4"
+
+        engine = quantized_engine("float64")
+        result = engine.migrate_precision("int8")
+
+        assert result["vectors"] == 40
+        assert result["reclaimed_bytes"] > 0
+        assert engine.get_embedding_stats()["by_precision"] == {
+            "int8": {"vectors": 40, "avg_bytes": engine.embedding_dim + 4, "avg_rerank_bytes": 0}
+        }
+        # The other engine sees the generation bump and reloads
+        assert legacy.similarity_search(vectors[4], top_k=1)[0][0] == "node-4"
+        assert legacy._index.generation == 1
+
+    def test_pq_codebooks_are_trained_on_migration(self, quantized_engine):
+        """PQ stores int8 until codebooks exist, then M bytes per vector"""
+        engine = quantized_engine("pq", rerank=10)
+        vectors = clustered_vectors(300, engine.embedding_dim)
+        for i, vector in enumerate(vectors):
+            engine.store_embedding(f"node-{i}", f"file-{i}.md", "hash", vector)
+        assert set(engine.get_embedding_stats()["by_precision"]) == {"int8"}
+
+        engine.migrate_precision("pq")
+
+        assert engine.pq_codebook_path.exists()
+        stats = engine.get_embedding_stats()["by_precision"]
+        assert stats["pq"]["avg_bytes"] == engine.pq_subspaces
+        assert engine.similarity_search(vectors[11], top_k=1)[0][0] == "node-11"
+
+        engine.store_embedding("late", "late.md", "hash", vectors[11] * 3)
+        assert engine.get_embedding_stats()["by_precision"]["pq"]["vectors"] == 301
+
+    def test_ann_index_keeps_codes(self, quantized_engine):
+        """A persisted IVF index reloads with the codec it was built with"""
+        engine = quantized_engine("int8")
+        vectors = clustered_vectors(100, engine.embedding_dim)
+        for i, vector in enumerate(vectors):
+            engine.store_embedding(f"node-{i}", f"file-{i}.md", "hash", vector)
+        engine.build_ann_index(nlist=4)
+
+        reloaded = VectorEngine(engine.synapse_root)
+        results = reloaded.similarity_search(vectors[9], top_k=1, backend="ann", nprobe=4)
+
+        assert results[0][0] == "node-9"
+        assert reloaded._ann_index.codec.name == "int8"
+        assert reloaded._ann_index.list_vectors[0].dtype == np.uint8
+
+
+class TestMultiQuerySearch:
+    """Test suite for fused multi-variant similarity search"""
+
+    def store(self, engine, count=60):
+        vectors = {f"node-{i}": v for i, v in enumerate(random_vectors(count, engine.embedding_dim))}
+        for node_id, vector in vectors.items():
+            engine.store_embedding(node_id, f"{node_id}.md", "hash", vector)
+        return vectors
+
+    def test_matches_per_variant_searches(self, engine):
+        """Max fusion equals merging separate single-query searches"""
+        vectors = self.store(engine)
+        queries = np.stack([vectors["node-3"], vectors["node-11"], random_vectors(1, engine.embedding_dim, 2)[0]])
+
+        fused = engine.similarity_search_many(queries, top_k=4, min_similarity=-1.0)
+
+        best = {}
+        for variant, query in enumerate(queries):
+            for node_id, score in engine.similarity_search(query, top_k=4, min_similarity=-1.0):
+                if node_id not in best or score > best[node_id][0]:
+                    best[node_id] = (score, variant)
+        assert {node_id: variant for node_id, _, variant in fused} == \
+               {node_id: variant for node_id, (_, variant) in best.items()}
+        for node_id, score, _ in fused:
+            assert score == pytest.approx(best[node_id][0], abs=1e-5)
+        assert [score for _, score, _ in fused] == sorted((score for _, score, _ in fused), reverse=True)
+
+    def test_winning_variant_attribution(self, engine):
+        """Each exact match is attributed to the variant that found it"""
+        vectors = self.store(engine)
+        fused = engine.similarity_search_many(np.stack([vectors["node-5"], vectors["node-9"]]), top_k=1)
+
+        assert [(node_id, variant) for node_id, _, variant in fused] == [("node-5", 0), ("node-9", 1)]
+
+    def test_rrf_rewards_agreement(self, engine):
+        """A node ranked by several variants outranks one found by a single variant"""
+        vectors = self.store(engine)
+        shared = vectors["node-1"] + vectors["node-2"]
+        queries = np.stack([vectors["node-1"] + 0.5 * shared, vectors["node-2"] + 0.5 * shared])
+
+        fused = engine.similarity_search_many(queries, top_k=3, min_similarity=-1.0, fusion="rrf")
+        scores = {node_id: score for node_id, score, _ in fused}
+
+        assert scores["node-1"] == pytest.approx(1 / 61 + 1 / 62)
+        assert scores["node-1"] == scores["node-2"]
+        assert {node_id for node_id, _, _ in fused[:2]} == {"node-1", "node-2"}
+        with pytest.raises(ValueError):
+            engine.similarity_search_many(queries, fusion="sum")
+
+    def test_quantized_and_segment_backends(self, tmp_path, monkeypatch):
+        """Quantized (with rerank) and segment stores fuse the same way"""
+        monkeypatch.setenv("EMBEDDING_MODEL", "simple_tfidf")
+        for name, env in (("int8", {"SYNAPSE_VECTOR_PRECISION": "int8", "SYNAPSE_VECTOR_RERANK": "4"}),
+                          ("segments", {"SYNAPSE_VECTOR_STORAGE": "segments", "SYNAPSE_SEGMENT_ROWS": "16"})):
+            for key, value in env.items():
+                monkeypatch.setenv(key, value)
+            engine = VectorEngine(tmp_path / name)
+            engine.initialize_vector_store()
+            vectors = self.store(engine)
+
+            fused = engine.similarity_search_many(np.stack([vectors["node-4"], vectors["node-8"]]), top_k=1)
+            assert [(node_id, variant) for node_id, _, variant in fused] == [("node-4", 0), ("node-8", 1)]
+            assert fused[0][1] == pytest.approx(1.0, abs=1e-5)
+            for key in env:
+                monkeypatch.delenv(key)
+
+    def test_zero_queries(self, engine):
+        """No queries, or all-zero queries, find nothing"""
+        self.store(engine, count=5)
+        assert engine.similarity_search_many(np.empty((0, engine.embedding_dim))) == []
+        assert engine.similarity_search_many(np.zeros((2, engine.embedding_dim))) == []
+
+
+class TestSQLiteAccess:
+    """Test suite for pooled WAL connections and bulk vector writes"""
+
+    def test_wal_connection_per_thread(self, engine):
+        """Each thread reuses one WAL connection of its own"""
+        import threading
+
+        conn = engine.db.connection()
+        assert engine.db.connection() is conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(engine.db.connection()))
+        thread.start()
+        thread.join()
+        assert other[0] is not conn
+
+    def test_bulk_store_matches_single_stores(self, engine, tmp_path):
+        """store_embeddings writes the same rows as repeated store_embedding calls"""
+        vectors = random_vectors(20, engine.embedding_dim)
+        engine.store_embeddings([(f"node-{i}", f"file-{i}.md", "hash", v) for i, v in enumerate(vectors)])
+
+        single = VectorEngine(tmp_path / "single")
+        single.initialize_vector_store()
+        for i, vector in enumerate(vectors):
+            single.store_embedding(f"node-{i}", f"file-{i}.md", "hash", vector)
+
+        assert engine.get_embedding_stats()["total_vectors"] == 20
+        assert engine.get_embedding_stats()["by_model"] == single.get_embedding_stats()["by_model"]
+        np.testing.assert_array_equal(engine.get_embedding("node-4"), single.get_embedding("node-4"))
+        assert engine.similarity_search(vectors[9], top_k=3) == single.similarity_search(vectors[9], top_k=3)
+
+    def test_failed_transaction_rolls_back(self, engine):
+        """An error inside a transaction leaves no partial writes behind"""
+        with pytest.raises(RuntimeError):
+            with engine.db.transaction() as cursor:
+                cursor.execute("INSERT INTO vector_metadata (neo4j_node_id) VALUES ('partial')")
+                raise RuntimeError("boom")
+
+        with engine.db.transaction() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM vector_metadata")
+            assert cursor.fetchone()[0] == 0
+
+
+class TestStoreMaintenance:
+    """Test suite for schema migration and store compaction"""
+
+    def test_restore_replaces_vector_row(self, engine):
+        """Re-storing a node keeps a single vector row"""
+        vectors = random_vectors(3, engine.embedding_dim)
+        for vector in vectors:
+            engine.store_embedding("a", "a.md", "hash", vector)
+
+        with engine.db.transaction() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM vectors")
+            assert cursor.fetchone()[0] == 1
+        np.testing.assert_array_equal(engine.get_embedding("a"), vectors[2])
+
+    def test_migration_dedupes_legacy_store(self, tmp_path, monkeypatch):
+        """A version 1 store with duplicate rows keeps only the newest row per node"""
+        import sqlite3
+
+        monkeypatch.setenv("EMBEDDING_MODEL", "simple_tfidf")
+        sqlite_path = tmp_path / "neo4j" / "vector_store.db"
+        sqlite_path.parent.mkdir(parents=True)
+        vectors = random_vectors(3, 1024)
+        conn = sqlite3.connect(sqlite_path)
+        conn.execute("""
+            CREATE TABLE vectors (id INTEGER PRIMARY KEY AUTOINCREMENT, neo4j_node_id TEXT,
+                                  vector_data BLOB, vector_norm REAL)
+        """)
+        conn.execute("CREATE INDEX idx_node_id ON vectors(neo4j_node_id)")
+        conn.executemany("INSERT INTO vectors (neo4j_node_id, vector_data, vector_norm) VALUES (?, ?, ?)",
+                         [(node_id, v.tobytes(), float(np.linalg.norm(v)))
+                          for node_id, v in (("a", vectors[0]), ("b", vectors[1]), ("a", vectors[2]))])
+        conn.commit()
+        conn.close()
+
+        engine = VectorEngine(tmp_path)
+        engine.initialize_vector_store()
+
+        with engine.db.transaction() as cursor:
+            cursor.execute("SELECT neo4j_node_id FROM vectors ORDER BY id")
+            assert [row[0] for row in cursor.fetchall()] == ["b", "a"]
+            cursor.execute("SELECT value FROM vector_store_meta WHERE key = 'schema_version'")
+            assert int(cursor.fetchone()[0]) == 4
+        np.testing.assert_array_equal(engine.get_embedding("a"), vectors[2])
+
+    def test_compact_removes_orphans(self, engine):
+        """Vectors without metadata are deleted and the space reported"""
+        vectors = random_vectors(50, engine.embedding_dim)
+        for i, vector in enumerate(vectors):
+            engine.store_embedding(f"node-{i}", f"file-{i}.md", "hash", vector)
+        assert len(engine.similarity_search(vectors[0], top_k=60, min_similarity=-1.0)) == 50
+
+        with engine.db.transaction() as cursor:
+            cursor.execute("DELETE FROM vector_metadata WHERE file_path != 'file-0.md'")
+
+        report = engine.compact_store()
+
+        assert report["orphan_vectors"] == 49
+        assert report["reclaimed_bytes"] == report["bytes_before"] - report["bytes_after"] > 0
+        assert engine.get_embedding_stats()["total_vectors"] == 1
+        assert [node_id for node_id, _ in engine.similarity_search(vectors[0], top_k=5, min_similarity=-1.0)] == \
+               ["node-0"]
+
+
+class TestFilteredSearch:
+    """Test suite for metadata-filtered similarity search"""
+
+    PATHS = ["languages/rust/errors.md", "languages/rust/style.rs", "languages/python/errors.md",
+             "standards/naming.md", "templates/readme.md"]
+
+    def store(self, engine):
+        vectors = random_vectors(len(self.PATHS), engine.embedding_dim)
+        engine.store_embeddings([(f"node-{i}", path, "hash", vector)
+                                 for i, (path, vector) in enumerate(zip(self.PATHS, vectors))])
+        return vectors
+
+    def ids(self, results):
+        return {result[0] for result in results}
+
+    def test_filters_restrict_results(self, engine):
+        """Only nodes matching every predicate are returned"""
+        vectors = self.store(engine)
+        query = vectors[2]
+
+        assert self.ids(engine.similarity_search(query, 10, -1.0, filters={"path_prefix": "languages/rust/"})) == \
+               {"node-0", "node-1"}
+        assert self.ids(engine.similarity_search(query, 10, -1.0, filters={"file_type": [".rs"]})) == {"node-1"}
+        assert self.ids(engine.similarity_search(
+            query, 10, -1.0, filters={"path_prefix": ["standards/", "templates/"], "file_type": "md"})) == \
+               {"node-3", "node-4"}
+        assert engine.similarity_search(query, 10, -1.0, filters={"embedding_model": "BAAI/bge-m3"}) == []
+        assert len(engine.similarity_search(query, 10, -1.0, filters={"embedding_model": "simple_tfidf"})) == 5
+        assert len(engine.similarity_search(query, 10, -1.0, filters={"updated_after": "2000-01-01"})) == 5
+        assert engine.similarity_search(query, 10, -1.0, filters={"updated_after": "2999-01-01"}) == []
+        with pytest.raises(ValueError):
+            engine.similarity_search(query, filters={"language": "rust"})
+
+    def test_filtered_scores_match_unfiltered(self, engine):
+        """Filtering drops rows without changing the scores of the rest"""
+        vectors = self.store(engine)
+        unfiltered = dict(engine.similarity_search(vectors[0], 10, -1.0))
+        filtered = engine.similarity_search(vectors[0], 10, -1.0, filters={"path_prefix": "languages/"})
+
+        assert [node_id for node_id, _ in filtered][0] == "node-0"
+        for node_id, score in filtered:
+            assert score == pytest.approx(unfiltered[node_id])
+
+    def test_filters_follow_store_changes(self, engine):
+        """New and removed metadata is visible to the next filtered search"""
+        vectors = self.store(engine)
+        rust = {"path_prefix": "languages/rust/"}
+        assert len(engine.similarity_search(vectors[0], 10, -1.0, filters=rust)) == 2
+
+        engine.store_embedding("node-9", "languages/rust/new.md", "hash", vectors[3])
+        assert len(engine.similarity_search(vectors[0], 10, -1.0, filters=rust)) == 3
+
+        engine.remove_embeddings(["languages/rust/errors.md"])
+        assert self.ids(engine.similarity_search(vectors[0], 10, -1.0, filters=rust)) == {"node-1", "node-9"}
+
+    def test_segments_and_multi_query(self, tmp_path, monkeypatch):
+        """Segment storage and similarity_search_many apply the same filters"""
+        monkeypatch.setenv("EMBEDDING_MODEL", "simple_tfidf")
+        monkeypatch.setenv("SYNAPSE_VECTOR_STORAGE", "segments")
+        engine = VectorEngine(tmp_path)
+        engine.initialize_vector_store()
+        vectors = self.store(engine)
+
+        results = engine.similarity_search_many(vectors[[0, 3]], 5, -1.0, filters={"file_type": "md"})
+        assert self.ids(results) == {"node-0", "node-2", "node-3", "node-4"}
+        assert self.ids(engine.similarity_search(vectors[0], 5, -1.0, filters={"file_type": "rs"})) == {"node-1"}
+
+
+class TestVectorSpaces:
+    """Test suite for per-model vector spaces and migration between them"""
+
+    @pytest.fixture
+    def switched(self, engine, monkeypatch):
+        """Store with 12 hashing vectors at 1024-D, then EMBEDDING_MODEL reconfigured to 256-D"""
+        words = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot",
+                 "golf", "hotel", "india", "juliet", "kilo", "lima"]
+        texts = {f"node-{i}": f"notes on {word} and {words[(i + 1) % 12]} handling" for i, word in enumerate(words)}
+        engine.update_term_statistics([(f"doc-{i}.md", text) for i, text in enumerate(texts.values())])
+        embeddings = engine.generate_embeddings(list(texts.values()))
+        engine.store_embeddings([(node_id, f"doc-{i}.md", f"hash-{i}", embedding)
+                                 for i, (node_id, embedding) in enumerate(zip(texts, embeddings))])
+
+        monkeypatch.setenv("SYNAPSE_HASHING_DIM", "256")
+        serving = VectorEngine(engine.synapse_root)
+        return serving, texts
+
+    def test_switch_keeps_serving_the_active_space(self, switched):
+        """A new EMBEDDING_MODEL does not change what searches read"""
+        serving, texts = switched
+        target = serving.migration_engine()
+
+        assert (serving.space.name, serving.embedding_dim) == ("simple_tfidf@1024", 1024)
+        assert (target.space.name, target.space.status) == ("simple_tfidf@256", "building")
+        assert target.coverage() == (0, 12)
+        query = serving.generate_embedding(texts["node-4"])
+        assert serving.similarity_search(query, top_k=1)[0][0] == "node-4"
+
+    def test_migration_cuts_over_at_full_coverage(self, switched):
+        """Searches move to the new space only once it holds every file"""
+        serving, texts = switched
+        target = serving.migration_engine()
+        fetch_all = lambda pairs: {node_id: texts[node_id] for node_id, _ in pairs}
+
+        partial = target.migrate_space(lambda pairs: {k: v for k, v in fetch_all(pairs).items() if k != "node-7"},
+                                       batch_size=5)
+        assert (partial["embedded"], partial["covered"], partial["activated"]) == (11, 11, False)
+        assert serving.similarity_search(serving.generate_embedding(texts["node-7"]), top_k=1)[0][0] == "node-7"
+
+        progress = []
+        result = target.migrate_space(fetch_all, progress=lambda covered, total: progress.append(covered))
+        assert (result["embedded"], result["activated"]) == (1, True)
+        assert progress == [12]
+
+        query = serving.generate_embedding(texts["node-7"])
+        assert (serving.space.name, query.shape) == ("simple_tfidf@256", (256,))
+        assert serving.similarity_search(query, top_k=1)[0][0] == "node-7"
+        assert serving.migration_engine() is None
+
+    def test_changed_content_is_embedded_again(self, switched):
+        """Coverage counts files at their current content hash"""
+        serving, texts = switched
+        target = serving.migration_engine()
+        target.migrate_space(lambda pairs: {}, batch_size=4)
+        target.store_embedding("node-0", "doc-0.md", "hash-0", random_vectors(1, 256)[0])
+        assert target.coverage() == (1, 12)
+
+        serving.store_embedding("node-0", "doc-0.md", "hash-0-v2", random_vectors(1, 1024)[0])
+        assert target.coverage() == (0, 12)
+        assert not target.activate_space()
+
+    def test_compact_drops_retired_space(self, switched):
+        """After a cutover the previous space is only kept until compaction"""
+        serving, texts = switched
+        target = serving.migration_engine()
+        assert target.migrate_space(lambda pairs: {node_id: texts[node_id] for node_id, _ in pairs})["activated"]
+
+        report = target.compact_store()
+
+        assert report["retired_spaces"] == ["simple_tfidf@1024"]
+        stats = target.get_embedding_stats()
+        assert list(stats["spaces"]) == ["simple_tfidf@256"]
+        assert stats["total_vectors"] == 12
+
+    def test_unknown_model_falls_back_to_hashing(self, engine, monkeypatch):
+        """An EMBEDDING_MODEL of unknown dimension keeps the store usable instead of raising"""
+        engine.store_embedding("node-0", "doc-0.md", "hash-0", engine.generate_embedding("notes on alpha"))
+        monkeypatch.setenv("EMBEDDING_MODEL", "acme/embedder-v1")
+        monkeypatch.delenv("EMBEDDING_DIM", raising=False)
+
+        serving = VectorEngine(engine.synapse_root)
+
+        assert (serving.configured_model, serving.space.name) == ("simple_tfidf", "simple_tfidf@1024")
+        assert serving.migration_engine() is None
+        assert serving.generate_embedding("notes on alpha").shape == (1024,)
+
+    def test_version_2_store_is_split_by_model(self, tmp_path, monkeypatch):
+        """Rows written by different models stop sharing one search space"""
+        import sqlite3
+
+        monkeypatch.setenv("EMBEDDING_MODEL", "simple_tfidf")
+        sqlite_path = tmp_path / "neo4j" / "vector_store.db"
+        sqlite_path.parent.mkdir(parents=True)
+        vectors = random_vectors(3, 1024)
+        conn = sqlite3.connect(sqlite_path)
+        conn.executescript("""
+            CREATE TABLE vector_metadata (id INTEGER PRIMARY KEY AUTOINCREMENT, neo4j_node_id TEXT UNIQUE,
+                file_path TEXT, content_hash TEXT, embedding_model TEXT, embedding_dim INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+            CREATE TABLE vectors (id INTEGER PRIMARY KEY AUTOINCREMENT, neo4j_node_id TEXT,
+                vector_data BLOB, vector_norm REAL);
+            CREATE UNIQUE INDEX idx_vectors_node_id ON vectors(neo4j_node_id);
+            CREATE TABLE vector_store_meta (key TEXT PRIMARY KEY, value TEXT);
+            INSERT INTO vector_store_meta VALUES ('schema_version', 2);
+        """)
+        for node_id, model, vector in (("a", "simple_tfidf", vectors[0]), ("b", "simple_tfidf", vectors[1]),
+                                       ("c", "BAAI/bge-m3", vectors[2])):
+            conn.execute("""INSERT INTO vector_metadata (neo4j_node_id, file_path, content_hash, embedding_model,
+                            embedding_dim) VALUES (?, ?, 'hash', ?, 1024)""", (node_id, f"{node_id}.md", model))
+            conn.execute("INSERT INTO vectors (neo4j_node_id, vector_data, vector_norm) VALUES (?, ?, ?)",
+                         (node_id, vector.tobytes(), float(np.linalg.norm(vector))))
+        conn.commit()
+        conn.close()
+
+        engine = VectorEngine(tmp_path)
+
+        spaces = engine.get_embedding_stats()["spaces"]
+        assert {name: space["status"] for name, space in spaces.items()} == {
+            "simple_tfidf@1024": "active", "BAAI/bge-m3@1024": "retired"}
+        assert sorted(node_id for node_id, _ in engine.similarity_search(vectors[2], top_k=5, min_similarity=-1.0)) \
+               == ["a", "b"]
+
+
+class TestDimensionReduction:
+    """Test suite for projected (reduced-dimension) vector storage"""
+
+    @pytest.fixture
+    def populated(self, engine):
+        """Engine holding 300 clustered vectors"""
+        vectors = clustered_vectors(300, engine.embedding_dim)
+        for i, vector in enumerate(vectors):
+            engine.store_embedding(f"node-{i}", f"file-{i}.md", "hash", vector)
+        return engine, vectors
+
+    def test_pca_keeps_neighbours(self, populated):
+        """Stored rows shrink to the target dimension and searches still find the source"""
+        engine, vectors = populated
+        result = engine.reduce_dimensions("pca", 64)
+
+        assert (result["vectors"], result["dim"]) == (300, 64)
+        assert result["reclaimed_bytes"] > 0
+        assert 0 < result["explained_variance"] <= 1
+        assert engine.vector_dim == 64 and engine.embedding_dim == 1024
+        assert engine.get_embedding("node-3").shape == (64,)
+
+        query = vectors[7] + 0.1 * random_vectors(1, engine.embedding_dim, seed=1)[0]
+        assert engine.similarity_search(query, top_k=1)[0][0] == "node-7"
+
+    def test_new_vectors_are_projected(self, populated):
+        """Vectors stored after the reduction go through the same projection"""
+        engine, _ = populated
+        engine.reduce_dimensions("pca", 64)
+        extra = clustered_vectors(1, engine.embedding_dim, seed=9)[0]
+
+        engine.store_embedding("extra", "extra.md", "hash", extra)
+
+        assert engine.get_embedding("extra").shape == (64,)
+        assert engine.similarity_search(extra, top_k=1)[0][0] == "extra"
+
+    def test_random_projection_is_persisted(self, populated, tmp_path):
+        """Other and later engines load the projection from beside the store"""
+        engine, vectors = populated
+        other = VectorEngine(tmp_path)
+        engine.reduce_dimensions("random", 128, seed=3)
+
+        assert other.similarity_search(vectors[11], top_k=1)[0][0] == "node-11"
+        assert other.vector_dim == 128
+        reloaded = VectorEngine(tmp_path)
+        assert reloaded.vector_dim == 128
+        np.testing.assert_array_equal(reloaded._projection.components, engine._projection.components)
+
+    def test_reduction_is_refused_twice(self, populated):
+        """The original vectors are gone after the first reduction"""
+        engine, _ = populated
+        with pytest.raises(ValueError):
+            engine.reduce_dimensions("pca", 2048)
+        engine.reduce_dimensions("pca", 64)
+        with pytest.raises(ValueError):
+            engine.reduce_dimensions("pca", 32)
+
+    def test_dimension_recall_report(self, populated):
+        """The report covers both methods at each smaller dimension"""
+        engine, vectors = populated
+        queries = vectors[:20] + 0.1 * random_vectors(20, engine.embedding_dim, seed=2)
+
+        report = engine.dimension_recall(queries, dims=(256, 64, 2048), top_k=5)
+
+        assert list(report) == ["exact", "pca", "random"]
+        assert report["exact"][1024]["recall"] == 1.0
+        assert list(report["pca"]) == [256, 64]
+        assert report["pca"][256]["bytes_per_vector"] == 1024
+        assert report["pca"][256]["recall"] >= report["random"][64]["recall"]
+        assert report["pca"][256]["recall"] > 0.8
+        assert "explained_variance" not in report["random"][64]
+
+
+class TestChunkedEmbeddings:
+    """Test suite for chunk-level vectors of large files"""
+
+    def store_file(self, engine, node_id, spans, vectors, replace=True):
+        """Store one file as chunk vectors with the given line spans"""
+        engine.store_embeddings(
+            [(f"{node_id}#{i}", f"{node_id}.md", "hash", vector) for i, vector in enumerate(vectors)],
+            chunks=[(node_id, start, end) for start, end in spans], replace=replace)
+
+    def test_search_reports_file_with_best_chunk(self, engine):
+        """Chunk hits collapse to their file node, with the best chunk's lines"""
+        vectors = random_vectors(5, engine.embedding_dim)
+        self.store_file(engine, "big", [(1, 40), (41, 80), (81, 120)], vectors[:3])
+        engine.store_embedding("small", "small.md", "hash", vectors[3])
+
+        results = engine.similarity_search(vectors[1], top_k=2, min_similarity=-1.0, spans=True)
+
+        assert results[0] == ("big", pytest.approx(1.0), {"chunk_id": "big#1", "start_line": 41, "end_line": 80})
+        assert results[1][0] == "small" and results[1][2] is None
+        assert [node_id for node_id, _ in engine.similarity_search(vectors[1], top_k=5, min_similarity=-1.0)] \
+               == ["big", "small"]
+
+        fused = engine.similarity_search_many(np.stack([vectors[3], vectors[2]]), top_k=2,
+                                              min_similarity=-1.0, spans=True)
+        assert {node_id: (variant, span) for node_id, _, variant, span in fused} == {
+            "small": (0, None), "big": (1, {"chunk_id": "big#2", "start_line": 81, "end_line": 120})}
+
+    def test_replace_drops_superseded_vectors(self, engine):
+        """A re-ingested file keeps only its new vectors, chunked or not"""
+        vectors = random_vectors(6, engine.embedding_dim)
+        engine.store_embedding("doc", "doc.md", "hash", vectors[0])
+        self.store_file(engine, "doc", [(1, 10), (11, 20), (21, 30)], vectors[1:4])
+        assert engine.get_embedding("doc") is None
+        assert engine.get_stored_embeddings_count() == 3
+
+        self.store_file(engine, "doc", [(1, 15), (16, 30)], vectors[4:6])
+        assert engine.get_stored_embeddings_count() == 2
+        assert engine.similarity_search(vectors[3], top_k=1, min_similarity=0.99) == []
+
+        engine.store_embeddings([("doc", "doc.md", "hash", vectors[0])], replace=True)
+        assert engine.get_stored_embeddings_count() == 1
+        assert engine.similarity_search(vectors[0], top_k=1, spans=True)[0][2] is None
+
+    def test_compact_keeps_every_chunk(self, engine):
+        """Chunk rows share their file's path; only rows of a superseded node are compacted away"""
+        vectors = random_vectors(7, engine.embedding_dim)
+        self.store_file(engine, "big", [(1, 40), (41, 80), (81, 120)], vectors[:3])
+        engine.store_embedding("small", "small.md", "hash", vectors[3])
+        # doc.md was re-ingested under a new node that stored chunks
+        engine.store_embedding("old-doc", "doc.md", "hash", vectors[4])
+        engine.store_embeddings([(f"doc#{i}", "doc.md", "hash", vector) for i, vector in enumerate(vectors[5:])],
+                                chunks=[("doc", 1, 10), ("doc", 11, 20)])
+        assert engine.get_stored_embeddings_count() == 7
+
+        report = engine.compact_store()
+
+        assert report["stale_metadata"] == 1 and report["orphan_vectors"] == 1
+        assert engine.get_stored_embeddings_count() == 6
+        assert engine.get_embedding("old-doc") is None
+        results = engine.similarity_search(vectors[2], top_k=1, spans=True)
+        assert results[0][0] == "big" and results[0][2]["chunk_id"] == "big#2"
+        assert engine.similarity_search(vectors[6], top_k=1, spans=True)[0][2]["chunk_id"] == "doc#1"
+
+    def test_nearest_neighbors(self, engine):
+        """Files score as their best pair of vectors; the node itself and weak matches are left out"""
+        vectors = random_vectors(20, engine.embedding_dim)
+        docs = {f"doc-{i}": vectors[i] for i in range(2, 20)}
+        self.store_file(engine, "big", [(1, 40), (41, 80)], vectors[:2])
+        engine.store_embeddings([(node_id, f"{node_id}.md", "hash", vector) for node_id, vector in docs.items()]
+                                + [("near", "near.md", "hash", vectors[1] + 0.1 * vectors[5])])
+
+        neighbors = engine.nearest_neighbors(["big", "doc-5", "missing"], k=3, min_similarity=0.05)
+
+        assert set(neighbors) == {"big", "doc-5"}
+        assert neighbors["big"][0] == ("near", pytest.approx(0.995, abs=0.005))
+        others = {node_id: vector for node_id, vector in docs.items() if node_id != "doc-5"}
+        others["near"] = vectors[1] + 0.1 * vectors[5]
+        ranked = brute_force(others, vectors[5], 20) + [max(brute_force({"big": vectors[0]}, vectors[5], 1)
+                                                            + brute_force({"big": vectors[1]}, vectors[5], 1),
+                                                            key=lambda x: x[1])]
+        ranked.sort(key=lambda x: x[1], reverse=True)
+        expected = [node_id for node_id, score in ranked[:3] if score >= 0.05]
+        assert [node_id for node_id, _ in neighbors["doc-5"]] == expected
+
+
+class TestBatchedEmbeddings:
+    """Test suite for generate_embeddings"""
+
+    def test_hashing_batch_matches_single_texts(self, engine):
+        """The batched hashing path equals one simple_tfidf_embedding call per text"""
+        texts = ["rust error handling", "python async function", "", "error error recovery"]
+
+        batch = engine.generate_embeddings(texts)
+        singles = [engine.generate_embedding(text) for text in texts]
+
+        assert batch.shape == (4, engine.embedding_dim)
+        np.testing.assert_allclose(batch, np.array(singles))
+
+    def test_transformer_batches_are_length_sorted(self, engine):
+        """Texts reach the model in length order and come back in input order"""
+        calls = []
+
+        class FakeModel:
+            def encode(self, batch, batch_size, convert_to_numpy):
+                calls.append(list(batch))
+                return np.array([[len(text)] * engine.embedding_dim for text in batch], dtype=np.float32)
+
+        engine.embedding_model = "BAAI/bge-m3"
+        engine.transformer_model = FakeModel()
+        texts = ["a" * n for n in (5, 1, 4, 2, 3)]
+
+        embeddings = engine.generate_embeddings(texts, batch_size=2)
+
+        assert calls == [["a", "aa"], ["aaa", "aaaa"], ["aaaaa"]]
+        assert list(embeddings[:, 0]) == [5, 1, 4, 2, 3]
+
+
+class TestEmbeddingCache:
+    """Test suite for the persistent content-hash embedding cache"""
+
+    @pytest.fixture
+    def counting_engine(self, engine):
+        """Engine whose BGE-M3 stand-in records every text it encodes"""
+        encoded = []
+
+        class FakeModel:
+            def encode(self, batch, batch_size, convert_to_numpy):
+                encoded.extend(batch)
+                return np.array([[len(text)] + [1.0] * (engine.embedding_dim - 1) for text in batch])
+
+        engine.embedding_model = "BAAI/bge-m3"
+        engine.transformer_model = FakeModel()
+        return engine, encoded
+
+    def test_repeated_text_skips_the_model(self, counting_engine):
+        """Only texts not seen before reach the model"""
+        engine, encoded = counting_engine
+        first = engine.generate_embeddings(["alpha", "beta", "alpha"])
+        second = engine.generate_embeddings(["beta", "gamma"])
+
+        assert sorted(encoded) == ["alpha", "beta", "gamma"]
+        np.testing.assert_array_equal(first[1], second[0])
+        stats = engine.get_embedding_stats()["embedding_cache"]
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 3, 3)
+
+    def test_cache_survives_clear_and_restart(self, counting_engine):
+        """A re-ingest after clear_embeddings costs no inference"""
+        engine, encoded = counting_engine
+        engine.generate_embedding("file contents")
+        engine.clear_embeddings()
+
+        restarted = VectorEngine(engine.synapse_root)
+        restarted.embedding_model = engine.embedding_model
+        restarted.transformer_model = engine.transformer_model
+        restarted.generate_embedding("file contents")
+
+        assert encoded == ["file contents"]
+
+    def test_fallback_is_not_cached(self, counting_engine):
+        """TF-IDF fallback vectors never land in, or come from, the cache"""
+        engine, encoded = counting_engine
+        engine.generate_embedding("shared text")
+        engine.transformer_model = None
+
+        fallback = engine.generate_embedding("shared text")
+
+        assert engine.get_embedding_stats()["embedding_cache"]["entries"] == 1
+        assert fallback[0] != len("shared text")
+
+    def test_least_recently_used_entries_are_evicted(self, counting_engine):
+        """The cache never grows past max_entries"""
+        engine, encoded = counting_engine
+        engine.embedding_cache.max_entries = 2
+        engine.generate_embedding("one")
+        engine.generate_embedding("two")
+        engine.generate_embedding("one")
+        engine.generate_embedding("three")
+
+        engine.generate_embedding("one")
+        engine.generate_embedding("two")
+
+        assert encoded == ["one", "two", "three", "two"]
+        assert engine.get_embedding_stats()["embedding_cache"]["entries"] == 2
+
+
+class TestHashingEmbedder:
+    """Test suite for the deterministic feature-hashing embedder"""
+
+    def test_identical_text_gives_identical_vectors(self, engine):
+        """No randomness: separate engines agree exactly"""
+        other = VectorEngine(engine.synapse_root)
+        text = "Rust error handling with Result and the ? operator"
+
+        np.testing.assert_array_equal(engine.generate_embedding(text), other.generate_embedding(text))
+        assert np.linalg.norm(engine.generate_embedding(text)) == pytest.approx(1.0)
+
+    def test_shared_terms_score_higher(self, engine):
+        """Texts sharing terms are closer than unrelated texts"""
+        query, related, unrelated = engine.generate_embeddings([
+            "python async function", "writing an async function in python", "golang channel concurrency"
+        ])
+        assert query @ related > query @ unrelated + 0.3
+
+    def test_common_terms_are_downweighted(self, engine):
+        """Document frequencies lower the weight of terms found everywhere"""
+        engine.update_term_statistics([(f"doc-{i}.md", f"common rare{i}") for i in range(10)])
+
+        vector = engine.generate_embedding("common rare3")
+        common = engine.generate_embedding("common")
+        rare = engine.generate_embedding("rare3")
+
+        assert vector @ rare > vector @ common
+
+    def test_statistics_follow_file_updates(self, engine):
+        """Re-ingesting a path replaces its terms; removing it subtracts them"""
+        engine.store_embedding("a", "a.md", "hash", random_vectors(1, engine.embedding_dim)[0])
+        engine.update_term_statistics([("a.md", "alpha beta"), ("b.md", "beta")])
+        engine.update_term_statistics([("a.md", "alpha gamma")])
+        engine._load_document_frequency()
+        assert engine.document_frequency == {"alpha": 1, "beta": 1, "gamma": 1}
+        assert engine.document_count == 2
+
+        engine.remove_embeddings(["a.md"])
+        engine._load_document_frequency()
+        assert engine.document_frequency == {"beta": 1}
+        assert engine.document_count == 1
+
+
+class TestEmbeddingServer:
+    """Test suite for the shared embedding server and its thin client"""
+
+    @pytest.fixture
+    def server(self, engine, tmp_path, monkeypatch):
+        """Embedding server backed by a stand-in model, running on a thread"""
+        import threading
+        import time
+        from embedding_server import EmbeddingServer
+
+        calls = []
+
+        class FakeModel:
+            def encode(self, batch, batch_size, convert_to_numpy):
+                calls.append(list(batch))
+                return np.array([[len(text)] + [1.0] * (engine.embedding_dim - 1) for text in batch])
+
+        engine.embedding_model = "BAAI/bge-m3"
+        engine.transformer_model = FakeModel()
+        server = EmbeddingServer(engine, tmp_path / "embed.sock", batch_window=0.2)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        while not server.socket_path.exists():
+            time.sleep(0.01)
+
+        monkeypatch.setenv("EMBEDDING_MODEL", "BAAI/bge-m3")
+        monkeypatch.setenv("SYNAPSE_EMBEDDING_SOCKET", str(server.socket_path))
+        monkeypatch.setenv("SYNAPSE_EMBEDDING_CACHE_SIZE", "0")
+        yield server, calls
+
+        server.stop()
+        thread.join(timeout=5)
+
+    def test_client_skips_loading_the_model(self, server, tmp_path, monkeypatch):
+        """A running server turns VectorEngine into a thin client"""
+        monkeypatch.setattr(VectorEngine, "_initialize_transformer_model",
+                            lambda self: pytest.fail("model loaded in-process"))
+        client = VectorEngine(tmp_path / "client")
+
+        embeddings = client.generate_embeddings(["abc", "abcdef"])
+
+        assert client.embedding_client is not None
+        assert client.transformer_model is None
+        assert list(embeddings[:, 0]) == [3, 6]
+
+    def test_concurrent_requests_share_a_batch(self, server, tmp_path):
+        """Requests arriving within the batch window reach the model together"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        _, calls = server
+        client = VectorEngine(tmp_path / "client")
+        texts = [f"query {i}" for i in range(6)]
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(client.generate_embedding, texts))
+
+        assert [row[0] for row in results] == [len(text) for text in texts]
+        assert len(calls) < len(texts)
+        assert sorted(text for batch in calls for text in batch) == sorted(texts)
+
+    def test_falls_back_in_process_when_server_goes_away(self, server, tmp_path, monkeypatch):
+        """A dead socket makes the client load the model itself"""
+        loaded = []
+        monkeypatch.setattr(VectorEngine, "_initialize_transformer_model", lambda self: loaded.append(True))
+        client = VectorEngine(tmp_path / "client")
+        assert loaded == []
+
+        server[0].stop()
+        import time
+        while server[0].socket_path.exists():
+            time.sleep(0.01)
+        embedding = client.generate_embedding("still works")
+
+        assert loaded == [True]
+        assert client.embedding_client is None
+        assert embedding.shape == (client.embedding_dim,)